@@ -0,0 +1,77 @@
+"""
+Offline benchmark of get-missions-list response encoding (no database).
+
+    python -m benchmarks.bench_json_response --rows 10000 --repeat 20
+
+Compares, for the same synthetic mission rows (UUIDs, timestamps, JSONB parameters):
+- baseline: one dict per row (as RealDictCursor returned them) encoded by Flask's jsonify
+- objects:  dicts built from tuple rows, tech_utils.json_response (orjson when installed)
+- rows:     column names once and one array per row (shape=rows)
+each without and with gzip.
+"""
+import argparse
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from flask import Flask, jsonify
+
+from tech_utils import json_response as jr
+
+COLUMNS = ("id", "mission_id", "mission_group", "mission_type", "email", "location", "time_window",
+           "drone_type", "status", "parameters", "created_at", "valid_from", "valid_to")
+
+
+def make_rows(count):
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    return [
+        (i, uuid.uuid4(), "default", "survey", f"user{i % 50}@example.com", "field-1", "10:00-12:00",
+         "quad", "in progress", {"altitude": 120, "waypoints": [[59.9, 30.3], [59.91, 30.31]], "camera": "rgb"},
+         start + timedelta(seconds=i), start + timedelta(seconds=i), None)
+        for i in range(count)
+    ]
+
+
+def _measure(name, build, repeat):
+    build()     # warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        response = build()
+    elapsed = (time.perf_counter() - start) / repeat
+    size = len(response.get_data())
+    print(f"{name:<22} {elapsed * 1000:8.1f} ms/response  {size / 1024:9.1f} KiB")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    dict_rows = [dict(zip(COLUMNS, row)) for row in rows]
+    app = Flask(__name__)
+    print(f"{args.rows} rows, encoder: {'orjson' if jr.orjson else 'json (orjson not installed)'}")
+
+    results = {}
+    with app.test_request_context():
+        results["baseline"] = _measure("baseline jsonify", lambda: jsonify({"status": "ok", "data": dict_rows}), args.repeat)
+    for encoding in ("identity", "gzip"):
+        with app.test_request_context(headers={"Accept-Encoding": encoding}):
+            results[f"objects/{encoding}"] = _measure(
+                f"objects  {encoding}",
+                lambda: jr.json_response({"status": "ok", "data": [dict(zip(COLUMNS, r)) for r in rows]}),
+                args.repeat)
+            results[f"rows/{encoding}"] = _measure(
+                f"rows     {encoding}",
+                lambda: jr.json_response({"status": "ok", "columns": list(COLUMNS), "rows": rows}),
+                args.repeat)
+
+    baseline = results["baseline"]
+    for key in ("objects/identity", "rows/identity", "objects/gzip", "rows/gzip"):
+        print(f"speedup {key:<18} {baseline / results[key]:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
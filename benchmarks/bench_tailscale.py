@@ -0,0 +1,73 @@
+"""
+Offline benchmark of the Tailscale-facing code paths against the local stand-in API.
+
+    python -m benchmarks.bench_tailscale --hosts 2000 --latency 0.02 --error-rate 0.01
+
+Measures:
+- key creation (the Tailscale part of /get-vpn-connection) with concurrent callers
+- batched teardown of all created hostnames (devices + keys)
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# token_manager refuses to import without credentials; the stand-in accepts any
+os.environ.setdefault("TAILSCALE_API_KEY", "tskey-api-bench")
+os.environ.setdefault("TAILNET", "bench")
+
+from rfd.fake_tailscale.app import create_app, serve_in_thread
+from rfd.fake_tailscale.state import FaultInjector
+
+
+def _report(name, count, elapsed):
+    print(f"{name:<16} {count:>7} ops in {elapsed:7.2f}s  ({count / max(elapsed, 0.001):8.1f} ops/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hosts", type=int, default=500)
+    parser.add_argument("--callers", type=int, default=16, help="concurrent key creation callers")
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=None, help="429 above this rate (fake API side)")
+    parser.add_argument("--api-rate", type=float, default=None, help="override TS_API_RATE of the client scheduler")
+    args = parser.parse_args()
+
+    app = create_app(faults=FaultInjector(latency=args.latency, error_rate=args.error_rate, rate_limit=args.rate_limit))
+    server, base_url = serve_in_thread(app)
+
+    from rfd.connections_manager import tailscale_manager, token_manager, api_scheduler
+    tailscale_manager.TAILSCALE_API_BASE_URL = base_url
+    token_manager.TAILSCALE_API_BASE_URL = base_url
+    if args.api_rate:
+        api_scheduler._scheduler = api_scheduler.TailscaleApiScheduler(rate=args.api_rate, burst=args.api_rate)
+
+    hostnames = [f"client-{i:08d}" for i in range(args.hosts)]
+
+    def issue(hostname):
+        try:
+            key, _, key_id = token_manager.create_tailscale_auth_key(hostname, "client")
+        except Exception:
+            return None
+        app.tailnet.add_device(hostname)  # device joins without consuming the key, like a reusable key
+        return hostname, key_id
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=args.callers) as executor:
+        targets = [t for t in executor.map(issue, hostnames) if t]
+    _report("create key", len(targets), time.monotonic() - start)
+
+    start = time.monotonic()
+    stats = tailscale_manager.teardown_hostnames(targets)
+    _report("teardown", stats["devices"] + stats["keys"], time.monotonic() - start)
+
+    print(f"failed hostnames: {len(stats['failed'])}, left in tailnet: "
+          f"{len(app.tailnet.devices)} devices, {len(app.tailnet.keys)} keys")
+    print(f"scheduler: {api_scheduler.scheduler_stats()}")
+    print(f"fake API: {app.faults.counters}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
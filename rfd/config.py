@@ -5,17 +5,106 @@ load_dotenv()
 
 CLEANER_INTERVAL = 3600
 
+# History of scheduled job runs (grfp_job_runs, see tech_utils/job_runner.py), seconds
+JOB_RUNS_RETENTION = 7 * 86400
+
+# Shared Tailscale API budget (see connections_manager/api_scheduler.py)
+TS_API_RATE = float(os.getenv("TS_API_RATE", 10))   # sustained requests per second
+TS_API_BURST = 20
+TS_API_MIN_RATE = 1          # floor of the adaptive rate after repeated 429s
+TS_API_MAX_RETRIES = 3       # retries of a call answered with 429
+TS_API_BACKOFF_BASE = 2      # seconds, used when a 429 has no Retry-After header
+TS_API_TIMEOUT = 10          # seconds per request, a hung call must not hold a worker thread
+TS_BREAKER_FAILURES = 5      # consecutive failures (errors, timeouts, 5xx) that open the circuit
+TS_BREAKER_RESET = 30        # seconds before a half-open probe is let through
+
+# Reference tables snapshot of the missions manager validators (see missions_manager/reference_data.py);
+# reloaded on change notifications, the TTL is a backstop (seconds)
+REFERENCE_DATA_TTL = 300
+
+# Page size of get-missions-list (keyset pagination on valid_from, id)
+MISSIONS_PAGE_DEFAULT = 100
+MISSIONS_PAGE_MAX = 1000
+
+# Rows per server-side cursor fetch of /export (memory is bounded by one chunk)
+EXPORT_CHUNK_ROWS = 2000
+
+# Emails that could not be sent (SMTP down or circuit open) are retried by a job
+EMAIL_FLUSH_INTERVAL = 60
+
+# Batched Tailnet teardown: concurrent deletions
+TEARDOWN_MAX_WORKERS = 8
+
+# Tailnet teardown outbox (see connections_manager/teardown_outbox.py)
+OUTBOX_POLL_INTERVAL = 5
+OUTBOX_BATCH_SIZE = 500      # intents per claim; one Tailnet inventory fetch per batch
+OUTBOX_MAX_ATTEMPTS = 8
+OUTBOX_RETRY_BASE = 30       # seconds, doubled on every failed attempt
+OUTBOX_CLAIM_TIMEOUT = 300   # claimed intents become available again if the worker died
+
+# Tailnet <-> DB reconciliation job (see connections_manager/reconciler.py)
+RECONCILE_INTERVAL = 3600
+
+# Pending VPN connection reservations older than this are resolved by the cleaner (seconds)
+VPN_PENDING_TIMEOUT = 300
+
+# Expiry of session VPN connections at their token_expires_at (see connections_manager/expiry.py)
+EXPIRY_BATCH_SIZE = 100          # rows deactivated per statement
+EXPIRY_MAX_SLEEP = 60            # the scheduler re-checks at least this often (clock changes)
+EXPIRY_SWEEP_INTERVAL = 600      # safety sweep for deadlines the scheduler doesn't know about
+
 TAILSCALE_IP_POLL_TIMEOUT=1200
 TAILSCALE_IP_POLL_INTERVAL=3
 TAILSCALE_IPS_POLL_CHECK_FREQ=5
+# Max operations per /start-sessions or /close-sessions request
+SESSION_BATCH_MAX = 500
+
+# Long-poll cap of /wait-for-device (seconds); clients re-issue the request until TAILSCALE_IP_POLL_TIMEOUT
+DEVICE_WAIT_MAX = 60
 
 TOKEN_EXPIRE_TMP=36000
 
+# GCS session heartbeats (see connections_manager/heartbeat.py)
+HEARTBEAT_TIMEOUT = int(os.getenv("HEARTBEAT_TIMEOUT", 120))   # seconds of silence before the session is aborted
+HEARTBEAT_TICK = 5                # timing wheel resolution and sweep interval (seconds)
+HEARTBEAT_FLUSH_INTERVAL = 30     # last-seen times are written to grfp_sessions in batches this often
+
+# Session/mission change stream (see connections_manager/change_stream.py)
+CHANGE_STREAM_BUFFER = 1000          # recent events kept in memory for fan-out and resume
+CHANGE_STREAM_BACKFILL_MAX = 1000    # events read from the DB when a client resumes from an older id
+CHANGE_STREAM_KEEPALIVE = 15         # seconds between keepalive comments on an idle stream
+CHANGE_STREAM_RETRY_MS = 3000        # reconnect delay suggested to SSE clients
+CHANGE_STREAM_PORT = 8002            # port of the event loop server holding the client streams (stream_server.py)
+CHANGE_STREAM_WRITE_TIMEOUT = 30     # seconds a stream client may stall reading before it is dropped
+CHANGE_EVENTS_RETENTION = 86400      # seconds change events are kept for resume
+CHANGE_EVENTS_PURGE_INTERVAL = 3600
+
+# Active mission / current session lookups of get-vpn-connection (see connections_manager/live_cache.py)
+LIVE_CACHE_TTL = 30                  # backstop; entries are dropped by change events and local writes
+
+# Pre-minted Tailscale auth key pool (see connections_manager/key_pool.py)
+KEY_POOL_TAGS = ['gcs', 'client']
+KEY_POOL_SIZE = int(os.getenv("KEY_POOL_SIZE", 5))
+KEY_POOL_LOW_WATER = int(os.getenv("KEY_POOL_LOW_WATER", 2))
+KEY_POOL_MIN_TTL = TOKEN_EXPIRE_TMP - 3600
+KEY_POOL_REFILL_INTERVAL = 60
+KEY_POOL_LEASE = 5 * KEY_POOL_REFILL_INTERVAL   # pooled key IDs not refreshed for this long are revoked by the reconciler
+
+# Idempotent get-vpn-connection retries (Idempotency-Key header)
+IDEMPOTENCY_TTL = 600        # seconds a response is replayed
+IDEMPOTENCY_MAX_ENTRIES = 10000
+
+# Parsed client RSA public keys (see connections_manager/pubkey_cache.py)
+PUBKEY_CACHE_SIZE = 1024
+PUBKEY_MIN_BITS = 2048
+
 GCS_PROOF_TOKENS_FILE = 'rfd/gcs_proof_tokens.txt'
 GCS_PROOF_TOKEN_BASE = 3.479
 
 TAILSCALE_API_KEY = os.getenv("TAILSCALE_API_KEY")
 TAILNET = os.getenv("TAILNET")
+# Point at a local stand-in (rfd/fake_tailscale) for offline tests and benchmarks
+TAILSCALE_API_BASE_URL = os.getenv("TAILSCALE_API_BASE_URL", "https://api.tailscale.com/api/v2").rstrip("/")
 
 GROUND_TEAMS_EMAIL = os.getenv('GROUND_TEAMS_EMAIL')
 RFD_ADMIN_EMAIL = os.getenv('RFD_ADMIN_EMAIL')
@@ -0,0 +1,205 @@
+import heapq
+import itertools
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from tech_utils.logger import init_logger
+logger = init_logger(name="TSApiScheduler", component="cm")
+
+from tech_utils.metrics import register_metrics
+from tech_utils.circuit_breaker import get_breaker, CircuitOpenError
+from rfd.config import (
+    TS_API_RATE, TS_API_BURST, TS_API_MIN_RATE, TS_API_MAX_RETRIES, TS_API_BACKOFF_BASE,
+    TS_API_TIMEOUT, TS_BREAKER_FAILURES, TS_BREAKER_RESET,
+)
+
+# === Priority classes: lower value is served first ===
+PRIORITY_INTERACTIVE = 0   # user is waiting (key creation for a session start)
+PRIORITY_BACKGROUND = 1    # teardown, cleaner, reconciliation, pool refill, reset scripts
+_PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BACKGROUND: "background"}
+
+
+def _retry_after_seconds(response, attempt):
+    """
+    Delay requested by a 429 response: Retry-After in seconds or as an HTTP date,
+    exponential backoff if the header is missing or unreadable.
+    """
+    value = response.headers.get("Retry-After") if response.headers is not None else None
+    if value:
+        try:
+            return max(0.0, float(value))
+        except (TypeError, ValueError):
+            pass
+        try:
+            return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            pass
+    return TS_API_BACKOFF_BASE * 2 ** attempt
+
+
+class TailscaleApiScheduler:
+    """
+    Process-wide token bucket shared by every Tailscale API call.
+
+    Waiting calls are served strictly by priority class, then in arrival order.
+    A 429 pauses the whole bucket for Retry-After and halves the refill rate;
+    successful calls raise the rate back towards TS_API_RATE.
+    """
+
+    def __init__(self, rate=TS_API_RATE, burst=TS_API_BURST, min_rate=TS_API_MIN_RATE):
+        self.max_rate = rate
+        self.min_rate = min_rate
+        self.burst = burst
+        self.rate = rate
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._waiting = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stats = {
+            name: {"calls": 0, "wait_total": 0.0, "wait_max": 0.0}
+            for name in _PRIORITY_NAMES.values()
+        }
+        self._throttled = 0
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, priority=PRIORITY_BACKGROUND):
+        """
+        Block until the caller may send one request. Returns the time waited in seconds.
+        """
+        start = time.monotonic()
+        ticket = (priority, next(self._seq))
+        with self._cond:
+            heapq.heappush(self._waiting, ticket)
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if self._waiting[0] == ticket:
+                    if now >= self._paused_until and self._tokens >= 1:
+                        heapq.heappop(self._waiting)
+                        self._tokens -= 1
+                        self._cond.notify_all()
+                        break
+                    timeout = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+                else:
+                    timeout = None
+                # Head of the queue may change (higher priority arrived), so never sleep blindly
+                self._cond.wait(timeout)
+
+            waited = time.monotonic() - start
+            stats = self._stats[_PRIORITY_NAMES.get(priority, "background")]
+            stats["calls"] += 1
+            stats["wait_total"] += waited
+            stats["wait_max"] = max(stats["wait_max"], waited)
+        return waited
+
+    def throttled(self, delay):
+        """
+        Register a 429: pause everyone for `delay` seconds and back off the refill rate.
+        """
+        with self._cond:
+            self._throttled += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            self._tokens = 0.0
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._cond.notify_all()
+        logger.warning(f"Tailscale API rate limited, pausing {delay:.1f}s, rate lowered to {self.rate:.2f} req/s")
+
+    def succeeded(self):
+        """
+        Additive increase of the refill rate after a successful call.
+        """
+        with self._cond:
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+    def stats(self):
+        """
+        Queue depth per priority class, wait times and current rate.
+        """
+        with self._cond:
+            depth = {name: 0 for name in _PRIORITY_NAMES.values()}
+            for priority, _ in self._waiting:
+                depth[_PRIORITY_NAMES.get(priority, "background")] += 1
+            return {
+                "queue_depth": depth,
+                "wait": {
+                    name: {
+                        "calls": s["calls"],
+                        "avg": round(s["wait_total"] / s["calls"], 4) if s["calls"] else 0.0,
+                        "max": round(s["wait_max"], 4),
+                    }
+                    for name, s in self._stats.items()
+                },
+                "rate": round(self.rate, 2),
+                "throttled": self._throttled,
+                "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 2),
+            }
+
+
+_scheduler = TailscaleApiScheduler()
+register_metrics("tailscale_api", _scheduler.stats)
+
+# Fail fast instead of queueing behind a Tailscale API that is down
+_breaker = get_breaker("tailscale", TS_BREAKER_FAILURES, TS_BREAKER_RESET)
+
+
+def tailscale_unavailable():
+    """
+    True while the Tailscale circuit is open and calls would be rejected.
+    """
+    return _breaker.is_open()
+
+
+def schedule_call(func, *args, priority=PRIORITY_BACKGROUND, **kwargs):
+    """
+    Send a Tailscale API request through the shared scheduler.
+
+    `func` is the requests function to call (e.g. requests.get); args and kwargs are passed through,
+    with a default timeout of TS_API_TIMEOUT seconds.
+    429 responses are retried up to TS_API_MAX_RETRIES times after the advertised delay;
+    the last response is returned as is, so callers keep their own status handling.
+
+    Raises:
+        CircuitOpenError: if the Tailscale circuit is open.
+    """
+    kwargs.setdefault("timeout", TS_API_TIMEOUT)
+    attempt = 0
+    while True:
+        if not _breaker.allow_request():
+            raise CircuitOpenError("Tailscale API unavailable (circuit open)")
+
+        _scheduler.acquire(priority)
+        try:
+            response = func(*args, **kwargs)
+        except Exception:
+            _breaker.record_failure()
+            raise
+
+        if response.status_code >= 500:
+            _breaker.record_failure()
+            return response
+
+        # Any other answer (including 429) means the API is reachable
+        _breaker.record_success()
+        if response.status_code != 429:
+            _scheduler.succeeded()
+            return response
+
+        _scheduler.throttled(_retry_after_seconds(response, attempt))
+        if attempt >= TS_API_MAX_RETRIES:
+            return response
+        attempt += 1
+
+
+def scheduler_stats():
+    """
+    Queue depth, wait times and current rate of the shared scheduler.
+    """
+    return _scheduler.stats()
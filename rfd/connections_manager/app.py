@@ -1,34 +1,74 @@
 from flask import Flask, request, jsonify
 
-from rfd.connections_manager.endpoints import get_vpn_connection, delete_vpn_connection, start_session, close_session, register_gcs
+from rfd.connections_manager.endpoints import get_vpn_connection, delete_vpn_connection, renew_vpn_connection, wait_for_device, start_session, close_session, start_sessions, close_sessions, session_heartbeat, register_gcs, stream_changes, metrics
 
 from tech_utils.logger import init_logger
 logger = init_logger(name="Server", component="cm")
 
-from rfd.config import CLEANER_INTERVAL
+from rfd.config import CLEANER_INTERVAL, KEY_POOL_REFILL_INTERVAL, OUTBOX_POLL_INTERVAL, RECONCILE_INTERVAL, CHANGE_EVENTS_PURGE_INTERVAL, HEARTBEAT_TICK, HEARTBEAT_FLUSH_INTERVAL, EXPIRY_SWEEP_INTERVAL, JOB_RUNS_RETENTION
 
 app = Flask(__name__)
 
-from apscheduler.schedulers.background import BackgroundScheduler
+from datetime import datetime
+from tech_utils.job_runner import create_job_runner
 from rfd.connections_manager.cleaner import cleaner
+from rfd.connections_manager.key_pool import refill_pool
+from rfd.connections_manager.teardown_outbox import drain_outbox
+from rfd.connections_manager.reconciler import reconcile_tailnet
+from rfd.connections_manager.change_stream import broker, purge_events
+from rfd.connections_manager.stream_server import stream_server
+from rfd.connections_manager.heartbeat import flush_heartbeats, sweep_heartbeats
+from rfd.connections_manager.expiry import start_expiry_scheduler, sweep_expired
 
 from rfd.connections_manager.db_init import db_init
 
-# Add db cleaner job (delete sessions those weren't terminated correctly)
-scheduler = BackgroundScheduler()
-scheduler.add_job(cleaner, "interval", seconds=CLEANER_INTERVAL)
-scheduler.start()
+# Shared-state jobs run on one replica (Postgres advisory lock lease), per-process ones everywhere
+jobs = create_job_runner("cm", retention=JOB_RUNS_RETENTION)
+# Add db cleaner job (resolve VPN connection reservations that were never activated)
+jobs.add_job(cleaner, "interval", seconds=CLEANER_INTERVAL)
+# Keep this process' pre-minted auth key pool topped up (first fill right after start)
+jobs.add_job(refill_pool, "interval", exclusive=False, seconds=KEY_POOL_REFILL_INTERVAL, next_run_time=datetime.now())
+# Drain Tailnet teardown intents (retries and anything endpoints didn't process right away);
+# it runs every few seconds, so only failed and overlapping runs go to the job history
+jobs.add_job(drain_outbox, "interval", record=False, seconds=OUTBOX_POLL_INTERVAL)
+# Remove Tailnet devices and keys that no longer belong to a live VPN connection
+jobs.add_job(reconcile_tailnet, "interval", seconds=RECONCILE_INTERVAL)
+# Drop change events too old to resume from
+jobs.add_job(purge_events, "interval", seconds=CHANGE_EVENTS_PURGE_INTERVAL)
+# Write this process' heartbeat last-seen times in batches; abort sessions whose heartbeats stopped
+jobs.add_job(flush_heartbeats, "interval", exclusive=False, seconds=HEARTBEAT_FLUSH_INTERVAL)
+jobs.add_job(sweep_heartbeats, "interval", exclusive=False, seconds=HEARTBEAT_TICK)
+# Safety net of the expiry scheduler (deadlines it doesn't know about)
+jobs.add_job(sweep_expired, "interval", seconds=EXPIRY_SWEEP_INTERVAL, next_run_time=datetime.now())
+jobs.start()
+
+# Deactivate session VPN connections at their token expiry
+start_expiry_scheduler()
+
+# Listen for session/mission changes now rather than on the first stream client: the live state cache
+# is only used while the listener is connected
+broker.ensure_listener()
 
 # Add endpoints
 app.add_url_rule("/register-gcs", view_func=register_gcs, methods=["POST"])
 app.add_url_rule("/get-vpn-connection", view_func=get_vpn_connection, methods=["POST"])
 app.add_url_rule("/delete-vpn-connection", view_func=delete_vpn_connection, methods=["POST"])
+app.add_url_rule("/renew-vpn-connection", view_func=renew_vpn_connection, methods=["POST"])
+app.add_url_rule("/wait-for-device", view_func=wait_for_device, methods=["POST"])
 app.add_url_rule("/start-session", view_func=start_session, methods=["POST"])
 app.add_url_rule("/close-session", view_func=close_session, methods=["POST"])
+app.add_url_rule("/start-sessions", view_func=start_sessions, methods=["POST"])
+app.add_url_rule("/close-sessions", view_func=close_sessions, methods=["POST"])
+app.add_url_rule("/session-heartbeat", view_func=session_heartbeat, methods=["POST"])
+app.add_url_rule("/change-stream", view_func=stream_changes, methods=["GET"])
+app.add_url_rule("/metrics", view_func=metrics, methods=["GET"])
 
 def main():
     logger.info("DB init")
     db_init()
+    # GET /change-stream redirects here: client streams are held by an event loop, not by server threads
+    logger.info("Starting change stream server")
+    stream_server.start()
     logger.info("Starting server")
     app.run(host="127.0.0.1", port=8001)
 
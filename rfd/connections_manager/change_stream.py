@@ -0,0 +1,288 @@
+import asyncio
+import itertools
+import json
+import threading
+import uuid
+from collections import deque
+
+from tech_utils.logger import init_logger
+logger = init_logger(name="ChangeStream", component="cm")
+
+from tech_utils.db import get_conn, CHANGE_CHANNEL
+from tech_utils.metrics import register_metrics
+from tech_utils.pg_listener import PgListener
+from rfd.config import CHANGE_STREAM_BUFFER, CHANGE_STREAM_BACKFILL_MAX, CHANGE_STREAM_KEEPALIVE, CHANGE_EVENTS_RETENTION
+
+EVENT_FIELDS = ("id", "table_name", "mission_id", "session_id", "status", "created_at")
+
+
+def parse_filter(mission_id, session_id, last_event_id=None):
+    """
+    Canonical (mission_id, session_id, last_event_id) of a change stream request.
+
+    Raises:
+        ValueError: with the reason to return to the client (no filter, malformed ID)
+    """
+    if not mission_id and not session_id:
+        raise ValueError("Missing parameters")
+    try:
+        return (str(uuid.UUID(mission_id)) if mission_id else None,
+                str(uuid.UUID(session_id)) if session_id else None,
+                int(last_event_id) if last_event_id else None)
+    except ValueError:
+        raise ValueError("Invalid parameters") from None
+
+
+def fetch_events(after_id, mission_id=None, session_id=None, limit=CHANGE_STREAM_BACKFILL_MAX):
+    """
+    Stored change events with id > after_id, oldest first, optionally filtered.
+    """
+    conditions, params = ["id > %s"], [after_id]
+    if mission_id:
+        conditions.append("mission_id = %s")
+        params.append(mission_id)
+    if session_id:
+        conditions.append("session_id = %s")
+        params.append(session_id)
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"""
+                SELECT {', '.join(EVENT_FIELDS)} FROM grfp_change_events
+                WHERE {' AND '.join(conditions)}
+                ORDER BY id
+                LIMIT %s
+            """, params + [limit])
+            rows = cur.fetchall()
+
+    events = []
+    for row in rows:
+        event = dict(zip(EVENT_FIELDS, row))
+        # Same shape as the NOTIFY payload
+        for field in ("mission_id", "session_id"):
+            event[field] = str(event[field]) if event[field] else None
+        event["created_at"] = event["created_at"].isoformat() if event["created_at"] else None
+        events.append(event)
+    return events
+
+
+class ChangeBroker:
+    """
+    Fans out change events from the single LISTEN connection to the open client streams.
+
+    - Events are kept in one ring buffer; subscribers only hold a cursor into it,
+      no per-subscriber queue or thread.
+    - Subscribers are coroutines on one event loop (stream_server.py), registered per filter
+      (mission or session); an event wakes only the subscribers interested in it, with one
+      call into the loop per event.
+    - A client resuming from an event id still in the buffer is replayed from memory,
+      older ids are read back from grfp_change_events.
+    """
+
+    def __init__(self, buffer_size=CHANGE_STREAM_BUFFER, keepalive=CHANGE_STREAM_KEEPALIVE):
+        self.buffer_size = buffer_size
+        self.keepalive = keepalive
+        self._lock = threading.Lock()
+        self._events = deque()      # (seq, event), seq grows by one per event
+        self._index = {}            # event id -> seq, for resume and de-duplication
+        self._seq = 0
+        self._waiters = {}          # filter key -> asyncio.Events of the subscribers
+        self._loop = None           # event loop the subscribers run on
+        self._listener = None
+        self._observers = []        # in-process consumers of every event (e.g. caches)
+        self._stats = {"published": 0, "duplicates": 0, "backfilled": 0, "overruns": 0}
+
+    # === Producer side ===
+    def ensure_listener(self):
+        """Start the LISTEN thread on first use."""
+        with self._lock:
+            if self._listener is None:
+                self._listener = PgListener(CHANGE_CHANNEL, self._on_notify, self._on_connect)
+            listener = self._listener
+        listener.start()
+
+    def _on_notify(self, payload):
+        self.publish(json.loads(payload))
+
+    def observe(self, callback):
+        """
+        Call callback(event) for every new event on the listener thread, and callback(None)
+        after every (re)connection of the listener (events may have been missed).
+        """
+        self._observers.append(callback)
+
+    def listener_connected(self):
+        return bool(self._listener and self._listener.connected)
+
+    def _notify_observers(self, event):
+        for callback in self._observers:
+            try:
+                callback(event)
+            except Exception as e:
+                logger.error(f"Change observer failed: {e}", exc_info=True)
+
+    def _on_connect(self):
+        self._notify_observers(None)
+        # Notifications sent while the listener was down are lost; read them back from the table.
+        # Ids are assigned before commit, so start from the oldest buffered id and let publish() skip known ones
+        with self._lock:
+            if not self._events:
+                return
+            after_id = self._events[0][1]["id"] - 1
+        events = fetch_events(after_id)
+        for event in events:
+            self.publish(event)
+        logger.info(f"Change stream caught up from event {after_id}: {len(events)} events read back")
+
+    def publish(self, event):
+        with self._lock:
+            if event["id"] in self._index:
+                self._stats["duplicates"] += 1
+                return
+            self._seq += 1
+            self._events.append((self._seq, event))
+            self._index[event["id"]] = self._seq
+            while len(self._events) > self.buffer_size:
+                _, old = self._events.popleft()
+                self._index.pop(old["id"], None)
+            self._stats["published"] += 1
+
+            waiters = [
+                wake
+                for key in (("mission", event.get("mission_id")), ("session", event.get("session_id")))
+                for wake in self._waiters.get(key, ())
+            ]
+            loop = self._loop
+        if waiters:
+            # asyncio.Event is not thread-safe: set them on the loop
+            loop.call_soon_threadsafe(_wake_all, waiters)
+        self._notify_observers(event)
+
+    # === Subscriber side ===
+    def _since(self, cursor, matches):
+        # Caller holds the lock. Returns (matching events after cursor, new cursor, events were lost)
+        if not self._events:
+            return [], self._seq, False
+        lost = cursor < self._events[0][0] - 1
+        new = min(self._seq - cursor, len(self._events))
+        tail = list(itertools.islice(reversed(self._events), new))
+        return [event for _, event in reversed(tail) if matches(event)], self._seq, lost
+
+    async def subscribe(self, mission_id=None, session_id=None, last_event_id=None):
+        """
+        Async generator of change events for a mission and/or session. Yields None after
+        `keepalive` seconds without events, so the caller can write a keepalive.
+
+        All subscribers of a broker must run on the same event loop. Reads of older events
+        from the DB run in the loop's executor.
+
+        Args:
+            mission_id (str): Canonical mission UUID, or None
+            session_id (str): Canonical session UUID, or None (one of the two is required)
+            last_event_id (int): Resume after this event (Last-Event-ID); None streams new events only
+        """
+        def matches(event):
+            return ((mission_id is None or event.get("mission_id") == mission_id) and
+                    (session_id is None or event.get("session_id") == session_id))
+
+        loop = asyncio.get_running_loop()
+        self.ensure_listener()
+        key = ("session", session_id) if session_id else ("mission", mission_id)
+        wake = asyncio.Event()
+        with self._lock:
+            self._loop = loop
+            self._waiters.setdefault(key, set()).add(wake)
+            cursor = self._seq
+            resume_seq = self._index.get(last_event_id) if last_event_id is not None else None
+
+        backfilled = set()
+        last_sent = last_event_id
+        try:
+            if resume_seq is not None:
+                cursor = resume_seq
+            elif last_event_id is not None:
+                for event in await loop.run_in_executor(None, fetch_events, last_event_id, mission_id, session_id):
+                    backfilled.add(event["id"])
+                    with self._lock:
+                        self._stats["backfilled"] += 1
+                    last_sent = event["id"]
+                    yield event
+
+            while True:
+                # Cleared before reading, so an event published after the read sets it again
+                wake.clear()
+                with self._lock:
+                    pending, cursor, lost = self._since(cursor, matches)
+                if not pending and not lost:
+                    try:
+                        await asyncio.wait_for(wake.wait(), self.keepalive)
+                    except asyncio.TimeoutError:
+                        pass
+                    with self._lock:
+                        pending, cursor, lost = self._since(cursor, matches)
+                if lost:
+                    with self._lock:
+                        self._stats["overruns"] += 1
+
+                if lost and last_sent is not None:
+                    # More events than the buffer holds arrived since our last wakeup
+                    for event in await loop.run_in_executor(None, fetch_events, last_sent, mission_id, session_id):
+                        if event["id"] not in backfilled:
+                            backfilled.add(event["id"])
+                            yield event
+
+                if not pending:
+                    yield None
+                    continue
+                for event in pending:
+                    if event["id"] in backfilled:
+                        continue
+                    last_sent = event["id"]
+                    yield event
+        finally:
+            with self._lock:
+                waiters = self._waiters[key]
+                waiters.discard(wake)
+                if not waiters:
+                    del self._waiters[key]
+
+    def stats(self):
+        with self._lock:
+            stats = {
+                "subscribers": sum(len(waiters) for waiters in self._waiters.values()),
+                "filters": len(self._waiters),
+                "buffered": len(self._events),
+                **self._stats,
+            }
+        stats["listener"] = self._listener.stats() if self._listener else None
+        return stats
+
+
+def _wake_all(waiters):
+    for wake in waiters:
+        wake.set()
+
+
+def purge_events():
+    """
+    Delete change events older than CHANGE_EVENTS_RETENTION; clients can't resume past that.
+    """
+    try:
+        with get_conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    DELETE FROM grfp_change_events
+                    WHERE created_at < now() - make_interval(secs => %s)
+                """, (CHANGE_EVENTS_RETENTION,))
+                deleted = cur.rowcount
+            conn.commit()
+        if deleted:
+            logger.info(f"Purged {deleted} change events")
+        return deleted
+    except Exception as e:
+        logger.error(f"Change events purge failed: {e}", exc_info=True)
+        return None
+
+
+broker = ChangeBroker()
+register_metrics("change_stream", broker.stats)
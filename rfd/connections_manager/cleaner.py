@@ -1,17 +1,44 @@
+import time
+
 from tech_utils.logger import init_logger
 logger = init_logger(name="Cleaner", component="cm")
 
 from tech_utils.db import get_conn, update_versioned
-from rfd.connections_manager.tailscale_manager import remove_from_tailnet
+from rfd.config import VPN_PENDING_TIMEOUT
+from rfd.connections_manager.teardown_outbox import enqueue_teardown, drain_outbox
+from rfd.connections_manager.live_cache import live_cache
+
+
+def end_session(conn, session_id, result):
+    """
+    Set the final status of an in-progress session, deactivate its VPN connection and queue
+    removal of its device from the Tailnet. Runs in the caller's transaction (no commit).
+    """
+    with conn.cursor() as cur:
+        # Get hostname of the VPN connection associated with the session
+        cur.execute("""
+            SELECT hostname, key_id
+            FROM vpn_connections
+            WHERE parent_id = %s
+            AND valid_to IS NULL
+        """, (session_id,))
+        row = cur.fetchone()
+
+    vpn_hostname = None
+    if row:
+        vpn_hostname, vpn_key_id = row
+        enqueue_teardown(conn, vpn_hostname, vpn_key_id)
+    update_versioned(conn, 'grfp_sessions', {'session_id': session_id}, {'status': result}, commit=False)
+    update_versioned(conn, 'vpn_connections', {'parent_id': session_id}, {'is_active_flg': False}, commit=False)
+    return vpn_hostname
 
 
 def clean_session(session_id, result):
     """
     Cleans up a session by updating its status and VPN connection in the database,
-    and removing the associated device from the Tailnet.
+    and queueing removal of the associated device from the Tailnet (same transaction).
     """
     logger.info(f"Cleaning session {session_id} in DB")
-    vpn_hostname = None
 
     try:
         with get_conn() as conn:
@@ -35,29 +62,12 @@ def clean_session(session_id, result):
                     logger.error(f"Session {session_id} is not in progress")
                     return False
 
-                # Get hostname of the VPN connection associated with the session
-                cur.execute(f"""
-                    SELECT hostname
-                    FROM vpn_connections
-                    WHERE parent_id = %s
-                    AND valid_to IS NULL      
-                """, (session_id,))
-                
-                row = cur.fetchone()
-                if row:
-                    vpn_hostname = row[0]
-        
-        # Update session and VPN connection statuses
-        update_versioned(conn, 'grfp_sessions', {'session_id': session_id}, {'status': result})
-        update_versioned(conn, 'vpn_connections', {'parent_id': session_id}, {'is_active_flg': False})
-
-        logger.info("DB updates finished. Clearing tailnet")
-
-        # Remove device from the Tailnet if hostname is found
-        if vpn_hostname:
-            remove_from_tailnet(vpn_hostname)
+            # Queue Tailnet removal and update session and VPN connection statuses in one transaction
+            vpn_hostname = end_session(conn, session_id, result)
+            conn.commit()
+        live_cache.invalidate_session(session_id)
 
-        logger.info(f"Session {session_id} cleaned. Hostname {vpn_hostname} removed from Tailnet")
+        logger.info(f"Session {session_id} cleaned. Removal of hostname {vpn_hostname} from Tailnet queued")
 
         return True
     
@@ -66,67 +76,84 @@ def clean_session(session_id, result):
         return
 
 
+def abort_duplicate_sessions():
+    """
+    Abort all but the latest in-progress session of each mission.
+    start-session supersedes the previous session itself; this only resolves duplicates
+    created before that, so the one-live-session-per-mission index can be built.
+    """
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                WITH sorted_sessions AS (
+                    SELECT *,
+                           ROW_NUMBER() OVER (
+                               PARTITION BY mission_id
+                               ORDER BY valid_from DESC
+                           ) AS row_num
+                    FROM grfp_sessions
+                    WHERE valid_to IS NULL
+                    and status = 'in progress'
+                )
+                SELECT session_id
+                FROM sorted_sessions
+                WHERE row_num > 1
+            """)
+            duplicates = [row[0] for row in cur.fetchall()]
+
+    aborted = sum(bool(clean_session(session_id, 'abort')) for session_id in duplicates)
+    if duplicates:
+        logger.info(f"Aborted {aborted} of {len(duplicates)} duplicate sessions")
+    return aborted
+
+
 def cleaner():
     """
     Periodic background job to clean:
-    - Duplicate active sessions (keeping only the latest per mission)
-    - Expired VPN connections
+    - Abandoned pending VPN connection reservations
+    and then tears down the queued Tailnet removals in batches.
+    Expired VPN connections are handled by the expiry scheduler (expiry.py), duplicate
+    sessions can't occur (start-session supersedes the mission's previous session).
     """
+    start = time.monotonic()
+    pending = []
     try:
         with get_conn() as conn:
             with conn.cursor() as cur:
-                # Find sessions that are duplicates (not the latest per mission)
+                # Find reservations that never got activated (crash or failure between reserve and activate)
                 cur.execute("""
-                    WITH sorted_sessions AS (
-                        SELECT *,
-                               ROW_NUMBER() OVER (
-                                   PARTITION BY mission_id
-                                   ORDER BY valid_from DESC
-                               ) AS row_num
-                        FROM grfp_sessions
-                        WHERE valid_to IS NULL
-                        and status = 'in progress'
-                    )
-                    SELECT session_id
-                    FROM sorted_sessions
-                    WHERE row_num > 1
-                """)
-                sessions1 = cur.fetchall()
-
-                # Combine session IDs to clean
-                to_delete = {row[0] for row in sessions1}
-
-                # Clean each session
-                logger.info("Start cleaning sessions")
-                counter = 0
-                if to_delete:
-                    for sess in to_delete:
-                        counter += clean_session(sess, 'abort')
-                    logger.info(f"cleaned {len(to_delete)} sessions\n")
-                else:
-                    logger.info("No sessions to clean")
-
-                # Find expired VPN connections associated with sessions
-                logger.info("Start cleaning VPN connections")
-                cur.execute("""
-                    SELECT parent_id
-                    FROM vpn_connections
-                    WHERE valid_to IS NULL
-                    AND now() > token_expires_at
-                    AND parent_name = 'session_id'
-                    AND is_active_flg = TRUE
-                """)
-                sessions2 = cur.fetchall()
-
-                for row in sessions2:
-                    id = row[0]
-                    update_versioned(conn, 'vpn_connections', {'parent_id': id}, {'is_active_flg': False})
-                logger.info("Cleaning VPN connections finished")
-                
+                    SELECT p.connection_id, p.hostname,
+                           EXISTS (
+                               SELECT 1 FROM vpn_connections a
+                               WHERE a.hostname = p.hostname
+                               AND a.valid_to IS NULL
+                               AND a.is_active_flg = TRUE
+                           ) AS hostname_in_use
+                    FROM vpn_connections p
+                    WHERE p.valid_to IS NULL
+                    AND p.status = 'pending'
+                    AND p.valid_from < now() - %s * interval '1 second'
+                """, (VPN_PENDING_TIMEOUT,))
+                pending = cur.fetchall()
+
+                for connection_id, hostname, hostname_in_use in pending:
+                    # A key may have been issued for the reservation; don't touch hostnames that are live again
+                    if not hostname_in_use:
+                        enqueue_teardown(conn, hostname)
+                    update_versioned(conn, 'vpn_connections', {'connection_id': connection_id}, {'status': 'failed'})
+                if pending:
+                    logger.info(f"Resolved {len(pending)} abandoned VPN connection reservations")
 
     except Exception as e:
         logger.error(f"[!] Error cleaner job: {e}\n")
 
+    # Tear down everything queued above (and by endpoints) with one inventory fetch per batch
+    teardown = drain_outbox()
+    logger.info(
+        f"Cleaner run finished in {time.monotonic() - start:.2f}s: "
+        f"{len(pending)} reservations resolved, teardown: {teardown}"
+    )
+
 
 if __name__ == '__main__':
     cleaner()
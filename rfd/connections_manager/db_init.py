@@ -1,5 +1,7 @@
-from tech_utils.db import get_conn
+from tech_utils.db import get_conn, install_change_events
+from tech_utils.job_runner import install_job_runs
 from tech_utils.logger import init_logger
+from rfd.connections_manager.cleaner import abort_duplicate_sessions
 logger = init_logger(name="DBInit", component="cm")
 
 def db_init():
@@ -24,15 +26,21 @@ def db_init():
                     CREATE UNIQUE INDEX IF NOT EXISTS uq_active_session_id ON grfp_sessions(session_id)
                     WHERE valid_to IS NULL;
 
+                    -- RFD MM /export reads valid_from windows in (valid_from, id) order
+                    CREATE INDEX IF NOT EXISTS idx_sessions_valid_from ON grfp_sessions(valid_from, id);
+
                     -- Create the vpn_connections table to track issued VPN credentials
                     CREATE TABLE IF NOT EXISTS vpn_connections (
                         id SERIAL PRIMARY KEY,                                -- Internal row ID
+                        connection_id UUID,                                   -- Logical connection identifier (stable across versions)
                         tag VARCHAR,                                          -- Role: "client" or "gcs"
                         parent_id VARCHAR NOT NULL,                           -- Related mission_id or session_id
                         parent_name VARCHAR NOT NULL,                         -- Field name of parent_id ("mission_id" or "session_id")
                         hostname VARCHAR NOT NULL,                            -- Tailscale hostname
-                        token_hash VARCHAR NOT NULL,                          -- Hashed version of the issued token
-                        token_expires_at TIMESTAMPTZ NOT NULL,                -- Token expiration timestamp
+                        token_hash VARCHAR,                                   -- Hashed version of the issued token (NULL while pending)
+                        key_id VARCHAR,                                       -- Tailscale auth key ID
+                        token_expires_at TIMESTAMPTZ,                         -- Token expiration timestamp (NULL while pending)
+                        status VARCHAR(32) DEFAULT 'active',                  -- Issuing state: pending, active, failed
                         is_active_flg BOOLEAN NOT NULL DEFAULT true,          -- Logical deletion flag (false = inactive)
                         created_at TIMESTAMPTZ DEFAULT now(),                 -- Creation timestamp
                         valid_from TIMESTAMPTZ NOT NULL DEFAULT now(),        -- Versioning start timestamp
@@ -43,8 +51,72 @@ def db_init():
                     -- Unique index to enforce only one active version per VPN connection
                     CREATE UNIQUE INDEX IF NOT EXISTS uq_active_vpn_mission ON vpn_connections(id)
                     WHERE valid_to IS NULL;
+
+                    -- Columns added after the initial release
+                    ALTER TABLE vpn_connections ADD COLUMN IF NOT EXISTS key_id VARCHAR;
+                    ALTER TABLE vpn_connections ADD COLUMN IF NOT EXISTS connection_id UUID;
+                    ALTER TABLE vpn_connections ADD COLUMN IF NOT EXISTS status VARCHAR(32) DEFAULT 'active';
+                    ALTER TABLE vpn_connections ALTER COLUMN token_hash DROP NOT NULL;
+                    ALTER TABLE vpn_connections ALTER COLUMN token_expires_at DROP NOT NULL;
+                    ALTER TABLE grfp_sessions ADD COLUMN IF NOT EXISTS last_heartbeat_at TIMESTAMPTZ;
+
+                    -- One active version per logical connection; lookup of abandoned reservations
+                    CREATE UNIQUE INDEX IF NOT EXISTS uq_active_vpn_connection_id ON vpn_connections(connection_id)
+                    WHERE valid_to IS NULL;
+                    CREATE INDEX IF NOT EXISTS idx_vpn_pending ON vpn_connections(valid_from)
+                    WHERE valid_to IS NULL AND status = 'pending';
+
+                    -- Upcoming expiries of active connections (expiry scheduler load and safety sweep)
+                    CREATE INDEX IF NOT EXISTS idx_vpn_expiry ON vpn_connections(token_expires_at)
+                    WHERE valid_to IS NULL AND is_active_flg = TRUE;
+
+                    -- Sessions tracked by heartbeat, reloaded after a restart
+                    CREATE INDEX IF NOT EXISTS idx_sessions_heartbeat ON grfp_sessions(last_heartbeat_at)
+                    WHERE valid_to IS NULL AND status = 'in progress' AND last_heartbeat_at IS NOT NULL;
+
+                    -- Outbox of Tailnet teardown intents, drained by a background worker pool
+                    CREATE TABLE IF NOT EXISTS tailnet_teardown_outbox (
+                        id BIGSERIAL PRIMARY KEY,                             -- Internal row ID
+                        hostname VARCHAR NOT NULL,                            -- Tailscale hostname to remove
+                        key_id VARCHAR,                                       -- Tracked auth key ID to revoke
+                        status VARCHAR(16) NOT NULL DEFAULT 'pending',        -- pending, done, dead, superseded
+                        attempts INT NOT NULL DEFAULT 0,                      -- Number of processing attempts
+                        next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT now(),   -- When the intent may be claimed next
+                        last_error TEXT,                                      -- Error of the last failed attempt
+                        created_at TIMESTAMPTZ DEFAULT now(),                 -- Creation timestamp
+                        updated_at TIMESTAMPTZ DEFAULT now()                  -- Last status change
+                    );
+
+                    -- At most one pending intent per hostname/key (idempotent enqueue)
+                    CREATE UNIQUE INDEX IF NOT EXISTS uq_outbox_pending ON tailnet_teardown_outbox(hostname, (COALESCE(key_id, '')))
+                    WHERE status = 'pending';
+                    CREATE INDEX IF NOT EXISTS idx_outbox_due ON tailnet_teardown_outbox(next_attempt_at)
+                    WHERE status = 'pending';
+
+                    -- Auth keys waiting in a process' key pool, refreshed by their owner (see key_pool.py)
+                    CREATE TABLE IF NOT EXISTS tailnet_pool_keys (
+                        key_id VARCHAR PRIMARY KEY,                           -- Tailscale auth key ID
+                        tag VARCHAR NOT NULL,                                 -- Pool tag: "gcs" or "client"
+                        expires_at TIMESTAMPTZ NOT NULL,                      -- Key expiration
+                        seen_at TIMESTAMPTZ NOT NULL DEFAULT now()            -- Last refresh by the owning process
+                    );
                 """)
+
+                # Run history of scheduled jobs
+                install_job_runs(cur)
+
+                # Session status changes are pushed to /change-stream subscribers
+                install_change_events(cur, "grfp_sessions")
                 conn.commit()
                 logger.info("RFDCM tables created")
+
+            # One live session per mission, enforced once duplicates from older versions are resolved
+            abort_duplicate_sessions()
+            with conn.cursor() as cur:
+                cur.execute("""
+                    CREATE UNIQUE INDEX IF NOT EXISTS uq_live_session_per_mission ON grfp_sessions(mission_id)
+                    WHERE valid_to IS NULL AND status = 'in progress';
+                """)
+                conn.commit()
         except Exception as e:
             logger.error(f"Error while creating RFDCM tables: {e}")
@@ -0,0 +1,94 @@
+import threading
+import time
+
+from tech_utils.logger import init_logger
+logger = init_logger(name="DeviceWatcher", component="cm")
+
+from tech_utils.metrics import register_metrics
+from rfd.config import TAILSCALE_IP_POLL_INTERVAL
+from rfd.connections_manager.tailscale_manager import get_devices
+
+
+def _is_online(device):
+    # Devices without addresses are still registering; connectedToControl is reported when available
+    return bool(device.get("addresses")) and device.get("connectedToControl", True) is not False
+
+
+class DeviceWatcher:
+    """
+    One shared poll loop over the Tailnet device list, serving any number of waiters.
+
+    The loop only runs while someone is waiting: the first waiter starts it,
+    and it stops after a poll that finds no waiters left.
+    """
+
+    def __init__(self, interval=TAILSCALE_IP_POLL_INTERVAL):
+        self.interval = interval
+        self._cond = threading.Condition()
+        self._waiting = {}     # hostname -> number of waiters
+        self._online = {}      # hostname -> device, from the last poll
+        self._running = False
+        self._stats = {"polls": 0, "poll_errors": 0, "served": 0, "timeouts": 0}
+
+    def _poll_loop(self):
+        while True:
+            with self._cond:
+                if not self._waiting:
+                    self._running = False
+                    return
+
+            try:
+                devices = get_devices(raise_errors=True)
+                online = {d.get("hostname"): d for d in devices if _is_online(d)}
+                with self._cond:
+                    self._online = online
+                    self._stats["polls"] += 1
+                    self._cond.notify_all()
+            except Exception as e:
+                with self._cond:
+                    self._stats["poll_errors"] += 1
+                logger.warning(f"Device poll failed: {e}")
+
+            time.sleep(self.interval)
+
+    def wait_for(self, hostname, timeout):
+        """
+        Block until the hostname's device is online or the timeout expires.
+
+        Returns:
+            dict: the device (with 'addresses'), or None on timeout.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._waiting[hostname] = self._waiting.get(hostname, 0) + 1
+            if not self._running:
+                # The last snapshot may be stale once the loop has stopped
+                self._online = {}
+                self._running = True
+                threading.Thread(target=self._poll_loop, name="DeviceWatcher", daemon=True).start()
+            try:
+                while hostname not in self._online:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        return None
+                    self._cond.wait(remaining)
+                self._stats["served"] += 1
+                return self._online[hostname]
+            finally:
+                self._waiting[hostname] -= 1
+                if not self._waiting[hostname]:
+                    del self._waiting[hostname]
+
+    def stats(self):
+        with self._cond:
+            return {
+                "running": self._running,
+                "waiters": sum(self._waiting.values()),
+                "hostnames": len(self._waiting),
+                **self._stats,
+            }
+
+
+watcher = DeviceWatcher()
+register_metrics("device_watcher", watcher.stats)
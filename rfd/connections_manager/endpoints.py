@@ -1,21 +1,35 @@
 # rfd_server.py
 
-from flask import request, jsonify
+from flask import request, jsonify, current_app, redirect
 import uuid
+import json
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlencode, urlsplit
 
 from tech_utils.logger import init_logger
 logger = init_logger(name="CMEndpoints", component="cm")
 
-from tech_utils.db import get_conn, update_versioned
-from rfd.connections_manager.token_manager import create_token
-from rfd.connections_manager.tailscale_manager import remove_from_tailnet
+from psycopg2.extras import execute_values
+from tech_utils.db import get_conn, update_versioned, update_versioned_batch
+from tech_utils.metrics import collect_metrics, register_metrics
+from tech_utils.idempotency import IdempotencyStore, IdempotencyConflict
+from tech_utils.circuit_breaker import CircuitOpenError
+from rfd.connections_manager.key_pool import issue_token
+from rfd.connections_manager.token_manager import make_hostname
+from rfd.connections_manager.tailscale_manager import is_device_joined
+from rfd.connections_manager.device_watcher import watcher
+from rfd.connections_manager.change_stream import parse_filter
+from rfd.connections_manager.stream_server import STREAM_PATH
+from rfd.connections_manager.heartbeat import tracker as heartbeats
+from rfd.connections_manager.live_cache import live_cache
+from rfd.connections_manager.expiry import schedule_expiry
+from rfd.connections_manager.cleaner import end_session
+from rfd.connections_manager.teardown_outbox import enqueue_teardown, drain_outbox_async
 
 import base64
-from cryptography.hazmat.primitives import serialization
-from cryptography.hazmat.primitives.asymmetric import padding
-from cryptography.hazmat.primitives import hashes
+from rfd.connections_manager.pubkey_cache import load_public_key, PublicKeyError
 
-from rfd.config import GCS_PROOF_TOKENS_FILE, GCS_PROOF_TOKEN_BASE
+from rfd.config import GCS_PROOF_TOKENS_FILE, GCS_PROOF_TOKEN_BASE, IDEMPOTENCY_TTL, IDEMPOTENCY_MAX_ENTRIES, TOKEN_EXPIRE_TMP, DEVICE_WAIT_MAX, CHANGE_STREAM_PORT, HEARTBEAT_TIMEOUT, SESSION_BATCH_MAX
 import hashlib
 
 # === Endpoint for registering a new GCS by generating a unique proof token ===
@@ -42,11 +56,37 @@ def register_gcs():
     logger.info("GCS registered successfully")
     return jsonify({"status": "ok", "gcs_proof_token": gcs_proof_token}), 200
 
+# Retries of get-vpn-connection with the same Idempotency-Key replay the first response.
+# Server errors are not stored, so they can be retried for real.
+_idempotency = IdempotencyStore(IDEMPOTENCY_TTL, IDEMPOTENCY_MAX_ENTRIES, cacheable=lambda result: result[1] < 500)
+register_metrics("idempotency", _idempotency.stats)
+
+
 # === Endpoint to request VPN connection for a client or GCS ===
 def get_vpn_connection():
     logger.info("get-vpn-connection request received")
     data = request.get_json()
 
+    idempotency_key = request.headers.get("Idempotency-Key")
+    if not idempotency_key or not isinstance(data, dict):
+        return _issue_vpn_connection(data)
+
+    # Scope the key to the requester: the stored token is encrypted to their public key
+    requester = hashlib.sha256(f"{data.get('rsa_pub_key', '')}|{data.get('gcs_proof_token', '')}".encode()).hexdigest()
+    fingerprint = hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+    def issue():
+        response, status = _issue_vpn_connection(data)
+        return response.get_data(), status
+
+    try:
+        body, status = _idempotency.run((idempotency_key, requester), fingerprint, issue)
+    except IdempotencyConflict as e:
+        return jsonify({"status": "error", "reason": str(e)}), 422
+    return current_app.response_class(body, status=status, mimetype="application/json")
+
+
+def _issue_vpn_connection(data):
     # Validate basic request structure
     required = ["tag"]
     if not data or not all(k in data for k in required):
@@ -58,9 +98,9 @@ def get_vpn_connection():
         return jsonify({"status": "error", "reason": "Missing public key"}), 400
 
     try:
-        public_key = serialization.load_pem_public_key(public_pem.encode())
-    except ValueError:
-        return jsonify({"status": "error", "reason": "Invalid public key format"}), 400
+        public_key, oaep = load_public_key(public_pem)
+    except PublicKeyError as e:
+        return jsonify({"status": "error", "reason": str(e)}), 400
 
     tag = data.get("tag")
 
@@ -79,68 +119,210 @@ def get_vpn_connection():
     elif tag == "client":
         if not data.get("mission_id"):
             return jsonify({"status": "error", "reason": "Missing mission_id"}), 400
-        parent_id = data["mission_id"]
+        try:
+            # Canonical spelling, so cache entries match the change events' mission_id
+            parent_id = str(uuid.UUID(str(data["mission_id"])))
+        except ValueError:
+            return jsonify({"status": "error", "reason": "Invalid mission_id"}), 400
         parent_name = "mission_id"
 
     else:
         return jsonify({"status": "error", "reason": "Invalid tag"}), 400
 
+    connection_id = str(uuid.uuid4())
     try:
+        # Step 1: short transaction - validate and reserve a pending connection record
         with get_conn() as conn:
             with conn.cursor() as cur:
-                # Check if mission exists and is in progress
-                cur.execute(f"""
-                    SELECT * FROM grfp_missions WHERE {parent_name} = %s
-                    AND status = 'in progress'
-                    AND valid_to IS NULL
-                    """, (parent_id,))
-                row = cur.fetchone()
-                if not row:
+                # Check if mission exists and is in progress (cached while it stays so)
+                if not live_cache.is_mission_active(cur, parent_name, parent_id):
                     return jsonify({"status": "error", "reason": "Missions not found"}), 403
 
                 # If client, fetch current session
                 if tag == 'client':
-                    cur.execute("""
-                        SELECT session_id
-                        FROM grfp_sessions
-                        WHERE valid_to IS NULL
-                        AND mission_id = %s
-                        AND status = 'in progress'
-                        ORDER BY valid_from DESC
-                        LIMIT 1
-                                """, (parent_id,))
-                    row = cur.fetchone()
-                    if not row:
+                    session_id = live_cache.current_session(cur, parent_id)
+                    if not session_id:
                         return jsonify({"status": "error", "reason": "No active sessions"}), 403
 
                     parent_name = 'session_id'
-                    parent_id = row[0]
+                    parent_id = session_id
                     hostname_base = parent_id
 
-                # Generate token and store VPN connection in DB
-                token, token_hash, expires, hostname = create_token(hostname_base, tag)
-                cur.execute("""
-                INSERT INTO vpn_connections (parent_id, parent_name, token_hash, hostname, tag, token_expires_at)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                """, (parent_id, parent_name, token_hash, hostname, tag, expires))
-                conn.commit()
+                hostname = make_hostname(hostname_base, tag)
 
-                # Encrypt token with public key
-                encrypted_token = public_key.encrypt(
-                    token.encode(),
-                    padding.OAEP(mgf=padding.MGF1(algorithm=hashes.SHA256()), algorithm=hashes.SHA256(), label=None)
-                )
+                # An active lease of the same session/station and tag is renewed instead of minting
+                # a new key, but only for a caller presenting its current token_hash
+                lease = None
+                if data.get("token_hash"):
+                    cur.execute("""
+                        SELECT connection_id
+                        FROM vpn_connections
+                        WHERE hostname = %s AND tag = %s AND parent_id = %s AND token_hash = %s
+                        AND valid_to IS NULL AND is_active_flg = TRUE AND status = 'active'
+                        ORDER BY valid_from DESC
+                        LIMIT 1
+                        """, (hostname, tag, parent_id, data["token_hash"]))
+                    lease = cur.fetchone()
+
+                if not lease:
+                    _reserve_connection(cur, connection_id, parent_id, parent_name, hostname, tag)
+                conn.commit()
 
-                encrypted_b64 = base64.b64encode(encrypted_token).decode()
+        # Step 1b: no transaction open - renew in place while the device is still joined
+        if lease:
+            expires = _renew_lease(lease[0], hostname)
+            if expires:
+                logger.info(f"get-vpn-connection renewed lease of {hostname} until {expires}")
+                return jsonify({
+                    "status": "ok", "renewed": True, "hostname": hostname, "expires_at": expires.isoformat(),
+                }), 200
+
+            with get_conn() as conn:
+                with conn.cursor() as cur:
+                    _reserve_connection(cur, connection_id, parent_id, parent_name, hostname, tag)
+                    conn.commit()
+
+        # Step 2: no transaction open - take a token (pooled or created via Tailscale) and encrypt it
+        try:
+            token, token_hash, expires, hostname, key_id = issue_token(hostname_base, tag)
+
+            encrypted_token = public_key.encrypt(token.encode(), oaep)
+            encrypted_b64 = base64.b64encode(encrypted_token).decode()
+        except Exception:
+            # Resolve the reservation right away instead of waiting for the cleaner
+            with get_conn() as conn:
+                update_versioned(conn, 'vpn_connections', {'connection_id': connection_id}, {'status': 'failed'})
+            raise
+
+        # Step 3: short transaction - activate the reserved record
+        with get_conn() as conn:
+            update_versioned(conn, 'vpn_connections', {'connection_id': connection_id}, {
+                'status': 'active',
+                'is_active_flg': True,
+                'token_hash': token_hash,
+                'key_id': key_id,
+                'token_expires_at': expires,
+            })
+        schedule_expiry(connection_id, expires)
 
         logger.info(f"get-vpn-connection succeeded for {hostname}")
         return jsonify({"status": "ok", "token": encrypted_b64, "hostname": hostname, "token_hash": token_hash}), 200
 
+    except CircuitOpenError as e:
+        logger.warning(f"get-vpn-connection rejected: {e}")
+        return jsonify({"status": "error", "reason": "Tailscale temporarily unavailable, retry later"}), 503
+
     except Exception as e:
         logger.error(f"Exception in get-vpn-connection: {e}", exc_info=True)
         return jsonify({"status": "error", "reason": "Internal server error"}), 500
 
-# === Endpoint to deactivate VPN connection and remove from tailnet ===
+def _reserve_connection(cur, connection_id, parent_id, parent_name, hostname, tag):
+    """
+    Insert a pending connection record (activated once a key is issued).
+    """
+    cur.execute("""
+        INSERT INTO vpn_connections (connection_id, parent_id, parent_name, hostname, tag, status, is_active_flg)
+        VALUES (%s, %s, %s, %s, %s, 'pending', FALSE)
+        """, (connection_id, parent_id, parent_name, hostname, tag))
+
+
+def _renew_lease(connection_id, hostname):
+    """
+    Extend the lease of an active connection by TOKEN_EXPIRE_TMP if its device is still joined.
+    The row is re-versioned; no Tailscale key is created.
+
+    Returns:
+        datetime: new expiration, or None if the device is gone (a new key is needed).
+    """
+    try:
+        joined = is_device_joined(hostname)
+    except Exception as e:
+        logger.warning(f"Could not check whether {hostname} is joined: {e}")
+        return None
+    if not joined:
+        return None
+
+    expires = datetime.now(timezone.utc) + timedelta(seconds=TOKEN_EXPIRE_TMP)
+    with get_conn() as conn:
+        update_versioned(conn, 'vpn_connections', {'connection_id': connection_id}, {'token_expires_at': expires})
+    schedule_expiry(connection_id, expires)
+    return expires
+
+
+# === Endpoint to renew the lease of an active VPN connection without a new key ===
+def renew_vpn_connection():
+    logger.info("renew-vpn-connection request received")
+    data = request.get_json()
+    required = ["hostname", "token_hash"]
+    if not data or not all(k in data for k in required):
+        return jsonify({"status": "error", "reason": "Missing parameters"}), 400
+
+    hostname = data.get("hostname")
+    token_hash = data.get("token_hash")
+
+    try:
+        with get_conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT connection_id FROM vpn_connections
+                    WHERE hostname = %s AND token_hash = %s
+                    AND is_active_flg = TRUE AND valid_to IS NULL
+                    """, (hostname, token_hash))
+                row = cur.fetchone()
+                if not row:
+                    return jsonify({"status": "error", "reason": "No active connections"}), 403
+
+        expires = _renew_lease(row[0], hostname)
+        if not expires:
+            return jsonify({"status": "error", "reason": "Device not joined, request a new connection"}), 409
+
+        logger.info(f"renew-vpn-connection succeeded for {hostname} until {expires}")
+        return jsonify({"status": "ok", "hostname": hostname, "expires_at": expires.isoformat()}), 200
+
+    except Exception as e:
+        logger.error(f"Exception in renew-vpn-connection for {hostname}: {e}", exc_info=True)
+        return jsonify({"status": "error", "reason": "Internal server error"}), 500
+
+
+# === Long-poll endpoint: wait until a device is online and return its Tailscale IPs ===
+def wait_for_device():
+    logger.info("wait-for-device request received")
+    data = request.get_json(silent=True) or {}
+    hostname = data.get("hostname")
+    if not hostname:
+        return jsonify({"status": "error", "reason": "Missing hostname"}), 400
+
+    try:
+        timeout = min(float(data.get("timeout", DEVICE_WAIT_MAX)), DEVICE_WAIT_MAX)
+    except (TypeError, ValueError):
+        return jsonify({"status": "error", "reason": "Invalid timeout"}), 400
+
+    try:
+        # Only hostnames of live connections can be waited for
+        with get_conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT 1 FROM vpn_connections
+                    WHERE hostname = %s AND valid_to IS NULL
+                    AND (is_active_flg = TRUE OR status = 'pending')
+                    LIMIT 1
+                    """, (hostname,))
+                if not cur.fetchone():
+                    return jsonify({"status": "error", "reason": "No active connections"}), 403
+
+        # Served from the shared device watcher: many waiters, one upstream poll loop
+        device = watcher.wait_for(hostname, timeout)
+        if not device:
+            return jsonify({"status": "ok", "online": False, "hostname": hostname}), 200
+
+        return jsonify({"status": "ok", "online": True, "hostname": hostname, "ips": device.get("addresses", [])}), 200
+
+    except Exception as e:
+        logger.error(f"Exception in wait-for-device for {hostname}: {e}", exc_info=True)
+        return jsonify({"status": "error", "reason": "Internal server error"}), 500
+
+
+# === Endpoint to deactivate VPN connection and queue its removal from tailnet ===
 def delete_vpn_connection():
     logger.info("delete-vpn-connection request received")
     data = request.get_json()
@@ -156,7 +338,7 @@ def delete_vpn_connection():
             with conn.cursor() as cur:
                 # Validate active connection exists
                 cur.execute("""
-                    SELECT * FROM vpn_connections
+                    SELECT key_id FROM vpn_connections
                     WHERE hostname = %s AND token_hash = %s
                     AND is_active_flg = TRUE AND valid_to IS NULL
                     """, (hostname, token_hash))
@@ -164,9 +346,14 @@ def delete_vpn_connection():
                 if not row:
                     return jsonify({"status": "error", "reason": "No active connections"}), 403
 
-                # Remove from Tailscale and deactivate in DB
-                remove_from_tailnet(hostname)
-                update_versioned(conn, 'vpn_connections', {'token_hash': token_hash, 'hostname': hostname}, {'is_active_flg': False})
+                key_id = row[0]
+
+            # Deactivate in DB and record the teardown intent in the same transaction
+            enqueue_teardown(conn, hostname, key_id)
+            update_versioned(conn, 'vpn_connections', {'token_hash': token_hash, 'hostname': hostname}, {'is_active_flg': False})
+
+        # Tailnet removal happens in the outbox worker; start it now instead of waiting for the next poll
+        drain_outbox_async()
 
         logger.info(f"delete-vpn-connection succeeded for {hostname}")
         return jsonify({"status": "ok"}), 200
@@ -195,25 +382,47 @@ def start_session():
 
         with get_conn() as conn:
             with conn.cursor() as cur:
-                # Check mission exists and is active
+                # Check mission exists and is active; the row lock serializes session starts of the mission
                 cur.execute("""
-                    SELECT * FROM grfp_missions WHERE mission_id = %s
+                    SELECT 1 FROM grfp_missions WHERE mission_id = %s
                     AND status = 'in progress' AND valid_to IS NULL
+                    FOR UPDATE
                     """, (mission_id,))
                 row = cur.fetchone()
                 if not row:
                     return jsonify({"status": "error", "reason": "Mission not found"}), 403
 
+                # One live session per mission: the new session supersedes the previous one
+                cur.execute("""
+                    SELECT session_id FROM grfp_sessions
+                    WHERE mission_id = %s AND valid_to IS NULL AND status = 'in progress'
+                    """, (mission_id,))
+                live = [str(r[0]) for r in cur.fetchall()]
+                if str(session_id) in live:
+                    # Retried request
+                    return jsonify({"status": "ok"}), 200
+
+            for previous in live:
+                end_session(conn, previous, 'abort')
+                heartbeats.forget(previous)
+                logger.info(f"Session {previous} superseded by {session_id}")
+
+            with conn.cursor() as cur:
                 # Create new session
                 cur.execute("""
                         INSERT INTO grfp_sessions 
                         (session_id, mission_id, status)
                         VALUES (%s, %s, 'in progress')
                     """, (session_id, mission_id))
-                conn.commit()
+            conn.commit()
+        live_cache.invalidate_session(session_id, mission_id)
+
+        if live:
+            # Tear down the superseded session's device right away
+            drain_outbox_async()
 
         logger.info(f"start-session succeeded for {session_id}")
-        return jsonify({"status": "ok"}), 200
+        return jsonify({"status": "ok", "superseded": live}), 200
 
     except Exception as e:
         logger.error(f"Exception in start-session: {e}", exc_info=True)
@@ -250,6 +459,8 @@ def close_session():
 
                 # Mark session with final status
                 update_versioned(conn, 'grfp_sessions', {'session_id': session_id}, {'status': result})
+        heartbeats.forget(session_id)
+        live_cache.invalidate_session(session_id)
 
         logger.info(f"close-session succeeded for {session_id}")
         return jsonify({"status": "ok"}), 200
@@ -257,3 +468,252 @@ def close_session():
     except Exception as e:
         logger.error(f"Exception in close-session: {e}", exc_info=True)
         return jsonify({"status": "error", "reason": "Internal server error"}), 500
+
+
+
+def _parse_session_batch(data, fields):
+    """
+    Common checks of /start-sessions and /close-sessions. Every item needs `fields` and a valid
+    proof token (its own `gcs_proof_token` or the request's one); the token file is read once.
+
+    Returns:
+        tuple: (results list with None for items to process, error response or None)
+    """
+    items = data.get("sessions") if data else None
+    if not isinstance(items, list) or not items:
+        return None, (jsonify({"status": "error", "reason": "Missing parameters"}), 400)
+    if len(items) > SESSION_BATCH_MAX:
+        return None, (jsonify({"status": "error", "reason": f"At most {SESSION_BATCH_MAX} sessions per request"}), 400)
+
+    with open(GCS_PROOF_TOKENS_FILE, "r") as f:
+        proof_tokens = set(f.read().split())
+
+    results, seen = [], set()
+    for item in items:
+        if not isinstance(item, dict) or not all(item.get(k) for k in fields):
+            results.append({"status": "error", "reason": "Missing parameters"})
+            continue
+        try:
+            for k in ("session_id", "mission_id"):
+                if k in fields:
+                    item[k] = str(uuid.UUID(str(item[k])))
+        except ValueError:
+            results.append({"session_id": item.get("session_id"), "status": "error", "reason": "Invalid ID"})
+            continue
+        if item.get("gcs_proof_token", data.get("gcs_proof_token")) not in proof_tokens:
+            results.append({"session_id": item["session_id"], "status": "error", "reason": "Gcs proof token not found"})
+        elif item["session_id"] in seen:
+            results.append({"session_id": item["session_id"], "status": "error", "reason": "Duplicate session in request"})
+        else:
+            seen.add(item["session_id"])
+            results.append(None)
+    return results, None
+
+
+# === Endpoint to start many flight sessions in one transaction ===
+def start_sessions():
+    logger.info("start-sessions request received")
+    data = request.get_json()
+
+    try:
+        results, error = _parse_session_batch(data, ["session_id", "mission_id"])
+        if error:
+            return error
+        items = data["sessions"]
+        todo = [i for i, r in enumerate(results) if r is None]
+        superseded = []
+
+        if todo:
+            with get_conn() as conn:
+                with conn.cursor() as cur:
+                    # Active missions of the batch, locked in a stable order (see start_session)
+                    mission_ids = sorted({items[i]["mission_id"] for i in todo})
+                    cur.execute("""
+                        SELECT mission_id::text FROM grfp_missions
+                        WHERE mission_id = ANY(%s::uuid[]) AND status = 'in progress' AND valid_to IS NULL
+                        ORDER BY mission_id
+                        FOR UPDATE
+                        """, (mission_ids,))
+                    active = {r[0] for r in cur.fetchall()}
+                    # Live sessions of the batch's missions and current versions of the batch's session IDs
+                    cur.execute("""
+                        SELECT mission_id::text, session_id::text, status FROM grfp_sessions
+                        WHERE valid_to IS NULL
+                        AND ((mission_id = ANY(%s::uuid[]) AND status = 'in progress') OR session_id = ANY(%s::uuid[]))
+                        """, (mission_ids, [items[i]["session_id"] for i in todo]))
+                    live, existing = {}, {}
+                    for mission_id, session_id, status in cur.fetchall():
+                        existing[session_id] = (mission_id, status)
+                        if status == 'in progress':
+                            live.setdefault(mission_id, []).append(session_id)
+
+                    inserts, started, positions = [], {}, {}
+                    for i in todo:
+                        session_id, mission_id = items[i]["session_id"], items[i]["mission_id"]
+                        if mission_id not in active:
+                            results[i] = {"session_id": session_id, "status": "error", "reason": "Mission not found"}
+                        elif existing.get(session_id) == (mission_id, 'in progress'):
+                            # Retried request
+                            results[i] = {"session_id": session_id, "status": "ok", "superseded": []}
+                        elif session_id in existing:
+                            results[i] = {"session_id": session_id, "status": "error", "reason": "Session already exists"}
+                        elif mission_id in started:
+                            results[i] = {"session_id": session_id, "status": "error",
+                                          "reason": f"Mission already started in this request by {started[mission_id]}"}
+                        else:
+                            started[mission_id] = session_id
+                            positions[session_id] = i
+                            inserts.append((session_id, mission_id))
+                            results[i] = {"session_id": session_id, "status": "ok",
+                                          "superseded": live.get(mission_id, [])}
+
+                # One live session per mission (uq_live_session_per_mission): the previous sessions
+                # are ended before the new ones are inserted. A session ID inserted concurrently since
+                # the check is skipped by ON CONFLICT; the step is then undone and redone without it.
+                while inserts:
+                    with conn.cursor() as cur:
+                        cur.execute("SAVEPOINT start_sessions")
+                    previous = [s_id for _, m_id in inserts for s_id in live.get(m_id, [])]
+                    for session_id in previous:
+                        end_session(conn, session_id, 'abort')
+                    with conn.cursor() as cur:
+                        rows = execute_values(cur, """
+                            INSERT INTO grfp_sessions (session_id, mission_id, status) VALUES %s
+                            ON CONFLICT (session_id) WHERE valid_to IS NULL DO NOTHING
+                            RETURNING session_id::text
+                            """, inserts, template="(%s, %s, 'in progress')", page_size=len(inserts), fetch=True)
+                        created = {r[0] for r in rows}
+                        if len(created) == len(inserts):
+                            superseded = previous
+                            break
+                        cur.execute("ROLLBACK TO SAVEPOINT start_sessions")
+                    for session_id, _ in inserts:
+                        if session_id not in created:
+                            results[positions[session_id]] = {"session_id": session_id, "status": "error",
+                                                              "reason": "Session already exists"}
+                    inserts = [insert for insert in inserts if insert[0] in created]
+
+                for previous in superseded:
+                    heartbeats.forget(previous)
+                conn.commit()
+            for session_id, mission_id in inserts:
+                live_cache.invalidate_session(session_id, mission_id)
+
+        if superseded:
+            drain_outbox_async()
+
+        ok = sum(r["status"] == "ok" for r in results)
+        logger.info(f"start-sessions: {ok} of {len(results)} started, {len(superseded)} superseded")
+        return jsonify({"status": "ok", "results": results}), 200
+
+    except Exception as e:
+        logger.error(f"Exception in start-sessions: {e}", exc_info=True)
+        return jsonify({"status": "error", "reason": "Internal server error"}), 500
+
+
+# === Endpoint to close many sessions in one transaction ===
+def close_sessions():
+    logger.info("close-sessions request received")
+    data = request.get_json()
+
+    try:
+        results, error = _parse_session_batch(data, ["session_id", "result"])
+        if error:
+            return error
+        items = data["sessions"]
+        rows = [{"session_id": items[i]["session_id"], "status": items[i]["result"]}
+                for i, r in enumerate(results) if r is None]
+
+        closed = set()
+        if rows:
+            with get_conn() as conn:
+                with conn.cursor() as cur:
+                    # Only sessions in progress can be closed
+                    cur.execute("""
+                        SELECT session_id::text FROM grfp_sessions
+                        WHERE session_id = ANY(%s::uuid[]) AND valid_to IS NULL AND status = 'in progress'
+                        ORDER BY session_id
+                        FOR UPDATE
+                        """, ([r["session_id"] for r in rows],))
+                    in_progress = {r[0] for r in cur.fetchall()}
+
+                # Mark sessions with their final status
+                rows = [r for r in rows if r["session_id"] in in_progress]
+                closed = set(update_versioned_batch(conn, 'grfp_sessions', 'session_id', rows))
+
+        for i, r in enumerate(results):
+            if r is None:
+                session_id = items[i]["session_id"]
+                if session_id in closed:
+                    heartbeats.forget(session_id)
+                    live_cache.invalidate_session(session_id)
+                    results[i] = {"session_id": session_id, "status": "ok"}
+                else:
+                    results[i] = {"session_id": session_id, "status": "error", "reason": "Session not found"}
+
+        logger.info(f"close-sessions: {len(closed)} of {len(results)} closed")
+        return jsonify({"status": "ok", "results": results}), 200
+
+    except Exception as e:
+        logger.error(f"Exception in close-sessions: {e}", exc_info=True)
+        return jsonify({"status": "error", "reason": "Internal server error"}), 500
+
+# === Endpoint for GCS session heartbeats ===
+def session_heartbeat():
+    data = request.get_json()
+    required = ["session_id", "gcs_proof_token"]
+    if not data or not all(k in data for k in required):
+        return jsonify({"status": "error", "reason": "Missing parameters"}), 400
+
+    try:
+        session_id = str(uuid.UUID(str(data.get("session_id"))))
+    except ValueError:
+        return jsonify({"status": "error", "reason": "Invalid session_id"}), 400
+
+    try:
+        # Validate GCS proof token
+        with open(GCS_PROOF_TOKENS_FILE, "r") as f:
+            if data.get("gcs_proof_token") not in f.read().split():
+                return jsonify({"status": "error", "reason": "Gcs proof token not found"}), 400
+
+        # Only the first heartbeat of a session reads the DB; later ones are memory-only
+        if not heartbeats.is_tracked(session_id):
+            with get_conn() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("""
+                        SELECT 1 FROM grfp_sessions
+                        WHERE session_id = %s AND valid_to IS NULL AND status = 'in progress'
+                        """, (session_id,))
+                    if not cur.fetchone():
+                        return jsonify({"status": "error", "reason": "Session not found"}), 403
+
+        heartbeats.beat(session_id)
+        return jsonify({"status": "ok", "timeout": HEARTBEAT_TIMEOUT}), 200
+
+    except Exception as e:
+        logger.error(f"Exception in session-heartbeat: {e}", exc_info=True)
+        return jsonify({"status": "error", "reason": "Internal server error"}), 500
+
+# === Server-Sent Events stream of session/mission state changes ===
+def stream_changes():
+    logger.info("change-stream request received")
+    try:
+        # Browsers send Last-Event-ID on reconnect; other clients may pass it as a parameter
+        mission_id, session_id, last_event_id = parse_filter(
+            request.args.get("mission_id"), request.args.get("session_id"),
+            request.headers.get("Last-Event-ID") or request.args.get("last_event_id"))
+    except ValueError as e:
+        return jsonify({"status": "error", "reason": str(e)}), 400
+
+    # Streams are held by the event loop server (stream_server.py), not by a worker thread here.
+    # The resume point goes into the query: clients don't repeat Last-Event-ID on a redirect
+    params = {"mission_id": mission_id, "session_id": session_id, "last_event_id": last_event_id}
+    query = urlencode({name: value for name, value in params.items() if value is not None})
+    host = urlsplit(request.host_url).hostname
+    if ":" in host:
+        host = f"[{host}]"
+    return redirect(f"{request.scheme}://{host}:{CHANGE_STREAM_PORT}{STREAM_PATH}?{query}", code=307)
+
+# === Endpoint exposing internal metrics (key pool, Tailscale API scheduler, ...) ===
+def metrics():
+    return jsonify({"status": "ok", "metrics": collect_metrics()}), 200
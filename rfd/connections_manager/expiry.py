@@ -0,0 +1,193 @@
+import heapq
+import threading
+import time
+
+from tech_utils.logger import init_logger
+logger = init_logger(name="Expiry", component="cm")
+
+from tech_utils.db import get_conn
+from tech_utils.metrics import register_metrics
+from rfd.config import EXPIRY_BATCH_SIZE, EXPIRY_MAX_SLEEP
+
+# Columns copied into the new (inactive) version of an expired connection
+_VERSION_COLUMNS = "connection_id, tag, parent_id, parent_name, hostname, token_hash, key_id, token_expires_at, status, created_at"
+
+
+def expire_due(connection_ids=None, limit=EXPIRY_BATCH_SIZE):
+    """
+    Deactivate up to `limit` expired session VPN connections in one statement (versioned:
+    the current rows are closed and inactive copies inserted).
+
+    Args:
+        connection_ids (list): Only consider these connections; None takes any expired ones (safety sweep)
+        limit (int): Batch size
+
+    Returns:
+        int: number of deactivated connections
+    """
+    only_ids = "AND connection_id = ANY(%(ids)s::uuid[])" if connection_ids is not None else ""
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"""
+                WITH due AS (
+                    SELECT id FROM vpn_connections
+                    WHERE valid_to IS NULL AND is_active_flg = TRUE
+                    AND parent_name = 'session_id'
+                    AND token_expires_at <= now()
+                    {only_ids}
+                    ORDER BY token_expires_at
+                    LIMIT %(limit)s
+                    FOR UPDATE SKIP LOCKED
+                ), closed AS (
+                    UPDATE vpn_connections v SET valid_to = now()
+                    FROM due WHERE v.id = due.id
+                    RETURNING v.*
+                )
+                INSERT INTO vpn_connections ({_VERSION_COLUMNS}, is_active_flg, valid_from)
+                SELECT {_VERSION_COLUMNS}, FALSE, now() FROM closed
+            """, {"ids": [str(c) for c in connection_ids or []], "limit": limit})
+            expired = cur.rowcount
+        conn.commit()
+    return expired
+
+
+def sweep_expired():
+    """
+    Safety sweep: deactivate every expired connection, in batches.
+    Catches deadlines the scheduler missed (set by another process, clock changes, failed batches).
+    """
+    total = 0
+    try:
+        while True:
+            expired = expire_due()
+            total += expired
+            if expired < EXPIRY_BATCH_SIZE:
+                break
+        if total:
+            logger.info(f"Expiry sweep deactivated {total} VPN connections")
+    except Exception as e:
+        logger.error(f"Expiry sweep failed: {e}", exc_info=True)
+    _scheduler.record_sweep(total)
+    return total
+
+
+class ExpiryScheduler:
+    """
+    Min-heap of upcoming token_expires_at deadlines with one thread that sleeps until
+    the earliest one and deactivates due connections in batches.
+
+    - Loaded from idx_vpn_expiry at start, fed by schedule() when connections are
+      activated or renewed.
+    - A renewal re-schedules the connection; the older heap entry is skipped when it comes up.
+    - Expiring a connection that is no longer due (renewed elsewhere) is a no-op, the
+      statement re-checks token_expires_at.
+    """
+
+    def __init__(self, batch_size=EXPIRY_BATCH_SIZE, max_sleep=EXPIRY_MAX_SLEEP):
+        self.batch_size = batch_size
+        self.max_sleep = max_sleep
+        self._cond = threading.Condition()
+        self._heap = []          # (deadline timestamp, connection_id)
+        self._deadline = {}      # connection_id -> latest deadline
+        self._thread = None
+        self._stats = {"scheduled": 0, "batches": 0, "expired": 0, "errors": 0, "sweeps": 0, "swept": 0}
+
+    def schedule(self, connection_id, expires_at):
+        """Track the expiry of a connection (datetime with timezone)."""
+        connection_id = str(connection_id)
+        deadline = expires_at.timestamp()
+        with self._cond:
+            self._deadline[connection_id] = deadline
+            heapq.heappush(self._heap, (deadline, connection_id))
+            self._stats["scheduled"] += 1
+            # Wake the thread if this is the new earliest deadline
+            if self._heap[0][1] == connection_id:
+                self._cond.notify()
+
+    def load(self):
+        with get_conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT connection_id, token_expires_at FROM vpn_connections
+                    WHERE valid_to IS NULL AND is_active_flg = TRUE
+                    AND parent_name = 'session_id'
+                    AND token_expires_at IS NOT NULL AND connection_id IS NOT NULL
+                """)
+                rows = cur.fetchall()
+        for connection_id, expires_at in rows:
+            self.schedule(connection_id, expires_at)
+        logger.info(f"Expiry scheduler loaded {len(rows)} deadlines")
+
+    def start(self):
+        with self._cond:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="ExpiryScheduler", daemon=True)
+            self._thread.start()
+
+    def _next_batch(self):
+        """Block until something is due, then pop up to batch_size due connection IDs."""
+        with self._cond:
+            while True:
+                now = time.time()
+                if self._heap and self._heap[0][0] <= now:
+                    break
+                wait = self._heap[0][0] - now if self._heap else self.max_sleep
+                self._cond.wait(min(wait, self.max_sleep))
+
+            batch = []
+            while self._heap and self._heap[0][0] <= now and len(batch) < self.batch_size:
+                deadline, connection_id = heapq.heappop(self._heap)
+                if self._deadline.get(connection_id) != deadline:
+                    continue    # superseded by a later schedule()
+                del self._deadline[connection_id]
+                batch.append(connection_id)
+            return batch
+
+    def _run(self):
+        try:
+            self.load()
+        except Exception as e:
+            # The safety sweep covers connections that couldn't be loaded
+            logger.error(f"Expiry scheduler could not load deadlines: {e}", exc_info=True)
+
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                continue
+            try:
+                expired = expire_due(batch, limit=len(batch))
+                with self._cond:
+                    self._stats["batches"] += 1
+                    self._stats["expired"] += expired
+                logger.info(f"Expired {expired} of {len(batch)} due VPN connections")
+            except Exception as e:
+                with self._cond:
+                    self._stats["errors"] += 1
+                logger.error(f"Expiry batch failed, left to the safety sweep: {e}", exc_info=True)
+
+    def record_sweep(self, swept):
+        with self._cond:
+            self._stats["sweeps"] += 1
+            self._stats["swept"] += swept
+
+    def stats(self):
+        with self._cond:
+            return {
+                "pending": len(self._deadline),
+                "heap": len(self._heap),
+                "next_in": round(self._heap[0][0] - time.time(), 3) if self._heap else None,
+                **self._stats,
+            }
+
+
+_scheduler = ExpiryScheduler()
+register_metrics("expiry", _scheduler.stats)
+
+
+def schedule_expiry(connection_id, expires_at):
+    _scheduler.schedule(connection_id, expires_at)
+
+
+def start_expiry_scheduler():
+    _scheduler.start()
@@ -0,0 +1,223 @@
+import math
+import threading
+import time
+from datetime import datetime, timezone
+
+from psycopg2.extras import execute_values
+
+from tech_utils.logger import init_logger
+logger = init_logger(name="Heartbeat", component="cm")
+
+from tech_utils.db import get_conn
+from tech_utils.metrics import register_metrics
+from rfd.config import HEARTBEAT_TIMEOUT, HEARTBEAT_TICK
+from rfd.connections_manager.cleaner import clean_session
+
+
+class TimingWheel:
+    """
+    Hashed timing wheel for a single fixed timeout: O(1) schedule and reschedule,
+    expiry is detected with `tick` resolution and never early.
+    """
+
+    def __init__(self, timeout, tick):
+        self.timeout = timeout
+        self.tick = tick
+        self.size = math.ceil(timeout / tick) + 1
+        self.slots = [set() for _ in range(self.size)]
+        self.deadline_of = {}   # key -> tick index of its deadline
+        self.position = int(time.monotonic() // tick)   # last swept tick
+
+    def schedule(self, key, now):
+        """(Re)arm the timeout of key from monotonic time `now`."""
+        deadline = math.ceil((now + self.timeout) / self.tick)
+        old = self.deadline_of.get(key)
+        if old is not None:
+            self.slots[old % self.size].discard(key)
+        self.slots[deadline % self.size].add(key)
+        self.deadline_of[key] = deadline
+
+    def cancel(self, key):
+        deadline = self.deadline_of.pop(key, None)
+        if deadline is not None:
+            self.slots[deadline % self.size].discard(key)
+
+    def advance(self, now):
+        """Sweep all ticks up to monotonic time `now` and return the keys that timed out."""
+        current = int(now // self.tick)
+        # After a long pause every slot is due once
+        self.position = max(self.position, current - self.size)
+        expired = []
+        while self.position < current:
+            self.position += 1
+            slot = self.slots[self.position % self.size]
+            # Keys armed while sweeps lagged behind may be due a round later
+            due = [key for key in slot if self.deadline_of[key] <= self.position]
+            for key in due:
+                slot.discard(key)
+                del self.deadline_of[key]
+            expired.extend(due)
+        return expired
+
+    def __contains__(self, key):
+        return key in self.deadline_of
+
+    def __len__(self):
+        return len(self.deadline_of)
+
+
+class HeartbeatTracker:
+    """
+    Liveness of GCS sessions that send heartbeats.
+
+    - A heartbeat only touches memory: it re-arms the session in the timing wheel
+      and marks its last-seen time for the next batched flush.
+    - flush() writes all last-seen times accumulated since the previous flush in one UPDATE.
+    - sweep() aborts sessions silent for longer than the timeout. The DB last-seen time is
+      checked first, so a session kept alive through another process is not aborted.
+    - Sessions that never sent a heartbeat are not tracked.
+    """
+
+    def __init__(self, timeout=HEARTBEAT_TIMEOUT, tick=HEARTBEAT_TICK):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._wheel = TimingWheel(timeout, tick)
+        self._dirty = {}          # session_id -> last heartbeat (UTC) not flushed yet
+        self._loaded = False
+        self._stats = {"heartbeats": 0, "flushes": 0, "flushed": 0, "expired": 0, "aborted": 0}
+
+    def is_tracked(self, session_id):
+        with self._lock:
+            return session_id in self._wheel
+
+    def beat(self, session_id):
+        with self._lock:
+            self._wheel.schedule(session_id, time.monotonic())
+            self._dirty[session_id] = datetime.now(timezone.utc)
+            self._stats["heartbeats"] += 1
+
+    def forget(self, session_id):
+        """Stop tracking a session (closed or aborted elsewhere)."""
+        with self._lock:
+            self._wheel.cancel(session_id)
+            self._dirty.pop(session_id, None)
+
+    def load(self):
+        """
+        Track in-progress sessions that had sent heartbeats before a restart.
+        Heartbeats could not arrive while the service was down, so they get a full timeout.
+        """
+        with get_conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT session_id FROM grfp_sessions
+                    WHERE valid_to IS NULL AND status = 'in progress'
+                    AND last_heartbeat_at IS NOT NULL
+                """)
+                rows = cur.fetchall()
+        now = time.monotonic()
+        with self._lock:
+            for row in rows:
+                session_id = str(row[0])
+                if session_id not in self._wheel:
+                    self._wheel.schedule(session_id, now)
+            self._loaded = True
+        logger.info(f"Heartbeat tracking resumed for {len(rows)} sessions")
+
+    def flush(self):
+        """Write pending last-seen times to grfp_sessions in one statement. Returns the number of sessions."""
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+        if not dirty:
+            return 0
+
+        try:
+            with get_conn() as conn:
+                with conn.cursor() as cur:
+                    execute_values(cur, """
+                        UPDATE grfp_sessions s
+                        SET last_heartbeat_at = v.seen
+                        FROM (VALUES %s) AS v(session_id, seen)
+                        WHERE s.session_id = v.session_id::uuid AND s.valid_to IS NULL
+                    """, list(dirty.items()), template="(%s, %s::timestamptz)")
+                conn.commit()
+        except Exception:
+            # Keep the times for the next flush unless newer ones arrived meanwhile
+            with self._lock:
+                for session_id, seen in dirty.items():
+                    self._dirty.setdefault(session_id, seen)
+            raise
+
+        with self._lock:
+            self._stats["flushes"] += 1
+            self._stats["flushed"] += len(dirty)
+        return len(dirty)
+
+    def sweep(self):
+        """Abort sessions whose heartbeats stopped. Returns the number of aborted sessions."""
+        if not self._loaded:
+            self.load()
+
+        with self._lock:
+            expired = self._wheel.advance(time.monotonic())
+            self._stats["expired"] += len(expired)
+        if not expired:
+            return 0
+
+        try:
+            # Our own last-seen times must be in the DB before it decides
+            self.flush()
+            with get_conn() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("""
+                        SELECT session_id FROM grfp_sessions
+                        WHERE session_id = ANY(%s::uuid[])
+                        AND valid_to IS NULL AND status = 'in progress'
+                        AND last_heartbeat_at < now() - make_interval(secs => %s)
+                    """, (expired, self.timeout))
+                    silent = {str(row[0]) for row in cur.fetchall()}
+        except Exception:
+            # Check them again on the next tick
+            with self._lock:
+                retry_at = time.monotonic() - self.timeout + self._wheel.tick
+                for session_id in expired:
+                    if session_id not in self._wheel:
+                        self._wheel.schedule(session_id, retry_at)
+            raise
+
+        with self._lock:
+            # A heartbeat may have arrived since the wheel expired the session
+            silent = [s for s in silent if s not in self._wheel]
+
+        aborted = 0
+        for session_id in silent:
+            logger.warning(f"Session {session_id} sent no heartbeat for {self.timeout}s, aborting")
+            if clean_session(session_id, 'abort'):
+                aborted += 1
+        with self._lock:
+            self._stats["aborted"] += aborted
+        return aborted
+
+    def stats(self):
+        with self._lock:
+            return {"tracked": len(self._wheel), "unflushed": len(self._dirty), "timeout": self.timeout, **self._stats}
+
+
+tracker = HeartbeatTracker()
+register_metrics("heartbeats", tracker.stats)
+
+
+def flush_heartbeats():
+    try:
+        tracker.flush()
+    except Exception as e:
+        logger.error(f"Heartbeat flush failed: {e}", exc_info=True)
+
+
+def sweep_heartbeats():
+    try:
+        aborted = tracker.sweep()
+        if aborted:
+            logger.info(f"Aborted {aborted} silent sessions")
+    except Exception as e:
+        logger.error(f"Heartbeat sweep failed: {e}", exc_info=True)
@@ -0,0 +1,225 @@
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+from tech_utils.logger import init_logger
+logger = init_logger(name="KeyPool", component="cm")
+
+from tech_utils.db import get_conn
+from tech_utils.metrics import register_metrics
+from rfd.config import KEY_POOL_TAGS, KEY_POOL_SIZE, KEY_POOL_LOW_WATER, KEY_POOL_MIN_TTL, KEY_POOL_LEASE
+from rfd.connections_manager.token_manager import create_tailscale_auth_key, create_token, hash_token, make_hostname
+from rfd.connections_manager.tailscale_manager import delete_auth_key
+from rfd.connections_manager.api_scheduler import PRIORITY_BACKGROUND
+
+# === Pool state: tag -> deque of ready keys, oldest first ===
+_pools = {tag: deque() for tag in KEY_POOL_TAGS}
+_lock = threading.Lock()
+_refill_lock = threading.Lock()
+_to_revoke = []
+_stats = {"hits": 0, "misses": 0, "minted": 0, "evicted": 0}
+
+
+def _is_expiring(entry, now):
+    """
+    A pooled key is unusable once its remaining lifetime drops below KEY_POOL_MIN_TTL.
+    """
+    return entry["expires"] - now < timedelta(seconds=KEY_POOL_MIN_TTL)
+
+
+def _is_lapsed(entry):
+    """
+    A pooled key whose tailnet_pool_keys row was not refreshed within KEY_POOL_LEASE may
+    already have been revoked by the reconciler.
+    """
+    return time.monotonic() - entry["seen"] > KEY_POOL_LEASE
+
+
+def _evict_expiring(tag, now):
+    """
+    Move keys that are too close to expiry from the head of the pool, and keys whose
+    registration lapsed, to the revoke list. Caller must hold _lock. Returns the number of evicted keys.
+    """
+    evicted = 0
+    pool = _pools[tag]
+    while pool and _is_expiring(pool[0], now):
+        _to_revoke.append(pool.popleft())
+        evicted += 1
+    lapsed = [entry for entry in pool if _is_lapsed(entry)]
+    for entry in lapsed:
+        pool.remove(entry)
+        _to_revoke.append(entry)
+    evicted += len(lapsed)
+    _stats["evicted"] += evicted
+    return evicted
+
+
+def _mint(tag):
+    """
+    Create a new pooled auth key. Pooled keys don't know their hostname yet,
+    so they are described as 'pool-<tag>' and tracked by key ID.
+    Refills are background traffic and yield to interactive key creation.
+    """
+    key, exp_hours, key_id = create_tailscale_auth_key(f"pool-{tag}", tag, priority=PRIORITY_BACKGROUND)
+    return {
+        "key": key,
+        "key_id": key_id,
+        "expires": datetime.now(timezone.utc) + timedelta(hours=exp_hours),
+    }
+
+
+def _register(entry, tag):
+    """
+    Record a new pooled key in tailnet_pool_keys. The pool lives in process memory only; the row
+    tells the reconciler the key is in use, and lets it revoke keys left behind by a restart.
+    """
+    seen = time.monotonic()
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO tailnet_pool_keys (key_id, tag, expires_at) VALUES (%s, %s, %s)
+                ON CONFLICT (key_id) DO UPDATE SET seen_at = now()
+            """, (entry["key_id"], tag, entry["expires"]))
+            conn.commit()
+    entry["seen"] = seen
+
+
+def _refresh_registrations(revoked):
+    """
+    Mark the keys still waiting in this process' pool as seen, forget revoked ones and drop rows
+    nobody refreshed within KEY_POOL_LEASE (keys taken from a pool or left by a dead process).
+    """
+    with _lock:
+        entries = [entry for pool in _pools.values() for entry in pool]
+    seen = time.monotonic()
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("UPDATE tailnet_pool_keys SET seen_at = now() WHERE key_id = ANY(%s) RETURNING key_id",
+                        ([entry["key_id"] for entry in entries],))
+            refreshed = {row[0] for row in cur.fetchall()}
+            cur.execute("""
+                DELETE FROM tailnet_pool_keys
+                WHERE key_id = ANY(%s) OR seen_at < now() - %s * interval '1 second'
+            """, (revoked, KEY_POOL_LEASE))
+            conn.commit()
+    # A key whose row is gone (purged as stale) keeps its old time and is evicted as lapsed
+    for entry in entries:
+        if entry["key_id"] in refreshed:
+            entry["seen"] = seen
+
+
+def refill_pool():
+    """
+    Background job: evict expiring keys and top every tag's pool up to KEY_POOL_SIZE.
+    Concurrent calls are skipped while a refill is already running.
+    """
+    if not _refill_lock.acquire(blocking=False):
+        return
+
+    try:
+        for tag in KEY_POOL_TAGS:
+            with _lock:
+                _evict_expiring(tag, datetime.now(timezone.utc))
+                missing = KEY_POOL_SIZE - len(_pools[tag])
+
+            for _ in range(missing):
+                try:
+                    entry = _mint(tag)
+                except Exception as e:
+                    logger.error(f"Key pool refill for tag {tag} failed: {e}")
+                    break
+                try:
+                    _register(entry, tag)
+                except Exception as e:
+                    # An unregistered key would be revoked by the reconciler while still pooled
+                    logger.error(f"Key pool registration for tag {tag} failed: {e}")
+                    with _lock:
+                        _to_revoke.append(entry)
+                    break
+                with _lock:
+                    _pools[tag].append(entry)
+                    _stats["minted"] += 1
+
+            logger.debug(f"Key pool {tag}: {len(_pools[tag])} keys ready")
+
+        # Revoke evicted keys so they don't linger in the tailnet
+        with _lock:
+            evicted = _to_revoke[:]
+            _to_revoke.clear()
+        for entry in evicted:
+            try:
+                delete_auth_key(entry["key_id"])
+            except Exception as e:
+                logger.warning(f"Failed to revoke evicted pool key {entry['key_id']}: {e}")
+
+        try:
+            _refresh_registrations([entry["key_id"] for entry in evicted])
+        except Exception as e:
+            logger.error(f"Key pool registration refresh failed: {e}")
+    finally:
+        _refill_lock.release()
+
+
+def _refill_async():
+    threading.Thread(target=refill_pool, name="KeyPoolRefill", daemon=True).start()
+
+
+def take_key(tag):
+    """
+    Take a ready key for the tag from the pool.
+    Returns the pool entry (key, key_id, expires) or None if the pool is empty.
+    Triggers a background refill when the pool falls below the low-water mark.
+    """
+    if tag not in _pools:
+        return None
+
+    now = datetime.now(timezone.utc)
+    with _lock:
+        evicted = _evict_expiring(tag, now)
+        entry = _pools[tag].popleft() if _pools[tag] else None
+        low = len(_pools[tag]) < KEY_POOL_LOW_WATER
+        _stats["hits" if entry else "misses"] += 1
+
+    if low or evicted:
+        _refill_async()
+
+    return entry
+
+
+def issue_token(hostname_base, tag):
+    """
+    Same contract as create_token, but serves the key from the pool when possible
+    and falls back to live creation only when the pool is empty.
+
+    Returns:
+        tuple: (token, token_hash, expiration datetime, hostname, Tailscale key ID)
+    """
+    entry = take_key(tag)
+    if not entry:
+        logger.info(f"Key pool for {tag} is empty, creating key live")
+        return create_token(hostname_base, tag)
+
+    hostname = make_hostname(hostname_base, tag)
+    logger.info(f"Pooled key {entry['key_id']} issued to {hostname}")
+    return entry["key"], hash_token(entry["key"]), entry["expires"], hostname, entry["key_id"]
+
+
+def pooled_key_ids():
+    """
+    IDs of keys currently waiting in this process' pool.
+    """
+    with _lock:
+        return {entry["key_id"] for pool in _pools.values() for entry in pool}
+
+
+def pool_stats():
+    """
+    Current pool sizes and hit/miss counters.
+    """
+    with _lock:
+        sizes = {tag: len(pool) for tag, pool in _pools.items()}
+        return {"sizes": sizes, **_stats}
+
+
+register_metrics("key_pool", pool_stats)
@@ -0,0 +1,171 @@
+import threading
+import time
+import uuid
+
+from tech_utils.logger import init_logger
+logger = init_logger(name="LiveCache", component="cm")
+
+from tech_utils.metrics import register_metrics
+from rfd.config import LIVE_CACHE_TTL
+from rfd.connections_manager.change_stream import broker
+
+
+def _canonical_id(value):
+    """
+    Canonical UUID spelling, so upper case, braced or dash-less mission and session IDs share
+    one entry. Every key is stored, looked up and invalidated through it.
+    """
+    try:
+        return str(uuid.UUID(str(value)))
+    except ValueError:
+        return value
+
+
+class LiveStateCache:
+    """
+    In-process cache of in-progress missions (by mission_id or mission_group) and of the
+    current in-progress session of each mission.
+
+    - Only positive answers are cached; a miss always asks the DB, so a new mission or
+      session is visible immediately.
+    - Entries are dropped by grfp_missions/grfp_sessions change events (NOTIFY via the
+      change stream listener) and by this process' own write paths. A DB read that raced
+      with an invalidation is not stored. TTL is a backstop.
+    - While the change listener is disconnected invalidations can be missed, so the cache
+      is bypassed until it reconnects (and is cleared then).
+    """
+
+    def __init__(self, ttl=LIVE_CACHE_TTL, is_connected=None):
+        self.ttl = ttl
+        self.is_connected = is_connected or broker.listener_connected
+        self._lock = threading.Lock()
+        self._missions = {}        # (field, value) -> (True, expiry); field is mission_id or mission_group
+        self._sessions = {}        # mission_id -> (session_id, expiry)
+        self._version = 0          # bumped by every invalidation
+        self._stats = {"hits": 0, "misses": 0, "bypassed": 0, "invalidations": 0}
+
+    # === Invalidation ===
+    def on_change(self, event):
+        """Change stream observer: None means the listener (re)connected."""
+        if event is None:
+            self.clear()
+        elif event.get("table_name") == "grfp_missions":
+            self.invalidate_mission(event.get("mission_id"))
+        else:
+            self.invalidate_session(event.get("session_id"), event.get("mission_id"))
+
+    def clear(self):
+        with self._lock:
+            self._missions.clear()
+            self._sessions.clear()
+            self._version += 1
+            self._stats["invalidations"] += 1
+
+    def invalidate_mission(self, mission_id):
+        mission_id = _canonical_id(mission_id)
+        with self._lock:
+            self._missions.pop(("mission_id", mission_id), None)
+            # Mission events don't carry the group; groups are few
+            for key in [k for k in self._missions if k[0] == "mission_group"]:
+                del self._missions[key]
+            self._sessions.pop(mission_id, None)
+            self._version += 1
+            self._stats["invalidations"] += 1
+
+    def invalidate_session(self, session_id, mission_id=None):
+        session_id = _canonical_id(session_id)
+        with self._lock:
+            if mission_id is not None:
+                self._sessions.pop(_canonical_id(mission_id), None)
+            else:
+                for key in [m for m, (s, _) in self._sessions.items() if s == session_id]:
+                    del self._sessions[key]
+            self._version += 1
+            self._stats["invalidations"] += 1
+
+    # === Lookups ===
+    def _lookup(self, table, key):
+        """(hit, value, version) - version is what a later store() must still match."""
+        if not self.is_connected():
+            with self._lock:
+                self._stats["bypassed"] += 1
+            return False, None, None
+        now = time.monotonic()
+        with self._lock:
+            entry = table.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires > now:
+                    self._stats["hits"] += 1
+                    return True, value, None
+                del table[key]
+            self._stats["misses"] += 1
+            return False, None, self._version
+
+    def _store(self, table, key, value, version):
+        if version is None:
+            return
+        with self._lock:
+            if version == self._version:
+                table[key] = (value, time.monotonic() + self.ttl)
+
+    def is_mission_active(self, cur, field, value):
+        """
+        Whether an in-progress mission exists with mission_id/mission_group = value.
+        Misses are checked with the caller's cursor.
+        """
+        key = (field, _canonical_id(value) if field == "mission_id" else value)
+        hit, _, version = self._lookup(self._missions, key)
+        if hit:
+            return True
+        cur.execute(f"""
+            SELECT 1 FROM grfp_missions WHERE {field} = %s
+            AND status = 'in progress'
+            AND valid_to IS NULL
+            LIMIT 1
+            """, (value,))
+        active = cur.fetchone() is not None
+        if active:
+            self._store(self._missions, key, True, version)
+        return active
+
+    def current_session(self, cur, mission_id):
+        """
+        The latest in-progress session of the mission, or None.
+        Misses are checked with the caller's cursor.
+        """
+        mission_id = _canonical_id(mission_id)
+        hit, session_id, version = self._lookup(self._sessions, mission_id)
+        if hit:
+            return session_id
+        cur.execute("""
+            SELECT session_id
+            FROM grfp_sessions
+            WHERE valid_to IS NULL
+            AND mission_id = %s
+            AND status = 'in progress'
+            ORDER BY valid_from DESC
+            LIMIT 1
+            """, (mission_id,))
+        row = cur.fetchone()
+        if not row:
+            return None
+        session_id = str(row[0])
+        self._store(self._sessions, mission_id, session_id, version)
+        return session_id
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                "missions": len(self._missions),
+                "sessions": len(self._sessions),
+                "active": self.is_connected(),
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+            }
+
+
+live_cache = LiveStateCache()
+broker.observe(live_cache.on_change)
+register_metrics("live_cache", live_cache.stats)
@@ -0,0 +1,92 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from cryptography.hazmat.primitives import serialization, hashes
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
+
+from tech_utils.logger import init_logger
+logger = init_logger(name="PubKeyCache", component="cm")
+
+from tech_utils.metrics import register_metrics
+from rfd.config import PUBKEY_CACHE_SIZE, PUBKEY_MIN_BITS
+
+# === LRU cache: PEM fingerprint -> (parsed RSA key, OAEP padding) ===
+_cache = OrderedDict()
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "rejected": 0}
+
+
+class PublicKeyError(ValueError):
+    """Client public key can't be used to encrypt the token."""
+
+
+def _fingerprint(pem):
+    return hashlib.sha256(pem.strip().encode()).hexdigest()
+
+
+def _parse(pem):
+    """
+    Parse and validate a PEM public key. Only RSA keys of at least PUBKEY_MIN_BITS are accepted.
+    """
+    try:
+        key = serialization.load_pem_public_key(pem.encode())
+    except (ValueError, TypeError) as e:
+        raise PublicKeyError("Invalid public key format") from e
+    if not isinstance(key, rsa.RSAPublicKey):
+        raise PublicKeyError("Invalid public key format: RSA key required")
+    if key.key_size < PUBKEY_MIN_BITS:
+        raise PublicKeyError(f"Invalid public key format: RSA key must be at least {PUBKEY_MIN_BITS} bits")
+    oaep = padding.OAEP(mgf=padding.MGF1(algorithm=hashes.SHA256()), algorithm=hashes.SHA256(), label=None)
+    return key, oaep
+
+
+def load_public_key(pem):
+    """
+    Parsed, validated RSA public key and the OAEP padding to encrypt with.
+    Repeat requests with the same PEM skip parsing and validation.
+
+    Returns:
+        tuple: (RSAPublicKey, OAEP padding)
+
+    Raises:
+        PublicKeyError: if the PEM is invalid, not RSA or too small (never cached).
+    """
+    fingerprint = _fingerprint(pem)
+    with _lock:
+        entry = _cache.get(fingerprint)
+        if entry:
+            _cache.move_to_end(fingerprint)
+            _stats["hits"] += 1
+            return entry
+        _stats["misses"] += 1
+
+    try:
+        entry = _parse(pem)
+    except PublicKeyError:
+        with _lock:
+            _stats["rejected"] += 1
+        raise
+
+    with _lock:
+        _cache[fingerprint] = entry
+        _cache.move_to_end(fingerprint)
+        while len(_cache) > PUBKEY_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return entry
+
+
+def cache_stats():
+    """
+    Cache size, hit/miss/rejected counters and hit rate.
+    """
+    with _lock:
+        lookups = _stats["hits"] + _stats["misses"]
+        return {
+            "size": len(_cache),
+            **_stats,
+            "hit_rate": round(_stats["hits"] / lookups, 4) if lookups else 0.0,
+        }
+
+
+register_metrics("pubkey_cache", cache_stats)
@@ -0,0 +1,151 @@
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+from tech_utils.logger import init_logger
+logger = init_logger(name="Reconciler", component="cm")
+
+from tech_utils.db import get_conn
+from rfd.config import KEY_POOL_LEASE
+from rfd.connections_manager.tailscale_manager import fetch_inventory, delete_in_parallel
+
+# Hostname / key description prefixes owned by RFD (see token_manager.make_hostname)
+MANAGED_PREFIXES = ('gcs', 'client')
+# Description prefix of pre-minted pool keys (see key_pool._mint)
+POOL_PREFIX = 'pool'
+
+
+def _is_managed(name):
+    return name.split('-')[0] in MANAGED_PREFIXES
+
+
+def _is_pool_key(description):
+    return description.split('-')[0] == POOL_PREFIX
+
+
+def _created_at(obj):
+    try:
+        return datetime.fromisoformat(obj.get("created", "").replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        return None
+
+
+def load_live_state():
+    """
+    Load hostnames and tracked auth key IDs that are still in use according to the DB:
+    active connections and reservations that are still pending, and keys waiting in a
+    key pool whose owner refreshed them within KEY_POOL_LEASE.
+
+    Returns:
+        tuple: (set of hostnames, set of key IDs, set of pooled key IDs)
+    """
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT hostname, key_id
+                FROM vpn_connections
+                WHERE valid_to IS NULL
+                AND (is_active_flg = TRUE OR status = 'pending')
+            """)
+            rows = cur.fetchall()
+            cur.execute("""
+                SELECT key_id
+                FROM tailnet_pool_keys
+                WHERE seen_at >= now() - %s * interval '1 second'
+            """, (KEY_POOL_LEASE,))
+            pool_key_ids = {key_id for key_id, in cur.fetchall()}
+
+    hostnames = {hostname for hostname, _ in rows}
+    key_ids = {key_id for _, key_id in rows if key_id}
+    return hostnames, key_ids, pool_key_ids
+
+
+def find_orphans(devices, authkeys, live_hostnames, live_key_ids, pool_key_ids=frozenset(), now=None):
+    """
+    Diff the Tailnet inventory against the live DB state.
+
+    Only RFD-managed devices and keys are considered. Pool keys ('pool-<tag>') are orphans
+    when no process refreshed them in tailnet_pool_keys (their pool was lost with a restart)
+    and they were not issued to a connection. Pool keys younger than KEY_POOL_LEASE are kept:
+    a key is registered only after it was minted, possibly after the DB state was loaded.
+
+    Returns:
+        tuple: (list of (device_id, hostname), list of (key_id, description))
+    """
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(seconds=KEY_POOL_LEASE)
+
+    def orphan_pool_key(key):
+        created = _created_at(key)
+        return (key.get("id") not in pool_key_ids and key.get("id") not in live_key_ids
+                and created is not None and created < cutoff)
+
+    orphan_devices = [
+        (d["id"], d.get("hostname", "")) for d in devices
+        if _is_managed(d.get("hostname", "")) and d.get("hostname", "") not in live_hostnames
+    ]
+    orphan_keys = [
+        (k.get("id"), k.get("description", "")) for k in authkeys
+        if (_is_managed(k.get("description", ""))
+            and k.get("description", "") not in live_hostnames
+            and k.get("id") not in live_key_ids)
+        or (_is_pool_key(k.get("description", "")) and orphan_pool_key(k))
+    ]
+    return orphan_devices, orphan_keys
+
+
+def reconcile_tailnet(dry_run=False):
+    """
+    Remove Tailnet devices and auth keys that no longer belong to a live VPN connection.
+
+    The inventory is fetched before the DB state is loaded: a key is only issued after its
+    reservation row is committed, so everything in the inventory is already visible in the DB.
+
+    Returns:
+        dict: orphan and deletion counts, or None if the inventory or DB could not be read.
+    """
+    start = time.monotonic()
+    try:
+        devices, authkeys = fetch_inventory()
+        live_hostnames, live_key_ids, pool_key_ids = load_live_state()
+    except Exception as e:
+        logger.error(f"[!] Reconciliation aborted, could not load state: {e}")
+        return None
+
+    orphan_devices, orphan_keys = find_orphans(devices, authkeys, live_hostnames, live_key_ids, pool_key_ids)
+    stats = {
+        "devices_total": len(devices),
+        "keys_total": len(authkeys),
+        "orphan_devices": len(orphan_devices),
+        "orphan_keys": len(orphan_keys),
+        "deleted_devices": 0,
+        "deleted_keys": 0,
+    }
+
+    if dry_run:
+        for device_id, hostname in orphan_devices:
+            logger.info(f"[dry-run] Orphan device {hostname} ({device_id})")
+        for key_id, desc in orphan_keys:
+            logger.info(f"[dry-run] Orphan authkey {desc} ({key_id})")
+    elif orphan_devices or orphan_keys:
+        failed_devices, failed_keys = delete_in_parallel(
+            [device_id for device_id, _ in orphan_devices],
+            [key_id for key_id, _ in orphan_keys],
+        )
+        stats["deleted_devices"] = len(orphan_devices) - len(failed_devices)
+        stats["deleted_keys"] = len(orphan_keys) - len(failed_keys)
+
+    stats["duration"] = round(time.monotonic() - start, 3)
+    logger.info(f"Tailnet reconciliation{' (dry run)' if dry_run else ''} finished: {stats}")
+    return stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Remove Tailnet devices and keys not backed by a live VPN connection")
+    parser.add_argument("--dry-run", action="store_true", help="only report orphans, delete nothing")
+    args = parser.parse_args()
+
+    stats = reconcile_tailnet(dry_run=args.dry_run)
+    if stats is None:
+        print("Reconciliation failed, see logs.")
+    else:
+        print(f"Reconciliation finished: {stats}")
@@ -0,0 +1,185 @@
+import asyncio
+import json
+import threading
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qs
+
+from tech_utils.logger import init_logger
+logger = init_logger(name="ChangeStreamServer", component="cm")
+
+from tech_utils.metrics import register_metrics
+from rfd.config import CHANGE_STREAM_PORT, CHANGE_STREAM_RETRY_MS, CHANGE_STREAM_WRITE_TIMEOUT
+from rfd.connections_manager.change_stream import broker, parse_filter
+
+STREAM_PATH = "/change-stream"
+REQUEST_TIMEOUT = 10        # seconds a client has to send its request head
+REQUEST_MAX_SIZE = 8192     # bytes of request head accepted
+
+
+def format_event(event):
+    kind = "session" if event["table_name"] == "grfp_sessions" else "mission"
+    return f"id: {event['id']}\nevent: {kind}\ndata: {json.dumps(event)}\n\n"
+
+
+class StreamServer:
+    """
+    Serves GET /change-stream from one asyncio event loop on a background thread.
+
+    - Every client stream is a coroutine awaiting the broker, not a thread: an idle
+      subscriber costs a socket and a few KB, so one process holds thousands of them
+      (bounded by the open file limit).
+    - Only what HTTP/1.1 SSE needs is implemented: one GET per connection, the body is
+      the event stream until either side closes.
+    - A client that stops reading for CHANGE_STREAM_WRITE_TIMEOUT seconds is dropped;
+      it resumes from its Last-Event-ID when it reconnects.
+    """
+
+    def __init__(self, broker, host="127.0.0.1", port=CHANGE_STREAM_PORT):
+        self.broker = broker
+        self.host = host
+        self.port = port
+        self._lock = threading.Lock()
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._stats = {"open": 0, "served": 0, "refused": 0, "slow_clients": 0}
+
+    def start(self):
+        """
+        Bind the port and start the event loop thread (no-op if it is already running).
+        Binding errors are raised to the caller.
+        """
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            loop = asyncio.new_event_loop()
+            try:
+                server = loop.run_until_complete(
+                    asyncio.start_server(self._handle, self.host, self.port, limit=REQUEST_MAX_SIZE))
+            except Exception:
+                loop.close()
+                raise
+            self._loop, self._server = loop, server
+            # Port 0 binds any free port
+            self.port = server.sockets[0].getsockname()[1]
+            self._thread = threading.Thread(target=loop.run_forever, name="ChangeStreamServer", daemon=True)
+            self._thread.start()
+        logger.info(f"Change streams served on {self.host}:{self.port}")
+
+    def stop(self):
+        """Close the listening socket and all open streams."""
+        with self._lock:
+            if not (self._thread and self._thread.is_alive()):
+                return
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._thread = None
+
+    async def _shutdown(self):
+        self._server.close()
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # === Connection handling (event loop thread) ===
+    async def _handle(self, reader, writer):
+        try:
+            try:
+                head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), REQUEST_TIMEOUT)
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError):
+                return
+            status, reason, params = self._parse(head)
+            if status != HTTPStatus.OK:
+                self._stats["refused"] += 1
+                await self._reply(writer, status, reason)
+                return
+            await self._stream(writer, *params)
+        except (ConnectionError, asyncio.TimeoutError):
+            # Client went away or stopped reading
+            pass
+        except asyncio.CancelledError:
+            # Server stopping
+            pass
+        except Exception as e:
+            logger.error(f"Change stream connection failed: {e}", exc_info=True)
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _parse(head):
+        """
+        Returns:
+            tuple: (HTTPStatus, error reason or None, (mission_id, session_id, last_event_id) or None)
+        """
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, _ = lines[0].split(" ")
+        except ValueError:
+            return HTTPStatus.BAD_REQUEST, "Bad request", None
+        url = urlsplit(target)
+        if url.path != STREAM_PATH:
+            return HTTPStatus.NOT_FOUND, "Not found", None
+        if method != "GET":
+            return HTTPStatus.METHOD_NOT_ALLOWED, "Method not allowed", None
+
+        headers = {}
+        for line in lines[1:]:
+            name, sep, value = line.partition(":")
+            if sep:
+                headers[name.strip().lower()] = value.strip()
+        query = parse_qs(url.query)
+
+        def arg(name):
+            return query.get(name, [None])[0]
+
+        try:
+            # Browsers send Last-Event-ID on reconnect; other clients may pass it as a parameter
+            params = parse_filter(arg("mission_id"), arg("session_id"),
+                                  headers.get("last-event-id") or arg("last_event_id"))
+        except ValueError as e:
+            return HTTPStatus.BAD_REQUEST, str(e), None
+        return HTTPStatus.OK, None, params
+
+    async def _reply(self, writer, status, reason):
+        body = json.dumps({"status": "error", "reason": reason}).encode()
+        writer.write(
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+            + body)
+        await self._drain(writer)
+
+    async def _drain(self, writer):
+        try:
+            await asyncio.wait_for(writer.drain(), CHANGE_STREAM_WRITE_TIMEOUT)
+        except asyncio.TimeoutError:
+            self._stats["slow_clients"] += 1
+            raise
+
+    async def _stream(self, writer, mission_id, session_id, last_event_id):
+        writer.write(
+            "HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+            "X-Accel-Buffering: no\r\nConnection: close\r\n\r\n"
+            f"retry: {CHANGE_STREAM_RETRY_MS}\n\n".encode())
+        await self._drain(writer)
+
+        self._stats["open"] += 1
+        self._stats["served"] += 1
+        events = self.broker.subscribe(mission_id, session_id, last_event_id)
+        try:
+            # Closed clients are noticed on the next write, at the latest with the keepalive
+            async for event in events:
+                writer.write((": keepalive\n\n" if event is None else format_event(event)).encode())
+                await self._drain(writer)
+        finally:
+            self._stats["open"] -= 1
+            await events.aclose()
+
+    def stats(self):
+        return {"port": self.port, **self._stats}
+
+
+stream_server = StreamServer(broker)
+register_metrics("change_stream_server", stream_server.stats)
@@ -1,10 +1,14 @@
 import requests
 import time
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 from tech_utils.logger import init_logger
 logger = init_logger(name="TSmanager", component="cm")
 
+from rfd.config import TEARDOWN_MAX_WORKERS, TAILSCALE_API_BASE_URL
+from rfd.connections_manager.api_scheduler import schedule_call, PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+
 # === Load API credentials from environment variables ===
 TAILSCALE_API_KEY = os.getenv("TAILSCALE_API_KEY")
 TAILNET = os.getenv("TAILNET")
@@ -23,7 +27,8 @@ def get_access_token():
     if _cached_token and time.time() < _token_expires_at:
         return _cached_token
 
-    resp = requests.post("https://api.tailscale.com/api/v2/oauth/token", data={
+    # Every other call waits for the token, so it is never queued behind background traffic
+    resp = schedule_call(requests.post, f"{TAILSCALE_API_BASE_URL}/oauth/token", priority=PRIORITY_INTERACTIVE, data={
         "grant_type": "client_credentials",
         "client_id": os.getenv("OAUTH_CLIENT_ID"),
         "client_secret": os.getenv("OAUTH_CLIENT_SECRET"),
@@ -38,17 +43,18 @@ def get_access_token():
 
 # === Tailnet management functions ===
 
-def get_devices():
+def get_devices(raise_errors=False, priority=PRIORITY_BACKGROUND):
     """
     Get the list of devices currently connected to the Tailnet.
+    With raise_errors=True failures are raised instead of returning an empty list.
     """
-    url = f"https://api.tailscale.com/api/v2/tailnet/{TAILNET}/devices"
+    url = f"{TAILSCALE_API_BASE_URL}/tailnet/{TAILNET}/devices"
     headers = {
         "Authorization": f"Bearer {get_access_token()}"
     }
 
     try:
-        response = requests.get(url, headers=headers)
+        response = schedule_call(requests.get, url, headers=headers, priority=priority)
         response.raise_for_status()
         data = response.json()
         devices = data.get("devices", [])
@@ -60,21 +66,35 @@ def get_devices():
 
     except requests.HTTPError as e:
         logger.error(f"[Tailscale] get_devices failed: {e} — {response.text}", exc_info=True)
+        if raise_errors:
+            raise
     except Exception as e:
         logger.error(f"[Tailscale] Unexpected error in get_devices: {e}", exc_info=True)
+        if raise_errors:
+            raise
 
     return []  # fallback
 
 
-def get_auth_keys():
+def is_device_joined(hostname):
+    """
+    Whether a device with the hostname is currently in the Tailnet. Raises on API errors.
+    Interactive: a client is waiting for its lease renewal.
+    """
+    devices = get_devices(raise_errors=True, priority=PRIORITY_INTERACTIVE)
+    return any(d.get("hostname") == hostname for d in devices)
+
+
+def get_auth_keys(raise_errors=False):
     """
     Retrieve all authentication keys (auth keys) associated with the Tailnet.
+    With raise_errors=True failures are raised instead of returning an empty list.
     """
-    url = f"https://api.tailscale.com/api/v2/tailnet/{TAILNET}/keys"
+    url = f"{TAILSCALE_API_BASE_URL}/tailnet/{TAILNET}/keys"
     auth = (TAILSCALE_API_KEY, "")
 
     try:
-        response = requests.get(url, auth=auth)
+        response = schedule_call(requests.get, url, auth=auth)
         response.raise_for_status()
         data = response.json()
         keys = data.get("keys", [])
@@ -83,8 +103,12 @@ def get_auth_keys():
 
     except requests.HTTPError as e:
         logger.error(f"[Tailscale] get_auth_keys failed: {e} — {response.text}", exc_info=True)
+        if raise_errors:
+            raise
     except Exception as e:
         logger.error(f"[Tailscale] Unexpected error in get_auth_keys: {e}", exc_info=True)
+        if raise_errors:
+            raise
 
     return []  # fallback
 
@@ -93,12 +117,12 @@ def delete_device(device_id):
     """
     Remove a device from the Tailnet by its device ID.
     """
-    url = f"https://api.tailscale.com/api/v2/device/{device_id}"
+    url = f"{TAILSCALE_API_BASE_URL}/device/{device_id}"
     headers = {
         "Authorization": f"Bearer {get_access_token()}"
     }
 
-    response = requests.delete(url, headers=headers)
+    response = schedule_call(requests.delete, url, headers=headers)
     if response.status_code == 200:
         logger.info(f"Device {device_id} successfully deleted.")
         return True
@@ -111,10 +135,10 @@ def delete_auth_key(key_id):
     """
     Delete an authentication key by its ID.
     """
-    url = f"https://api.tailscale.com/api/v2/tailnet/{TAILNET}/keys/{key_id}"
+    url = f"{TAILSCALE_API_BASE_URL}/tailnet/{TAILNET}/keys/{key_id}"
     auth = (TAILSCALE_API_KEY, "")
 
-    response = requests.delete(url, auth=auth)
+    response = schedule_call(requests.delete, url, auth=auth)
     if response.status_code == 200:
         logger.info(f"Authkey {key_id} deleted.")
         return True
@@ -126,18 +150,28 @@ def delete_auth_key(key_id):
         return False
 
 
-def remove_from_tailnet(target_hostname):
+def remove_from_tailnet(target_hostname, key_id=None):
     """
     Remove all devices and auth keys associated with a specific hostname from the Tailnet.
+    Keys are matched by description (hostname) or by the tracked key ID, since pooled
+    keys are created before their hostname is known.
+
+    Returns True if everything matching was removed (or nothing was found),
+    False if listing or any deletion failed and the call should be retried.
     """
     logger.info(f"Start removing {target_hostname} from Tailnet")
     
     # Fetch current devices and auth keys
-    devices = get_devices()
-    authkeys = get_auth_keys()
+    try:
+        devices = get_devices(raise_errors=True)
+        authkeys = get_auth_keys(raise_errors=True)
+    except Exception as e:
+        logger.error(f"Remove from Tailnet {target_hostname}: listing failed: {e}")
+        return False
 
     deleted_dev = 0
     deleted_keys = 0
+    failed = 0
 
     # Delete matching devices
     for d in devices:
@@ -147,21 +181,128 @@ def remove_from_tailnet(target_hostname):
             logger.info(f"Deleting device with hostname: {hostname} and id: {device_id}")
             if delete_device(device_id):
                 deleted_dev += 1
+            else:
+                failed += 1
 
     # Delete matching auth keys
     for key in authkeys:
         desc = key.get("description", "")
-        key_id = key.get("id")
+        authkey_id = key.get("id")
         try:
-            if desc == target_hostname:
-                logger.info(f"Deleting auth_key with desc: {desc} and id: {key_id}")
-                if delete_auth_key(key_id):
+            if desc == target_hostname or (key_id and key_id == authkey_id):
+                logger.info(f"Deleting auth_key with desc: {desc} and id: {authkey_id}")
+                if delete_auth_key(authkey_id):
                     deleted_keys += 1
+                else:
+                    failed += 1
         except Exception as e:
             logger.warning(f"Clear session: Exception while deleting key: {e}")
-            pass
+            failed += 1
 
-    if deleted_dev + deleted_keys == 0:
+    if deleted_dev + deleted_keys + failed == 0:
         logger.info(f"Remove from Tailnet {target_hostname}: Nothing found to delete.")
     else:
-        logger.info(f"Hostname {target_hostname} removed from Tailnet. {deleted_dev} devices and {deleted_keys} authkeys have been deleted")
+        logger.info(f"Hostname {target_hostname} removed from Tailnet. {deleted_dev} devices and {deleted_keys} authkeys have been deleted, {failed} deletions failed")
+
+    return failed == 0
+
+
+# === Batched teardown ===
+
+def fetch_inventory():
+    """
+    Fetch devices and auth keys of the Tailnet once. Raises on API errors.
+
+    Returns:
+        tuple: (devices list, auth keys list)
+    """
+    return get_devices(raise_errors=True), get_auth_keys(raise_errors=True)
+
+
+def match_inventory(devices, authkeys, hostnames, key_ids=()):
+    """
+    Select device and key IDs belonging to the given hostnames (or tracked key IDs).
+
+    Returns:
+        tuple: (list of (device_id, hostname), list of (key_id, description))
+    """
+    hostnames = set(hostnames)
+    key_ids = set(key_ids)
+    device_matches = [(d["id"], d.get("hostname", "")) for d in devices if d.get("hostname", "") in hostnames]
+    key_matches = [
+        (k.get("id"), k.get("description", "")) for k in authkeys
+        if k.get("description", "") in hostnames or k.get("id") in key_ids
+    ]
+    return device_matches, key_matches
+
+
+def delete_in_parallel(device_ids, key_ids, max_workers=TEARDOWN_MAX_WORKERS, progress=None):
+    """
+    Delete devices and auth keys through a bounded thread pool.
+    Request rate is governed by the shared Tailscale API scheduler.
+    `progress`, if given, is called as progress(done, total) after every deletion.
+
+    Returns:
+        tuple: (set of failed device IDs, set of failed key IDs)
+    """
+    def run(job):
+        kind, object_id = job
+        try:
+            ok = delete_device(object_id) if kind == "device" else delete_auth_key(object_id)
+        except Exception as e:
+            logger.warning(f"Exception while deleting {kind} {object_id}: {e}")
+            ok = False
+        return job, ok
+
+    jobs = [("device", i) for i in device_ids] + [("key", i) for i in key_ids]
+    failed_devices, failed_keys = set(), set()
+    if not jobs:
+        return failed_devices, failed_keys
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="TSDelete") as executor:
+        for done, ((kind, object_id), ok) in enumerate(executor.map(run, jobs), 1):
+            if not ok:
+                (failed_devices if kind == "device" else failed_keys).add(object_id)
+            if progress:
+                progress(done, len(jobs))
+
+    return failed_devices, failed_keys
+
+
+def teardown_hostnames(targets):
+    """
+    Remove devices and auth keys of many hostnames with a single inventory fetch.
+
+    Args:
+        targets (list): (hostname, key_id or None) pairs.
+
+    Returns:
+        dict: hostnames that still need a retry ('failed'), deleted device/key counts and duration in seconds.
+    """
+    start = time.monotonic()
+    hostnames = {hostname for hostname, _ in targets}
+    tracked_keys = {key_id: hostname for hostname, key_id in targets if key_id}
+
+    devices, authkeys = fetch_inventory()
+    device_matches, key_matches = match_inventory(devices, authkeys, hostnames, tracked_keys)
+
+    failed_devices, failed_keys = delete_in_parallel(
+        [device_id for device_id, _ in device_matches],
+        [key_id for key_id, _ in key_matches],
+    )
+
+    # Map failed objects back to the hostnames that have to be retried
+    failed = {hostname for device_id, hostname in device_matches if device_id in failed_devices}
+    failed |= {tracked_keys.get(key_id, desc) for key_id, desc in key_matches if key_id in failed_keys}
+
+    stats = {
+        "failed": failed,
+        "devices": len(device_matches) - len(failed_devices),
+        "keys": len(key_matches) - len(failed_keys),
+        "duration": time.monotonic() - start,
+    }
+    logger.info(
+        f"Teardown of {len(hostnames)} hostnames: {stats['devices']} devices and {stats['keys']} authkeys deleted, "
+        f"{len(failed_devices) + len(failed_keys)} deletions failed in {stats['duration']:.2f}s"
+    )
+    return stats
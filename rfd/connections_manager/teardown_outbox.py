@@ -0,0 +1,176 @@
+import threading
+
+from tech_utils.logger import init_logger
+logger = init_logger(name="TeardownOutbox", component="cm")
+
+from tech_utils.db import get_conn
+from rfd.config import OUTBOX_BATCH_SIZE, OUTBOX_MAX_ATTEMPTS, OUTBOX_RETRY_BASE, OUTBOX_CLAIM_TIMEOUT
+from rfd.connections_manager.tailscale_manager import teardown_hostnames
+from rfd.connections_manager.api_scheduler import tailscale_unavailable
+
+# Only one drain runs per process; other triggers are skipped while it is busy
+_drain_lock = threading.Lock()
+
+
+def enqueue_teardown(conn, hostname, key_id=None):
+    """
+    Record the intent to remove a hostname (and its tracked auth key) from the Tailnet.
+
+    Does not commit: the intent is committed together with the caller's status change.
+    A pending intent for the same hostname and key is not duplicated.
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO tailnet_teardown_outbox (hostname, key_id)
+            VALUES (%s, %s)
+            ON CONFLICT (hostname, (COALESCE(key_id, ''))) WHERE status = 'pending'
+            DO NOTHING
+        """, (hostname, key_id))
+
+
+def _claim_batch():
+    """
+    Claim due intents. A claim pushes next_attempt_at forward by OUTBOX_CLAIM_TIMEOUT,
+    so intents of a worker that died are picked up again later.
+
+    Hostnames are reused (make_hostname), so an intent whose hostname is held again by an
+    active or pending VPN connection is marked 'superseded' instead of being claimed:
+    tearing it down would remove the new device. Its old key is left to the reconciler.
+
+    Returns:
+        tuple: (claimed intents as (id, hostname, key_id, attempts), number of rows taken)
+    """
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                WITH due AS (
+                    SELECT o.id,
+                           EXISTS (
+                               SELECT 1 FROM vpn_connections v
+                               WHERE v.hostname = o.hostname
+                               AND v.valid_to IS NULL
+                               AND (v.is_active_flg = TRUE OR v.status = 'pending')
+                           ) AS in_use
+                    FROM tailnet_teardown_outbox o
+                    WHERE o.status = 'pending'
+                    AND o.next_attempt_at <= now()
+                    ORDER BY o.next_attempt_at
+                    LIMIT %s
+                    FOR UPDATE OF o SKIP LOCKED
+                )
+                UPDATE tailnet_teardown_outbox t
+                SET attempts = t.attempts + CASE WHEN due.in_use THEN 0 ELSE 1 END,
+                    status = CASE WHEN due.in_use THEN 'superseded' ELSE t.status END,
+                    last_error = CASE WHEN due.in_use THEN 'Hostname in use by a live VPN connection' ELSE t.last_error END,
+                    next_attempt_at = now() + %s * interval '1 second',
+                    updated_at = now()
+                FROM due
+                WHERE t.id = due.id
+                RETURNING t.id, t.hostname, t.key_id, t.attempts, due.in_use
+            """, (OUTBOX_BATCH_SIZE, OUTBOX_CLAIM_TIMEOUT))
+            rows = cur.fetchall()
+            conn.commit()
+
+    superseded = [hostname for _, hostname, _, _, in_use in rows if in_use]
+    if superseded:
+        logger.info(f"Teardown intents superseded, hostnames in use again: {superseded}")
+    return [row[:4] for row in rows if not row[4]], len(rows)
+
+
+def _teardown_batch(batch, counts):
+    """
+    Tear down a whole batch with one Tailnet inventory fetch and concurrent deletions.
+    Deletion is idempotent: a hostname with nothing left to delete counts as success.
+
+    Returns:
+        list: (intent, (ok, error)) pairs
+    """
+    try:
+        stats = teardown_hostnames([(hostname, key_id) for _, hostname, key_id, _ in batch])
+    except Exception as e:
+        return [(intent, (False, str(e))) for intent in batch]
+
+    counts["devices"] += stats["devices"]
+    counts["keys"] += stats["keys"]
+    return [
+        (intent, (False, "Tailscale deletion failed") if intent[1] in stats["failed"] else (True, None))
+        for intent in batch
+    ]
+
+
+def _record_results(results, counts):
+    """
+    Mark intents done, schedule a retry with exponential backoff, or dead-letter them.
+    """
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            for (intent_id, hostname, _, attempts), (ok, error) in results:
+                if ok:
+                    cur.execute("""
+                        UPDATE tailnet_teardown_outbox
+                        SET status = 'done', last_error = NULL, updated_at = now()
+                        WHERE id = %s
+                    """, (intent_id,))
+                    counts["done"] += 1
+                elif attempts >= OUTBOX_MAX_ATTEMPTS:
+                    cur.execute("""
+                        UPDATE tailnet_teardown_outbox
+                        SET status = 'dead', last_error = %s, updated_at = now()
+                        WHERE id = %s
+                    """, (error, intent_id))
+                    counts["dead"] += 1
+                    logger.error(f"Teardown of {hostname} dead-lettered after {attempts} attempts: {error}")
+                else:
+                    delay = OUTBOX_RETRY_BASE * 2 ** (attempts - 1)
+                    cur.execute("""
+                        UPDATE tailnet_teardown_outbox
+                        SET next_attempt_at = now() + %s * interval '1 second', last_error = %s, updated_at = now()
+                        WHERE id = %s
+                    """, (delay, error, intent_id))
+                    counts["retry"] += 1
+                    logger.warning(f"Teardown of {hostname} failed (attempt {attempts}), retry in {delay}s: {error}")
+            conn.commit()
+
+
+def drain_outbox():
+    """
+    Background job: claim due teardown intents in batches and tear each batch down
+    with one inventory fetch and a bounded pool of concurrent deletions.
+
+    Returns:
+        dict: counts of intents done, scheduled for retry, dead-lettered and superseded, and of deleted
+              devices and keys, or None if another drain is already running or Tailscale is unavailable.
+    """
+    if not _drain_lock.acquire(blocking=False):
+        return None
+    # Don't burn retry attempts while Tailscale is known to be down
+    if tailscale_unavailable():
+        _drain_lock.release()
+        logger.warning("Tailscale circuit is open, teardown outbox drain postponed")
+        return None
+
+    counts = {"done": 0, "retry": 0, "dead": 0, "superseded": 0, "devices": 0, "keys": 0}
+    try:
+        while True:
+            batch, taken = _claim_batch()
+            counts["superseded"] += taken - len(batch)
+            if batch:
+                _record_results(_teardown_batch(batch, counts), counts)
+            if taken < OUTBOX_BATCH_SIZE:
+                break
+
+        if any(counts.values()):
+            logger.info(f"Teardown outbox drained: {counts}")
+    except Exception as e:
+        logger.error(f"[!] Error draining teardown outbox: {e}")
+    finally:
+        _drain_lock.release()
+
+    return counts
+
+
+def drain_outbox_async():
+    """
+    Start a drain in the background, e.g. right after an endpoint committed an intent.
+    """
+    threading.Thread(target=drain_outbox, name="TeardownOutboxDrain", daemon=True).start()
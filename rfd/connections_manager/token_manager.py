@@ -6,7 +6,8 @@ from datetime import datetime, timedelta, timezone
 from tech_utils.logger import init_logger
 logger = init_logger(name="TokenManager", component="cm")
 
-from rfd.config import TOKEN_EXPIRE_TMP, TAILSCALE_API_KEY, TAILNET
+from rfd.config import TOKEN_EXPIRE_TMP, TAILSCALE_API_KEY, TAILNET, TAILSCALE_API_BASE_URL
+from rfd.connections_manager.api_scheduler import schedule_call, PRIORITY_INTERACTIVE
 
 # Ensure required environment variables are set
 if not TAILSCALE_API_KEY or not TAILNET:
@@ -16,7 +17,8 @@ if not TAILSCALE_API_KEY or not TAILNET:
 TS_AUTH_KEY_EXP_HOURS = TOKEN_EXPIRE_TMP // 3600
 
 # === Create new Tailscale auth key ===
-def create_tailscale_auth_key(hostname, tag, ephemeral=True, preauthorized=True, reusable=False, expiry_hours=TS_AUTH_KEY_EXP_HOURS):
+def create_tailscale_auth_key(hostname, tag, ephemeral=True, preauthorized=True, reusable=False, expiry_hours=TS_AUTH_KEY_EXP_HOURS,
+                              priority=PRIORITY_INTERACTIVE):
     """
     Creates a new Tailscale authentication key with specific capabilities.
 
@@ -27,14 +29,15 @@ def create_tailscale_auth_key(hostname, tag, ephemeral=True, preauthorized=True,
         preauthorized (bool): Whether the device can join automatically without approval.
         reusable (bool): Whether the key can be reused for multiple devices.
         expiry_hours (int): Key expiration in hours.
+        priority (int): Scheduling class of the API call (interactive by default, a user is waiting).
 
     Returns:
-        tuple: (auth key as str, expiry time in hours)
+        tuple: (auth key as str, expiry time in hours, Tailscale key ID)
 
     Raises:
         RuntimeError: if key creation fails.
     """
-    url = f"https://api.tailscale.com/api/v2/tailnet/{TAILNET}/keys"
+    url = f"{TAILSCALE_API_BASE_URL}/tailnet/{TAILNET}/keys"
     headers = {"Content-Type": "application/json"}
     auth = (TAILSCALE_API_KEY, "")  # Basic auth with API key as username
 
@@ -53,12 +56,12 @@ def create_tailscale_auth_key(hostname, tag, ephemeral=True, preauthorized=True,
         "description": hostname
     }
 
-    response = requests.post(url, headers=headers, auth=auth, data=json.dumps(payload))
+    response = schedule_call(requests.post, url, headers=headers, auth=auth, data=json.dumps(payload), priority=priority)
 
     if response.status_code == 200:
         data = response.json()
         logger.info(f"Tailscale Auth Key created. Key: {data['key'][-10:]}. Expires in: {expiry_hours}h")
-        return data['key'], expiry_hours
+        return data['key'], expiry_hours, data.get('id')
     else:
         logger.error(f"Failed to create key: {response.status_code}, {response.text}")
         logger.error(f"Tailscale auth_token creation failed\n")
@@ -78,6 +81,20 @@ def hash_token(token: str) -> str:
     return hashlib.sha256(token.encode()).hexdigest().upper()
 
 
+def make_hostname(hostname_base, tag):
+    """
+    Builds the Tailscale hostname for a device: tag plus the last 8 characters of the base.
+
+    Args:
+        hostname_base (str): Base string to generate the hostname.
+        tag (str): Tag assigned to the device.
+
+    Returns:
+        str: Hostname such as 'gcs-ef123456'.
+    """
+    return tag + '-' + str(hostname_base)[-8:]
+
+
 def create_token(hostname_base, tag):
     """
     High-level wrapper that creates a Tailscale auth key, computes its hash,
@@ -88,13 +105,13 @@ def create_token(hostname_base, tag):
         tag (str): Tag assigned to the device.
 
     Returns:
-        tuple: (token, token_hash, expiration datetime, hostname)
+        tuple: (token, token_hash, expiration datetime, hostname, Tailscale key ID)
     """
     # Hostname includes tag and suffix of the base for uniqueness
-    hostname = tag + '-' + str(hostname_base)[-8:]
+    hostname = make_hostname(hostname_base, tag)
     
     # Create the Tailscale auth key
-    token, exp_hours = create_tailscale_auth_key(hostname, tag)
+    token, exp_hours, key_id = create_tailscale_auth_key(hostname, tag)
 
     # Hash the token for secure DB storage or validation
     token_hash = hash_token(token)
@@ -105,4 +122,4 @@ def create_token(hostname_base, tag):
 
     logger.info(f"Tokens created successfully {token[-10:]}, {now}, {expires}. Hash: {hash_token(token)}")
     
-    return token, token_hash, expires, hostname
\ No newline at end of file
+    return token, token_hash, expires, hostname, key_id
\ No newline at end of file
@@ -0,0 +1,148 @@
+import argparse
+import secrets
+import threading
+
+from flask import Flask, request, jsonify
+from werkzeug.serving import make_server
+
+from tech_utils.logger import init_logger
+logger = init_logger(name="FakeTailscale", component="fake_ts")
+
+from rfd.fake_tailscale.state import FakeTailnet, FaultInjector
+
+
+def _has_credentials():
+    # Keys endpoints use basic auth with the API key, device endpoints an OAuth bearer token
+    auth = request.authorization
+    return bool(auth and (auth.username or auth.token))
+
+
+def create_app(tailnet=None, faults=None):
+    """
+    Flask app standing in for the Tailscale control API (/api/v2) with in-memory state.
+
+    Real API:
+        POST   /api/v2/oauth/token
+        POST   /api/v2/tailnet/<tailnet>/keys
+        GET    /api/v2/tailnet/<tailnet>/keys
+        DELETE /api/v2/tailnet/<tailnet>/keys/<key_id>
+        GET    /api/v2/tailnet/<tailnet>/devices
+        DELETE /api/v2/device/<device_id>
+
+    Test controls (not affected by fault injection):
+        POST   /_fake/devices   {"hostname", "authKey"?, "created"?} - simulate a device joining
+        POST   /_fake/config    latency, jitter, error_rate, rate_limit, burst, retry_after
+        POST   /_fake/reset
+        GET    /_fake/stats
+    """
+    app = Flask(__name__)
+    app.tailnet = tailnet or FakeTailnet()
+    app.faults = faults or FaultInjector()
+    state, faults = app.tailnet, app.faults
+
+    @app.before_request
+    def inject_faults():
+        if request.path.startswith("/_fake"):
+            return None
+        fault = faults.before_request()
+        if fault:
+            status, retry_after = fault
+            response = jsonify({"message": "rate limited" if status == 429 else "injected error"})
+            response.status_code = status
+            if retry_after is not None:
+                response.headers["Retry-After"] = str(retry_after)
+            return response
+        if request.path != "/api/v2/oauth/token" and not _has_credentials():
+            return jsonify({"message": "unauthorized"}), 401
+        return None
+
+    @app.post("/api/v2/oauth/token")
+    def oauth_token():
+        return jsonify({"access_token": f"tskey-api-{secrets.token_hex(16)}", "token_type": "Bearer", "expires_in": 3600})
+
+    @app.post("/api/v2/tailnet/<tailnet>/keys")
+    def create_key(tailnet):
+        data = request.get_json(force=True, silent=True) or {}
+        entry = state.create_key(data.get("description", ""), data.get("capabilities", {}), data.get("expirySeconds", 90 * 86400))
+        return jsonify(entry)
+
+    @app.get("/api/v2/tailnet/<tailnet>/keys")
+    def list_keys(tailnet):
+        return jsonify({"keys": state.list_keys()})
+
+    @app.delete("/api/v2/tailnet/<tailnet>/keys/<key_id>")
+    def delete_key(tailnet, key_id):
+        if state.delete_key(key_id):
+            return "", 200
+        return jsonify({"message": "not found"}), 404
+
+    @app.get("/api/v2/tailnet/<tailnet>/devices")
+    def list_devices(tailnet):
+        return jsonify({"devices": state.list_devices()})
+
+    @app.delete("/api/v2/device/<device_id>")
+    def delete_device(device_id):
+        if state.delete_device(device_id):
+            return "", 200
+        return jsonify({"message": "not found"}), 404
+
+    @app.post("/_fake/devices")
+    def join_device():
+        data = request.get_json(force=True)
+        device = state.add_device(data["hostname"], data.get("authKey"), data.get("created"))
+        if device is None:
+            return jsonify({"message": "invalid auth key"}), 403
+        return jsonify(device)
+
+    @app.post("/_fake/config")
+    def configure():
+        allowed = {"latency", "jitter", "error_rate", "rate_limit", "burst", "retry_after"}
+        faults.configure(**{k: v for k, v in (request.get_json(force=True) or {}).items() if k in allowed})
+        return jsonify(faults.settings())
+
+    @app.post("/_fake/reset")
+    def reset():
+        state.reset()
+        return jsonify({"status": "ok"})
+
+    @app.get("/_fake/stats")
+    def stats():
+        return jsonify({
+            "keys": len(state.keys),
+            "devices": len(state.devices),
+            **faults.counters,
+            "settings": faults.settings(),
+        })
+
+    return app
+
+
+def serve_in_thread(app, host="127.0.0.1", port=0):
+    """
+    Run the app on a background thread (port 0 picks a free port).
+
+    Returns:
+        tuple: (server with .shutdown(), base URL to use as TAILSCALE_API_BASE_URL)
+    """
+    server = make_server(host, port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="FakeTailscale", daemon=True).start()
+    return server, f"http://{host}:{server.server_port}/api/v2"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Tailscale control API")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every API request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra latency, up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 500")
+    parser.add_argument("--rate-limit", type=float, default=None, help="requests per second before 429s")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429")
+    args = parser.parse_args()
+
+    faults = FaultInjector(args.latency, args.jitter, args.error_rate, args.rate_limit, retry_after=args.retry_after)
+    logger.info(f"Fake Tailscale API on http://127.0.0.1:{args.port}/api/v2, faults: {faults.settings()}")
+    create_app(faults=faults).run(host="127.0.0.1", port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
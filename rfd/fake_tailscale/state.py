@@ -0,0 +1,150 @@
+import itertools
+import random
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+
+def _iso(dt):
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class FakeTailnet:
+    """
+    In-memory Tailnet: auth keys and devices with the fields RFD reads from the real API.
+    Thread-safe, so the stand-in server can be hit by concurrent workers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.keys = {}
+        self.devices = {}
+
+    def reset(self):
+        with self._lock:
+            self.keys.clear()
+            self.devices.clear()
+
+    def _next_id(self, prefix):
+        return f"{prefix}{next(self._ids):08d}"
+
+    def create_key(self, description, capabilities, expiry_seconds):
+        now = datetime.now(timezone.utc)
+        key_id = self._next_id("k")
+        entry = {
+            "id": key_id,
+            "key": f"tskey-auth-{key_id}-{secrets.token_hex(12)}",
+            "keyType": "auth",
+            "description": description,
+            "capabilities": capabilities,
+            "created": _iso(now),
+            "expires": _iso(now + timedelta(seconds=expiry_seconds)),
+        }
+        with self._lock:
+            self.keys[key_id] = entry
+        return entry
+
+    def list_keys(self):
+        with self._lock:
+            return [{k: v for k, v in key.items() if k != "key"} for key in self.keys.values()]
+
+    def delete_key(self, key_id):
+        with self._lock:
+            return self.keys.pop(key_id, None) is not None
+
+    def add_device(self, hostname, auth_key=None, created=None):
+        """
+        Simulate a device joining the Tailnet. With auth_key, the key must exist;
+        a non-reusable key is consumed like on the real control plane.
+
+        Returns:
+            dict: device, or None if the auth key is unknown.
+        """
+        with self._lock:
+            tags = []
+            if auth_key is not None:
+                key = next((k for k in self.keys.values() if k["key"] == auth_key), None)
+                if key is None:
+                    return None
+                create = key["capabilities"].get("devices", {}).get("create", {})
+                tags = create.get("tags", [])
+                if not create.get("reusable"):
+                    del self.keys[key["id"]]
+
+            device_id = self._next_id("d")
+            created = created or _iso(datetime.now(timezone.utc))
+            device = {
+                "id": device_id,
+                "nodeId": f"n{device_id}",
+                "hostname": hostname,
+                "name": f"{hostname}.fake.ts.net",
+                "tags": tags,
+                "addresses": [f"100.64.{random.randint(0, 255)}.{random.randint(1, 254)}"],
+                "created": created,
+                "lastSeen": created,
+            }
+            self.devices[device_id] = device
+            return device
+
+    def list_devices(self):
+        with self._lock:
+            return list(self.devices.values())
+
+    def delete_device(self, device_id):
+        with self._lock:
+            return self.devices.pop(device_id, None) is not None
+
+
+class FaultInjector:
+    """
+    Latency, random 5xx errors and a token-bucket rate limit answered with 429 + Retry-After.
+    Settings can be changed at runtime through the /_fake/config endpoint.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, rate_limit=None, burst=None, retry_after=1):
+        self._lock = threading.Lock()
+        self.configure(latency=latency, jitter=jitter, error_rate=error_rate,
+                       rate_limit=rate_limit, burst=burst, retry_after=retry_after)
+        self.counters = {"requests": 0, "errors": 0, "throttled": 0}
+
+    def configure(self, **settings):
+        with self._lock:
+            for name, value in settings.items():
+                setattr(self, name, value)
+            self.burst = self.burst or self.rate_limit
+            self._tokens = float(self.burst or 0)
+            self._updated = time.monotonic()
+
+    def settings(self):
+        return {
+            "latency": self.latency, "jitter": self.jitter, "error_rate": self.error_rate,
+            "rate_limit": self.rate_limit, "burst": self.burst, "retry_after": self.retry_after,
+        }
+
+    def before_request(self):
+        """
+        Apply faults for one request.
+
+        Returns:
+            tuple or None: (status code, Retry-After or None) to answer instead of the real handler.
+        """
+        with self._lock:
+            self.counters["requests"] += 1
+            if self.rate_limit:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate_limit)
+                self._updated = now
+                if self._tokens < 1:
+                    self.counters["throttled"] += 1
+                    return 429, self.retry_after
+                self._tokens -= 1
+            fail = self.error_rate and random.random() < self.error_rate
+            if fail:
+                self.counters["errors"] += 1
+
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            time.sleep(delay)
+        return (500, None) if fail else None
@@ -1,9 +1,12 @@
 from flask import Flask
 
-from rfd.missions_manager.endpoints import mission_request, mission_group_request, get_missions_list, change_mission_status
+from rfd.missions_manager.endpoints import mission_request, mission_group_request, get_missions_list, change_mission_status, export_history, metrics
 
-from apscheduler.schedulers.background import BackgroundScheduler
+from tech_utils.job_runner import create_job_runner
 from rfd.missions_manager.jobs import alert_pending_tasks
+from rfd.missions_manager.reference_data import reference_data
+from tech_utils.email_utils import flush_deferred_emails
+from rfd.config import EMAIL_FLUSH_INTERVAL, JOB_RUNS_RETENTION
 
 from rfd.missions_manager.db_init import db_init
 
@@ -12,16 +15,23 @@ logger = init_logger(name="Server", component="mm")
 
 app = Flask(__name__)
 
-# Add alert pending tasks job
-scheduler = BackgroundScheduler()
-scheduler.add_job(alert_pending_tasks, "interval", hours=3)
-scheduler.start()
+# Add alert pending tasks job (one replica sends the alerts)
+jobs = create_job_runner("mm", retention=JOB_RUNS_RETENTION)
+jobs.add_job(alert_pending_tasks, "interval", hours=3)
+# Retry emails this process deferred while SMTP was unavailable
+jobs.add_job(flush_deferred_emails, "interval", exclusive=False, seconds=EMAIL_FLUSH_INTERVAL)
+jobs.start()
+
+# Reload the validators' reference data when drone types, groups, locations or mission types change
+reference_data.start_listener()
 
 # Add endpoints
 app.add_url_rule("/mission-request", view_func=mission_request, methods=["POST"])
 app.add_url_rule("/mission-group-request", view_func=mission_group_request, methods=["POST"])
 app.add_url_rule("/change-mission-status", view_func=change_mission_status, methods=["POST"])
 app.add_url_rule("/get-missions-list", view_func=get_missions_list, methods=["POST"])
+app.add_url_rule("/export", view_func=export_history, methods=["GET"])
+app.add_url_rule("/metrics", view_func=metrics, methods=["GET"])
 
 def main():
     logger.info("DB init")
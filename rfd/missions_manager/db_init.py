@@ -1,5 +1,7 @@
-from tech_utils.db import get_conn
+from tech_utils.db import get_conn, install_change_events
+from tech_utils.job_runner import install_job_runs
 from tech_utils.logger import init_logger
+from rfd.missions_manager.reference_data import install_reference_notify
 
 logger = init_logger(name="DBinit", component="mm")
 
@@ -29,6 +31,11 @@ def db_init():
                         UNIQUE (mission_id, valid_from)
                     );
                     CREATE UNIQUE INDEX ON grfp_missions(mission_id) WHERE valid_to IS NULL;
+                    -- /export reads valid_from windows in (valid_from, id) order
+                    CREATE INDEX IF NOT EXISTS idx_missions_valid_from ON grfp_missions(valid_from, id);
+                    -- get-missions-list pages (keyset on valid_from, id) per group and per creator
+                    CREATE INDEX IF NOT EXISTS idx_missions_group_page ON grfp_missions(mission_group, valid_from DESC, id DESC) WHERE valid_to IS NULL;
+                    CREATE INDEX IF NOT EXISTS idx_missions_email_page ON grfp_missions(email, valid_from DESC, id DESC) WHERE valid_to IS NULL;
 
                     -- === Mission Groups Table ===
                     -- Stores mission group metadata (e.g. for grouping several related missions)
@@ -91,6 +98,15 @@ def db_init():
                 if not cur.fetchone():
                     cur.execute("INSERT INTO grfp_mission_groups (mission_group) VALUES ('default');")
 
+                # Validators' reference data snapshots reload on changes of these tables
+                install_reference_notify(cur)
+
+                # Run history of scheduled jobs
+                install_job_runs(cur)
+
+                # Mission status changes are pushed to change stream subscribers (see RFD CM /change-stream)
+                install_change_events(cur, "grfp_missions")
+
                 conn.commit()
                 logger.info("RFDMM tables created")
 
@@ -1,15 +1,32 @@
-from flask import Flask, request, jsonify, g
-
-from tech_utils.db import get_conn, update_versioned, RealDictCursor
-from tech_utils.email_utils import send_email
-from rfd.config import GROUND_TEAMS_EMAIL, RFD_ADMIN_EMAIL
+from flask import Flask, request, jsonify, g, Response, stream_with_context
+
+from tech_utils.db import get_conn, update_versioned
+from tech_utils.json_response import json_response
+from tech_utils.email_utils import send_email_or_defer
+from tech_utils.metrics import collect_metrics
+from rfd.config import GROUND_TEAMS_EMAIL, RFD_ADMIN_EMAIL, MISSIONS_PAGE_DEFAULT, MISSIONS_PAGE_MAX
+from rfd.missions_manager.export import stream_rows, EXPORT_FORMATS
 from rfd.auth.require_auth_dec import require_auth
 import rfd.missions_manager.field_validators as fv
+from rfd.missions_manager.reference_data import reference_data
 import uuid
+import json
+import base64
+from datetime import datetime
 
 from tech_utils.logger import init_logger
 logger = init_logger(name="MMEndpoints", component="mm")
 
+# Columns of grfp_missions that get-missions-list can return (`fields`)
+MISSION_FIELDS = ("id", "mission_id", "mission_group", "mission_type", "email", "location", "time_window",
+                  "drone_type", "status", "parameters", "created_at", "valid_from", "valid_to")
+
+# Tables and columns of /export
+EXPORT_TABLES = {
+    "missions": ("grfp_missions", MISSION_FIELDS),
+    "sessions": ("grfp_sessions", ("id", "session_id", "mission_id", "status", "created_at", "valid_from", "valid_to")),
+}
+
 
 # === Endpoint to create a new mission ===
 #@require_auth(allowed_emails = None) - TBD: require auth
@@ -22,63 +39,40 @@ def mission_request():
     required = ["time_window", "drone_type"]
     if not data or not all(k in data for k in required):
         return jsonify({"status": "error", "reason": "Missing parameters: time_window or drone_type"}), 400
-    if not fv.drone_type_val(data.get("drone_type")):
-        return jsonify({"status": "error", "reason": "Drone type does not exist"}), 404
 
     # User ID extraction - to be replaced with JWT data
     if not 'email' in data:
         return jsonify({"status": "error", "reason": "Email required"}), 400
-    if not fv.email_val(data.get('email')):
-        return jsonify({"status": "error", "reason": "User with given email does not exist"}), 404
 
-    # Prepare values for SQL INSERT
-    columns = ['mission_id']
-    placeholders = ['%s']
-    values = [mission_id]  
-
-    # Optional fields
-    if "mission_group" in data:
-        if not fv.mission_group_val(data.get("mission_group")):
-            return jsonify({"status": "error", "reason": "Mission_group does not exist"}), 404 
-        columns.append('mission_group')
-        placeholders.append('%s')
-        values.append(data.get("mission_group"))
-    if "mission_type" in data:
-        if not fv.mission_type_val(data.get("mission_type")):
-            return jsonify({"status": "error", "reason": "Mission_type does not exist"}), 404 
-        columns.append('mission_type')
-        placeholders.append('%s')
-        values.append(data.get("mission_type"))
-    if "location" in data:
-        if not fv.location_val(data.get("location")):
-            return jsonify({"status": "error", "reason": "Location does not exist"}), 404 
-        columns.append('location')
-        placeholders.append('%s')
-        values.append(data.get("location"))
-
-    # Add required fields
-    columns += ['email', 'time_window', 'drone_type']
-    placeholders += ['%s'] * 3
-    values += [data.get("email"), data.get("time_window"), data.get("drone_type")]
+    # Required and optional fields of the new row
+    values = {'mission_id': mission_id}
+    for field in ("mission_group", "mission_type", "location"):
+        if field in data:
+            values[field] = data.get(field)
+    values.update({field: data.get(field) for field in ('email', 'time_window', 'drone_type')})
 
     try:
-        # Insert into database
+        # Validate all reference fields and insert in one statement
         with get_conn() as conn:
             with conn.cursor() as cur:
-                sql = f"""
-                    INSERT INTO grfp_missions ({', '.join(columns)})
-                    VALUES ({', '.join(placeholders)})
-                """
-                cur.execute(sql, values)
+                failed = fv.create_mission(cur, values)
                 conn.commit()
+        if failed:
+            logger.info(f"Mission request {mission_id} rejected, not found: {failed}")
+            return jsonify({
+                "status": "error",
+                "reason": "; ".join(fv.VALIDATION_ERRORS[field] for field in failed),
+                "invalid_fields": failed,
+            }), 404
 
         logger.info(f"Mission request processed: {mission_id}")
 
         # Notify ground teams via email
         subject = f"[GRFP] New Mission Request: {mission_id}"
         body = "\n".join([f"{k}: {data[k]}" for k in required])
-        send_email(subject, body, GROUND_TEAMS_EMAIL)
-        logger.info(f"Email sent to ground teams: {GROUND_TEAMS_EMAIL}")
+        # Never fail the request on SMTP problems: the email is deferred and retried
+        if send_email_or_defer(subject, body, GROUND_TEAMS_EMAIL):
+            logger.info(f"Email sent to ground teams: {GROUND_TEAMS_EMAIL}")
 
         return jsonify({"status": "ok", "mission_id": mission_id}), 200
 
@@ -117,6 +111,8 @@ def mission_group_request():
                     INSERT INTO grfp_mission_groups (mission_group) VALUES (%s)
                 """, (mission_group,))
                 conn.commit()
+        # Usable by this replica's next mission-request without waiting for the notification
+        reference_data.invalidate()
 
         logger.info(f"Mission group request processed: {mission_group}")
         return jsonify({"status": "ok"}), 200
@@ -148,8 +144,9 @@ def change_mission_status():
         # Send status update email
         subject = f"[GRFP] Mission Status Changed"
         body = "\n".join([data['mission_id'] + '\n', 'New status:', data['new_status']])
-        send_email(subject, body, GROUND_TEAMS_EMAIL)
-        logger.info(f"Email sent to ground teams: {GROUND_TEAMS_EMAIL}")
+        # Never fail the request on SMTP problems: the email is deferred and retried
+        if send_email_or_defer(subject, body, GROUND_TEAMS_EMAIL):
+            logger.info(f"Email sent to ground teams: {GROUND_TEAMS_EMAIL}")
 
         return jsonify({"status": "ok"}), 200
     except Exception as e:
@@ -186,23 +183,133 @@ def get_missions_list():
         where_clauses.append("status = %s")
         args.append(str(data["status"]))
 
+    # Page size, projection and position (opaque cursor from the previous page)
+    try:
+        limit = int(data.get("limit", MISSIONS_PAGE_DEFAULT))
+    except (TypeError, ValueError):
+        return jsonify({"status": "error", "reason": "limit must be an integer"}), 400
+    limit = max(1, min(limit, MISSIONS_PAGE_MAX))
+
+    fields = data.get("fields")
+    if isinstance(fields, str):
+        fields = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in fields if f not in MISSION_FIELDS] if isinstance(fields, list) else [fields]
+    if fields and unknown:
+        return jsonify({"status": "error", "reason": f"Unknown fields: {unknown}"}), 400
+    if fields:
+        # A repeated field is selected once, so it must also count once in the response width
+        fields = list(dict.fromkeys(fields))
+
+    # Response shape: a list of objects, or column names once and one array per row (smaller and faster)
+    shape = data.get("shape", "objects")
+    if shape not in ("objects", "rows"):
+        return jsonify({"status": "error", "reason": "shape must be objects or rows"}), 400
+
+    if data.get("cursor"):
+        position = _decode_cursor(data["cursor"])
+        if position is None:
+            return jsonify({"status": "error", "reason": "Invalid cursor"}), 400
+        # Rows after the cursor in (valid_from DESC, id DESC) order
+        where_clauses.append("(valid_from, id) < (%s, %s)")
+        args += list(position)
+
     where_sql = " AND ".join(where_clauses)
+    # The sort key is always read for the next cursor
+    columns = ", ".join(dict.fromkeys(fields + ["valid_from", "id"])) if fields else "*"
 
     try:
-        # Fetch filtered missions from DB
+        # Fetch one page of filtered missions from DB (one extra row tells whether there is a next page)
         with get_conn() as conn:
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            with conn.cursor() as cur:
                 cur.execute(f"""
-                    SELECT *
+                    SELECT {columns}
                     FROM grfp_missions
                     WHERE {where_sql}
-                    ORDER BY valid_from DESC
-                """, args)
+                    ORDER BY valid_from DESC, id DESC
+                    LIMIT %s
+                """, args + [limit + 1])
                 rows = cur.fetchall()
+                names = [column[0] for column in cur.description]
                 logger.info("Successfully fetched missions list")
 
-        return jsonify({'status': 'ok', 'data': rows}), 200
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = _encode_cursor(last[names.index("valid_from")], last[names.index("id")])
+        # Requested fields come first in the select list, sort key columns added for the cursor are dropped
+        width = len(fields) if fields else len(names)
+        names = names[:width]
+
+        if shape == "rows":
+            payload = {'status': 'ok', 'columns': names, 'rows': [row[:width] for row in rows], 'next_cursor': next_cursor}
+        else:
+            payload = {'status': 'ok', 'data': [dict(zip(names, row)) for row in rows], 'next_cursor': next_cursor}
+        return json_response(payload)
 
     except Exception as e:
         logger.error(f"Error in getting missions list: {e}", exc_info=True)
         return jsonify({"status": "error", "reason": "Internal server error"}), 500
+
+
+def _encode_cursor(valid_from, row_id):
+    return base64.urlsafe_b64encode(json.dumps([valid_from.isoformat(), row_id]).encode()).decode()
+
+
+def _decode_cursor(token):
+    """(valid_from, id) of a get-missions-list cursor, None if it is not one."""
+    try:
+        valid_from, row_id = json.loads(base64.urlsafe_b64decode(str(token).encode()))
+        return datetime.fromisoformat(valid_from), int(row_id)
+    except (ValueError, TypeError):
+        return None
+
+
+# === Endpoint to export mission or session history as a stream ===
+@require_auth(allowed_emails=[RFD_ADMIN_EMAIL, GROUND_TEAMS_EMAIL])
+def export_history():
+    args = request.args
+    logger.info(f"export request received: {dict(args)}")
+
+    table = args.get("table", "missions")
+    fmt = args.get("format", "ndjson")
+    if table not in EXPORT_TABLES:
+        return jsonify({"status": "error", "reason": f"table must be one of {list(EXPORT_TABLES)}"}), 400
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"status": "error", "reason": f"format must be one of {list(EXPORT_FORMATS)}"}), 400
+
+    # Current versions only, unless the history of every row is asked for
+    where_clauses, params = [], []
+    if args.get("history", "false").lower() not in ("1", "true", "yes"):
+        where_clauses.append("valid_to IS NULL")
+    # valid_from window: since inclusive, until exclusive (ISO 8601)
+    for name, op in (("since", ">="), ("until", "<")):
+        if args.get(name):
+            try:
+                params.append(datetime.fromisoformat(args[name]))
+            except ValueError:
+                return jsonify({"status": "error", "reason": f"{name} must be an ISO 8601 timestamp"}), 400
+            where_clauses.append(f"valid_from {op} %s")
+    where_sql = " AND ".join(where_clauses) or "TRUE"
+
+    db_table, columns = EXPORT_TABLES[table]
+    encode, mimetype = EXPORT_FORMATS[fmt]
+
+    def generate():
+        try:
+            yield from encode(columns, stream_rows(db_table, columns, where_sql, params))
+            logger.info(f"export of {table} finished")
+        except Exception as e:
+            # Headers are already sent: abort the transfer so the client sees an incomplete export
+            logger.error(f"export of {table} failed: {e}", exc_info=True)
+            raise
+
+    return Response(stream_with_context(generate()), mimetype=mimetype, headers={
+        "Content-Disposition": f"attachment; filename={table}.{fmt}",
+        "X-Accel-Buffering": "no",
+    })
+
+
+# === Endpoint exposing internal metrics (circuit breakers, deferred emails, ...) ===
+def metrics():
+    return jsonify({"status": "ok", "metrics": collect_metrics()}), 200
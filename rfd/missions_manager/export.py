@@ -0,0 +1,78 @@
+import csv
+import io
+import json
+import uuid
+from datetime import date, datetime
+
+from tech_utils.logger import init_logger
+logger = init_logger(name="Export", component="mm")
+
+from tech_utils.db import get_conn
+from rfd.config import EXPORT_CHUNK_ROWS
+
+
+def stream_rows(table, columns, where_sql, args, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    Generator of row chunks (lists of tuples) of a query read through a server-side (named)
+    cursor, so only one chunk is in memory however large the result is.
+    The connection is held until the generator is exhausted or closed.
+    """
+    conn = get_conn()
+    try:
+        with conn.cursor(name=f"grfp_export_{uuid.uuid4().hex}") as cur:
+            cur.itersize = chunk_rows
+            cur.execute(f"""
+                SELECT {', '.join(columns)}
+                FROM {table}
+                WHERE {where_sql}
+                ORDER BY valid_from, id
+            """, args)
+            while True:
+                rows = cur.fetchmany(chunk_rows)
+                if not rows:
+                    break
+                yield rows
+        conn.rollback()
+    finally:
+        conn.close()
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+
+def to_ndjson(columns, chunks):
+    """One JSON object per line, one string per chunk."""
+    for rows in chunks:
+        yield "".join(json.dumps(dict(zip(columns, row)), default=_json_default) + "\n" for row in rows)
+
+
+def to_csv(columns, chunks):
+    """Header line, then one string per chunk."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue()
+    for rows in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_csv_value(v) for v in row] for row in rows)
+        yield buffer.getvalue()
+
+
+EXPORT_FORMATS = {
+    "ndjson": (to_ndjson, "application/x-ndjson"),
+    "csv": (to_csv, "text/csv"),
+}
@@ -1,41 +1,23 @@
 from tech_utils.db import get_conn
+from rfd.missions_manager.reference_data import reference_data, REFERENCE_TABLES
+
+# Reference values are checked against the in-memory snapshot (see reference_data.py)
+def _is_reference(field, value):
+    # JSON lists/objects are unhashable and never valid
+    return isinstance(value, str) and value in getattr(reference_data.snapshot(), field)
 
 def drone_type_val(value):
-    with get_conn() as conn:
-        with conn.cursor() as cur:
-            cur.execute("SELECT id FROM grfp_drone_types WHERE drone_type = %s AND valid_to IS NULL", (value,))
-            row = cur.fetchone()
-            if not row:
-                return False
-            return True
+    return _is_reference("drone_types", value)
 
 def mission_group_val(value):
-    with get_conn() as conn:
-        with conn.cursor() as cur:
-            cur.execute("SELECT id FROM grfp_mission_groups WHERE mission_group = %s AND valid_to IS NULL", (value,))
-            row = cur.fetchone()
-            if not row:
-                return False
-            return True
-        
+    return _is_reference("mission_groups", value)
+
 def location_val(value):
-    with get_conn() as conn:
-        with conn.cursor() as cur:
-            cur.execute("SELECT id FROM grfp_locations WHERE location = %s AND valid_to IS NULL", (value,))
-            row = cur.fetchone()
-            if not row:
-                return False
-            return True
+    return _is_reference("locations", value)
 
 def mission_type_val(value):
-    with get_conn() as conn:
-        with conn.cursor() as cur:
-            cur.execute("SELECT id FROM grfp_mission_types WHERE mission_type = %s AND valid_to IS NULL", (value,))
-            row = cur.fetchone()
-            if not row:
-                return False
-            return True
-        
+    return _is_reference("mission_types", value)
+
 def email_val(value):
     with get_conn() as conn:
         with conn.cursor() as cur:
@@ -43,4 +25,78 @@ def email_val(value):
             row = cur.fetchone()
             if not row:
                 return False
-            return True
\ No newline at end of file
+            return True
+
+
+# Validated mission columns -> (snapshot field, table) and their error messages
+MISSION_REFERENCES = {column: (field, table) for field, (table, column) in REFERENCE_TABLES.items()}
+VALIDATION_ERRORS = {
+    "drone_type": "Drone type does not exist",
+    "mission_group": "Mission_group does not exist",
+    "mission_type": "Mission_type does not exist",
+    "location": "Location does not exist",
+    "email": "User with given email does not exist",
+}
+
+def create_mission(cur, values):
+    """
+    Check every reference column of a new mission and insert it only if all of them exist,
+    in one statement. Reference columns are checked in memory when the snapshot is current,
+    otherwise in the statement (and a snapshot reload is started); email is always checked
+    in the statement.
+
+    Args:
+        cur: Cursor of the caller's transaction
+        values (dict): Column -> value of the new grfp_missions row (must contain email)
+
+    Returns:
+        list: Columns whose value does not exist (empty if the mission was inserted)
+    """
+    snapshot = reference_data.cached()
+    if snapshot is None:
+        reference_data.reload_async()
+    failed, checks = [], {}
+    for column in VALIDATION_ERRORS:
+        if column not in values:
+            continue
+        value = values[column]
+        if not isinstance(value, str):
+            # JSON lists/objects/numbers never match
+            failed.append(column)
+        elif column == "email":
+            checks[column] = "EXISTS (SELECT 1 FROM grfp_users WHERE email = %(email)s AND valid_to IS NULL)"
+        elif snapshot is not None:
+            field, _ = MISSION_REFERENCES[column]
+            if value not in getattr(snapshot, field):
+                failed.append(column)
+        else:
+            field, table = MISSION_REFERENCES[column]
+            checks[column] = f"EXISTS (SELECT 1 FROM {table} WHERE {column} = %({column})s AND valid_to IS NULL)"
+
+    if not checks and failed:
+        return [column for column in VALIDATION_ERRORS if column in failed]
+
+    params = {column: values[column] for column in checks}
+    insert = ""
+    if not failed:
+        # The row is only inserted if every check of the statement passes
+        columns = list(values)
+        params.update(values)
+        insert = f"""
+            , inserted AS (
+                INSERT INTO grfp_missions ({', '.join(columns)})
+                SELECT {', '.join(f'%({c})s' for c in columns)} FROM checks
+                WHERE {' AND '.join(checks) or 'TRUE'}
+                RETURNING mission_id
+            )"""
+    select = ', '.join(f'{expr} AS {column}' for column, expr in checks.items()) or "TRUE AS ok"
+    cur.execute(f"""
+        WITH checks AS (
+            SELECT {select}
+        ){insert}
+        SELECT * FROM checks
+    """, params)
+    row = cur.fetchone()
+    failed += [column for column, ok in zip(checks, row) if not ok]
+    # In the order of the request's fields
+    return [column for column in VALIDATION_ERRORS if column in failed]
@@ -2,7 +2,7 @@ from tech_utils.logger import init_logger
 logger = init_logger(name="Jobs", component="mm")
 
 from tech_utils.db import get_conn
-from tech_utils.email_utils import send_email, ground_teams_email
+from tech_utils.email_utils import send_email_or_defer, ground_teams_email
 
 # Function to alert ground teams about pending flight tasks
 def alert_pending_tasks():
@@ -25,8 +25,8 @@ def alert_pending_tasks():
                 body += f"ID: {r[0]}, Loc: {r[1]}, Time: {r[2]}, Drone: {r[3]}, Created: {r[4]}\n"
 
             # Send the email to the ground teams
-            send_email("[GRFP] Hourly Alert: Pending Missions", body, ground_teams_email)
-            logger.info(f"Email sent to ground teams: {ground_teams_email}")
+            if send_email_or_defer("[GRFP] Hourly Alert: Pending Missions", body, ground_teams_email):
+                logger.info(f"Email sent to ground teams: {ground_teams_email}")
             logger.info("Pending missions alert sent")
 
     except Exception as e:
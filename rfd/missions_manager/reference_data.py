@@ -0,0 +1,156 @@
+import threading
+import time
+from collections import namedtuple
+
+from tech_utils.logger import init_logger
+logger = init_logger(name="ReferenceData", component="mm")
+
+from tech_utils.db import get_conn
+from tech_utils.metrics import register_metrics
+from tech_utils.pg_listener import PgListener
+from rfd.config import REFERENCE_DATA_TTL
+
+REFERENCE_CHANNEL = "grfp_reference_changes"
+
+# Snapshot field -> (table, value column)
+REFERENCE_TABLES = {
+    "drone_types": ("grfp_drone_types", "drone_type"),
+    "mission_groups": ("grfp_mission_groups", "mission_group"),
+    "locations": ("grfp_locations", "location"),
+    "mission_types": ("grfp_mission_types", "mission_type"),
+}
+
+Snapshot = namedtuple("Snapshot", list(REFERENCE_TABLES))
+
+
+def install_reference_notify(cur):
+    """
+    Make any write to a reference table send NOTIFY on REFERENCE_CHANNEL (payload: table name),
+    so every replica reloads its snapshot.
+
+    Args:
+        cur: Cursor of the caller's transaction
+    """
+    cur.execute(f"""
+        CREATE OR REPLACE FUNCTION grfp_notify_reference() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('{REFERENCE_CHANNEL}', TG_TABLE_NAME);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    for table, _ in REFERENCE_TABLES.values():
+        cur.execute(f"""
+            DROP TRIGGER IF EXISTS trg_{table}_reference ON {table};
+            CREATE TRIGGER trg_{table}_reference AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+            FOR EACH STATEMENT EXECUTE FUNCTION grfp_notify_reference();
+        """)
+
+
+def _load():
+    """Current values of all reference tables, in one round trip."""
+    query = " UNION ALL ".join(
+        f"SELECT '{field}', {column}::text FROM {table} WHERE valid_to IS NULL"
+        for field, (table, column) in REFERENCE_TABLES.items()
+    )
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(query)
+            rows = cur.fetchall()
+
+    values = {field: set() for field in REFERENCE_TABLES}
+    for field, value in rows:
+        values[field].add(value)
+    return Snapshot(**{field: frozenset(v) for field, v in values.items()})
+
+
+class ReferenceData:
+    """
+    Immutable in-memory snapshot of the reference tables (drone types, mission groups,
+    locations, mission types), so request validation is set membership.
+
+    - The snapshot is replaced as a whole, readers never see a half-loaded one.
+    - It is reloaded on the next lookup after a NOTIFY from the reference tables, after the
+      listener (re)connects (notifications may have been lost) or after `ttl` seconds.
+    - If a reload fails the previous snapshot keeps being served until the next attempt.
+    """
+
+    def __init__(self, ttl=REFERENCE_DATA_TTL, loader=_load):
+        self.ttl = ttl
+        self.loader = loader
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._loaded_at = 0.0
+        self._stale = True
+        self._listener = None
+        self._reloader = None
+        self._stats = {"loads": 0, "load_errors": 0, "invalidations": 0}
+
+    def invalidate(self, payload=None):
+        self._stale = True
+        self._stats["invalidations"] += 1
+
+    def start_listener(self):
+        """Reload on reference table changes instead of waiting for the TTL."""
+        with self._lock:
+            if self._listener is None:
+                self._listener = PgListener(REFERENCE_CHANNEL, self.invalidate, self.invalidate)
+            listener = self._listener
+        listener.start()
+
+    def cached(self):
+        """The snapshot if it is current, else None (never loads)."""
+        snapshot = self._snapshot
+        if snapshot is not None and not self._stale and time.monotonic() - self._loaded_at < self.ttl:
+            return snapshot
+        return None
+
+    def reload_async(self):
+        """Reload in the background (one reload at a time); callers check against the DB meanwhile."""
+        if self._reloader is not None and self._reloader.is_alive():
+            return
+        self._reloader = threading.Thread(target=self._reload, name="ReferenceDataReload", daemon=True)
+        self._reloader.start()
+
+    def _reload(self):
+        try:
+            self.snapshot()
+        except Exception as e:
+            logger.error(f"Reference data load failed: {e}")
+
+    def snapshot(self):
+        snapshot = self.cached()
+        if snapshot is not None:
+            return snapshot
+
+        with self._lock:
+            # Another thread may have reloaded while we waited
+            snapshot = self.cached()
+            if snapshot is not None:
+                return snapshot
+            # Cleared before the query: a change committed during the load marks it stale again
+            self._stale = False
+            try:
+                self._snapshot = self.loader()
+                self._loaded_at = time.monotonic()
+                self._stats["loads"] += 1
+            except Exception as e:
+                self._stale = True
+                self._stats["load_errors"] += 1
+                if self._snapshot is None:
+                    raise
+                logger.error(f"Reference data reload failed, serving the previous snapshot: {e}")
+            return self._snapshot
+
+    def stats(self):
+        snapshot = self._snapshot
+        return {
+            "sizes": {field: len(values) for field, values in snapshot._asdict().items()} if snapshot else None,
+            "age": round(time.monotonic() - self._loaded_at, 1) if snapshot else None,
+            "listening": bool(self._listener and self._listener.connected),
+            **self._stats,
+        }
+
+
+reference_data = ReferenceData()
+register_metrics("reference_data", reference_data.stats)
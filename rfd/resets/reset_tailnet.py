@@ -1,37 +1,114 @@
-from rfd.connections_manager.tailscale_manager import get_devices, get_auth_keys, delete_auth_key, delete_device
-
-def reset_tailnet():
-    devices = get_devices()
-    authkeys = get_auth_keys()
-    deleted_dev = 0
-    deleted_keys = 0
-
-    for d in devices:
-        device_id = d.get("id", "")
-        hostname = d.get("hostname", "")
-        try:
-            if hostname.split('-')[0] in ['gcs', 'client']:
-                if delete_device(device_id):
-                    deleted_dev += 1
-        except Exception as e:
-            print(e)
-            pass
-
-    for key in authkeys:
-        key_id = key.get("id")
-        desc = key.get("description", "")
-        try:
-            if desc.split('-')[0] in ['gcs', 'client']:
-                if delete_auth_key(key_id):
-                    deleted_keys += 1
-        except Exception as e:
-            print(e)
-            pass
-
-    if deleted_dev + deleted_keys == 0:
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+from rfd.connections_manager.tailscale_manager import fetch_inventory, delete_in_parallel
+from rfd.config import TEARDOWN_MAX_WORKERS
+
+DEFAULT_PREFIXES = ['gcs-', 'client-']
+
+
+def _created_at(obj):
+    try:
+        return datetime.fromisoformat(obj.get("created", "").replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        return None
+
+
+def _has_prefix(name, prefix):
+    # A prefix without a dash is a whole first token: 'gcs' matches gcs-1 but not gcsbackup-1
+    if '-' not in prefix:
+        return name.split('-')[0] == prefix
+    return name.startswith(prefix)
+
+
+def select_targets(devices, authkeys, prefixes=DEFAULT_PREFIXES, older_than=None, now=None):
+    """
+    Pick devices and auth keys whose hostname/description prefix matches and,
+    if older_than (timedelta) is given, that were created before now - older_than.
+    Objects with an unknown creation time never match an age filter.
+
+    Returns:
+        tuple: (list of (device_id, hostname), list of (key_id, description))
+    """
+    cutoff = (now or datetime.now(timezone.utc)) - older_than if older_than else None
+
+    def match(name, obj):
+        # Prefixes may span several dash-separated segments (e.g. 'gcs-ab')
+        if not any(_has_prefix(name, p) for p in prefixes):
+            return False
+        if cutoff is None:
+            return True
+        created = _created_at(obj)
+        return created is not None and created < cutoff
+
+    target_devices = [(d.get("id", ""), d.get("hostname", "")) for d in devices if match(d.get("hostname", ""), d)]
+    target_keys = [(k.get("id"), k.get("description", "")) for k in authkeys if match(k.get("description", ""), k)]
+    return target_devices, target_keys
+
+
+def reset_tailnet(prefixes=DEFAULT_PREFIXES, older_than=None, dry_run=False, workers=TEARDOWN_MAX_WORKERS):
+    start = time.monotonic()
+    try:
+        devices, authkeys = fetch_inventory()
+    except Exception as e:
+        print(f"Failed to list Tailnet: {e}")
+        return None
+
+    target_devices, target_keys = select_targets(devices, authkeys, prefixes, older_than)
+    total = len(target_devices) + len(target_keys)
+
+    if total == 0:
         print(f"Nothing found to delete.")
-    else:
-        print(f"Reset finished. {deleted_dev} devices and {deleted_keys} authkeys removed from Tailnet")
+        return {"devices": 0, "keys": 0, "failed": 0}
+
+    if dry_run:
+        for device_id, hostname in target_devices:
+            print(f"[dry-run] device {hostname} ({device_id})")
+        for key_id, desc in target_keys:
+            print(f"[dry-run] authkey {desc} ({key_id})")
+        print(f"Dry run: {len(target_devices)} devices and {len(target_keys)} authkeys would be removed from Tailnet")
+        return {"devices": len(target_devices), "keys": len(target_keys), "failed": 0}
+
+    step = max(1, total // 10)
+
+    def progress(done, total):
+        if done % step == 0 or done == total:
+            print(f"{done}/{total} deletions processed ({done / max(time.monotonic() - start, 0.001):.1f}/s)")
+
+    failed_devices, failed_keys = delete_in_parallel(
+        [device_id for device_id, _ in target_devices],
+        [key_id for key_id, _ in target_keys],
+        max_workers=workers,
+        progress=progress,
+    )
+    elapsed = max(time.monotonic() - start, 0.001)
+    deleted_dev = len(target_devices) - len(failed_devices)
+    deleted_keys = len(target_keys) - len(failed_keys)
+
+    print(f"Reset finished. {deleted_dev} devices and {deleted_keys} authkeys removed from Tailnet "
+          f"in {elapsed:.1f}s ({total / elapsed:.1f} deletions/s)")
+    if failed_devices or failed_keys:
+        print(f"Failed: {len(failed_devices)} devices, {len(failed_keys)} authkeys")
+        for object_id in sorted(failed_devices | failed_keys):
+            print(f"  {object_id}")
+
+    return {"devices": deleted_dev, "keys": deleted_keys, "failed": len(failed_devices) + len(failed_keys)}
+
 
 if __name__ == '__main__':
-    reset_tailnet()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Remove RFD devices and auth keys from the Tailnet")
+    parser.add_argument("--prefix", action="append", dest="prefixes",
+                        help=f"hostname/description prefix to remove, repeatable (default: {' '.join(DEFAULT_PREFIXES)})")
+    parser.add_argument("--older-than", type=int, metavar="MINUTES",
+                        help="only remove devices and keys created more than MINUTES ago")
+    parser.add_argument("--workers", type=int, default=TEARDOWN_MAX_WORKERS, help="concurrent deletions")
+    parser.add_argument("--dry-run", action="store_true", help="only list what would be removed")
+    args = parser.parse_args()
+
+    reset_tailnet(
+        prefixes=args.prefixes or DEFAULT_PREFIXES,
+        older_than=timedelta(minutes=args.older_than) if args.older_than else None,
+        dry_run=args.dry_run,
+        workers=args.workers,
+    )
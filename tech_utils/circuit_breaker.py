@@ -0,0 +1,140 @@
+import threading
+import time
+
+from tech_utils.logger import init_logger
+logger = init_logger(name="CircuitBreaker", component="tech_utils")
+
+from tech_utils.metrics import register_metrics
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a dependency whose circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Fail fast while a dependency is down.
+
+    - closed: calls pass; `failure_threshold` consecutive failures open the circuit.
+    - open: calls raise CircuitOpenError immediately for `reset_timeout` seconds.
+    - half_open: a single probe call is let through; success closes the circuit, failure reopens it.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self._counters = {"calls": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def _current_state(self, now):
+        if self._state == OPEN and now - self._opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def is_open(self):
+        """
+        True while calls would be rejected. Does not take the half-open probe slot.
+        """
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            return state == OPEN or (state == HALF_OPEN and self._probe_in_flight)
+
+    def allow_request(self):
+        """
+        Whether a call may go through now. In half-open state only one probe is allowed.
+        """
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self._counters["rejected"] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._counters["calls"] += 1
+            if self._state != CLOSED:
+                logger.info(f"Circuit {self.name} closed")
+            self._state = CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._counters["calls"] += 1
+            self._counters["failures"] += 1
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self._counters["opened"] += 1
+                    logger.warning(f"Circuit {self.name} opened after {self._failures} consecutive failures")
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def call(self, func, *args, **kwargs):
+        """
+        Call func through the breaker. Any exception counts as a failure and is re-raised.
+
+        Raises:
+            CircuitOpenError: if the circuit is open.
+        """
+        if not self.allow_request():
+            raise CircuitOpenError(f"{self.name} unavailable (circuit open)")
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {
+                "state": self._current_state(time.monotonic()),
+                "consecutive_failures": self._failures,
+                **self._counters,
+            }
+
+
+# === Registry: one breaker per dependency per process ===
+_breakers = {}
+_registry_lock = threading.Lock()
+
+
+def get_breaker(name, failure_threshold=5, reset_timeout=30):
+    """
+    Return the process-wide breaker for a dependency, creating it on first use.
+    """
+    with _registry_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name, failure_threshold, reset_timeout)
+        return _breakers[name]
+
+
+def breakers_stats():
+    with _registry_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.stats() for breaker in breakers}
+
+
+register_metrics("circuit_breakers", breakers_stats)
@@ -1,5 +1,5 @@
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
 from datetime import datetime, timezone
 import os
 from dotenv import load_dotenv
@@ -16,9 +16,9 @@ DB_CONFIG = {
     "port": os.getenv("POSTGRES_PORT"),
 }
 
-def get_conn():
-    """Create a new connection to the PostgreSQL database using environment config."""
-    return psycopg2.connect(**DB_CONFIG)
+def get_conn(**kwargs):
+    """Create a new connection to the PostgreSQL database using environment config (kwargs: extra libpq options)."""
+    return psycopg2.connect(**DB_CONFIG, **kwargs)
 
 
 def update_versioned(
@@ -26,6 +26,7 @@ def update_versioned(
     table: str,
     key_fields: dict,
     update_fields: dict,
+    commit: bool = True,
 ):
     """
     Perform a versioned update on a table:
@@ -38,6 +39,7 @@ def update_versioned(
         table (str): Table name
         key_fields (dict): Dict of primary key fields to locate the current row
         update_fields (dict): Fields to update in the new version
+        commit (bool): Commit at the end. Pass False to keep the change in the caller's transaction
     """
     now = datetime.now(timezone.utc)
 
@@ -100,4 +102,107 @@ def update_versioned(
             values
         )
 
-    conn.commit()
+    if commit:
+        conn.commit()
+
+
+
+def update_versioned_batch(
+    conn,
+    table: str,
+    key_field: str,
+    rows: list,
+    commit: bool = True,
+):
+    """
+    Set-based variant of update_versioned: close the current versions of many records and
+    insert their new versions in one statement.
+
+    Args:
+        conn: Active psycopg2 connection
+        table (str): Table name
+        key_field (str): Field identifying a record (e.g. 'session_id')
+        rows (list): Dicts with the key field and the fields to update (same fields in every dict)
+        commit (bool): Commit at the end. Pass False to keep the change in the caller's transaction
+
+    Returns:
+        list: keys of the records that had a current version (as text)
+    """
+    if not rows:
+        return []
+    update_fields = [f for f in rows[0] if f != key_field]
+
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT * FROM {table} LIMIT 0")
+        columns = [d.name for d in cur.description]
+        copied = [c for c in columns if c not in ("id", "valid_from", "valid_to", *update_fields)]
+        new_fields = [f"__new_{f}" for f in update_fields]
+
+        updated = execute_values(cur, f"""
+            WITH v (__key, {', '.join(new_fields)}) AS (VALUES %s),
+            closed AS (
+                UPDATE {table} t SET valid_to = now()
+                FROM v
+                WHERE t.{key_field}::text = v.__key::text AND t.valid_to IS NULL
+                RETURNING t.*, {', '.join(f"v.{f}" for f in new_fields)}
+            )
+            INSERT INTO {table} ({', '.join(copied + update_fields)}, valid_from)
+            SELECT {', '.join(copied + new_fields)}, now() FROM closed
+            RETURNING {key_field}::text
+            """,
+            [[row[key_field]] + [row[f] for f in update_fields] for row in rows],
+            page_size=len(rows),
+            fetch=True,
+        )
+
+    if commit:
+        conn.commit()
+    return [r[0] for r in updated]
+
+
+CHANGE_CHANNEL = "grfp_changes"
+
+
+def install_change_events(cur, table: str):
+    """
+    Make every new current version of `table` emit a change event:
+    - The event is stored in grfp_change_events (its id is the stream event id, used to resume)
+    - pg_notify(CHANGE_CHANNEL) with the event as JSON, delivered to listeners on commit
+
+    Versioned updates insert the new version, so an AFTER INSERT trigger sees every change.
+    The table must have mission_id and status columns; session_id is optional.
+
+    Args:
+        cur: Cursor of the caller's transaction
+        table (str): Table name
+    """
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS grfp_change_events (
+            id BIGSERIAL PRIMARY KEY,                              -- Stream event id
+            table_name VARCHAR(64) NOT NULL,                       -- Source table
+            mission_id UUID,
+            session_id UUID,
+            status VARCHAR(128),                                   -- Status of the new version
+            created_at TIMESTAMPTZ DEFAULT now()
+        );
+        CREATE INDEX IF NOT EXISTS idx_change_events_mission ON grfp_change_events(mission_id, id);
+        CREATE INDEX IF NOT EXISTS idx_change_events_session ON grfp_change_events(session_id, id);
+        CREATE INDEX IF NOT EXISTS idx_change_events_created ON grfp_change_events(created_at);
+
+        CREATE OR REPLACE FUNCTION grfp_emit_change() RETURNS trigger AS $$
+        DECLARE
+            row_data JSONB := to_jsonb(NEW);
+            event grfp_change_events%ROWTYPE;
+        BEGIN
+            INSERT INTO grfp_change_events (table_name, mission_id, session_id, status)
+            VALUES (TG_TABLE_NAME, (row_data->>'mission_id')::uuid, (row_data->>'session_id')::uuid, row_data->>'status')
+            RETURNING * INTO event;
+            PERFORM pg_notify('{CHANGE_CHANNEL}', row_to_json(event)::text);
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS trg_{table}_change ON {table};
+        CREATE TRIGGER trg_{table}_change AFTER INSERT ON {table}
+        FOR EACH ROW WHEN (NEW.valid_to IS NULL) EXECUTE FUNCTION grfp_emit_change();
+    """)
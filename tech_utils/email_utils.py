@@ -1,19 +1,92 @@
 import smtplib
 import os
+import threading
+from collections import deque
 from email.mime.text import MIMEText
 from dotenv import load_dotenv
 load_dotenv()
 
+from tech_utils.logger import init_logger
+logger = init_logger(name="Email", component="tech_utils")
+
+from tech_utils.circuit_breaker import get_breaker
+from tech_utils.metrics import register_metrics
+
 ground_teams_email = os.getenv('GROUND_TEAMS_EMAIL')
 rfd_admin_email = os.getenv('RFD_ADMIN_EMAIL')
 
+EMAIL_TIMEOUT = int(os.getenv("EMAIL_TIMEOUT", 10))
+EMAIL_DEFERRED_MAX = int(os.getenv("EMAIL_DEFERRED_MAX", 1000))
+
+_smtp_breaker = get_breaker(
+    "smtp",
+    failure_threshold=int(os.getenv("EMAIL_BREAKER_FAILURES", 3)),
+    reset_timeout=int(os.getenv("EMAIL_BREAKER_RESET", 60)),
+)
+# Emails waiting for SMTP to come back (oldest are dropped when full)
+_deferred = deque(maxlen=EMAIL_DEFERRED_MAX)
+_flush_lock = threading.Lock()
+
+
 def send_email(subject, body, to):
     msg = MIMEText(body)
     msg["Subject"] = subject
     msg["From"] = os.getenv("EMAIL_USER")
     msg["To"] = to
 
-    with smtplib.SMTP(os.getenv("EMAIL_SMTP"), int(os.getenv("EMAIL_PORT"))) as server:
+    with smtplib.SMTP(os.getenv("EMAIL_SMTP"), int(os.getenv("EMAIL_PORT")), timeout=EMAIL_TIMEOUT) as server:
         server.starttls()
         server.login(os.getenv("EMAIL_USER"), os.getenv("EMAIL_PASSWORD"))
         server.send_message(msg)
+
+
+def send_email_or_defer(subject, body, to):
+    """
+    Send an email through the SMTP circuit breaker. If SMTP fails or the circuit is open,
+    the email is queued for flush_deferred_emails() instead of failing the caller.
+
+    Returns:
+        bool: True if sent now, False if deferred.
+    """
+    try:
+        _smtp_breaker.call(send_email, subject, body, to)
+        return True
+    except Exception as e:
+        logger.warning(f"Email '{subject}' to {to} deferred: {e}")
+        _deferred.append((subject, body, to))
+        return False
+
+
+def flush_deferred_emails():
+    """
+    Background job: send deferred emails in order. Stops at the first failure
+    and does nothing while the SMTP circuit is open.
+
+    Returns:
+        int: number of emails sent.
+    """
+    if not _deferred or _smtp_breaker.is_open():
+        return 0
+    if not _flush_lock.acquire(blocking=False):
+        return 0
+
+    sent = 0
+    try:
+        while _deferred:
+            item = _deferred.popleft()
+            try:
+                _smtp_breaker.call(send_email, *item)
+            except Exception as e:
+                _deferred.appendleft(item)
+                logger.warning(f"Deferred email flush stopped: {e}")
+                break
+            sent += 1
+    finally:
+        _flush_lock.release()
+
+    if sent:
+        logger.info(f"Sent {sent} deferred emails, {len(_deferred)} left")
+    return sent
+
+
+register_metrics("email", lambda: {"deferred": len(_deferred)})
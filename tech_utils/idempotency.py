@@ -0,0 +1,95 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class IdempotencyConflict(Exception):
+    """The idempotency key was already used for a different request."""
+
+
+class _Entry:
+    def __init__(self, fingerprint):
+        self.fingerprint = fingerprint
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.expires_at = None
+
+
+class IdempotencyStore:
+    """
+    Short-lived in-memory result store with single-flight execution.
+
+    - The first request for a key runs the handler; concurrent requests with the same key
+      wait for it and share its result.
+    - Results accepted by `cacheable` are replayed to retries for `ttl` seconds.
+    - A key reused with a different request fingerprint raises IdempotencyConflict.
+    """
+
+    def __init__(self, ttl=600, max_entries=10000, cacheable=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.cacheable = cacheable or (lambda result: True)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"executed": 0, "replayed": 0, "coalesced": 0, "conflicts": 0}
+
+    def _purge(self, now):
+        # Entries are stored in completion order, so expired ones are at the front
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            done = entry.event.is_set()
+            if done and (entry.expires_at <= now or len(self._entries) > self.max_entries):
+                self._entries.popitem(last=False)
+            else:
+                break
+
+    def run(self, key, fingerprint, func):
+        """
+        Run func once per key (see class docstring) and return its result.
+
+        Raises:
+            IdempotencyConflict: if the key belongs to a request with another fingerprint.
+        """
+        with self._lock:
+            self._purge(time.monotonic())
+            entry = self._entries.get(key)
+            if entry is not None and entry.fingerprint != fingerprint:
+                self._stats["conflicts"] += 1
+                raise IdempotencyConflict("Idempotency key reused with a different request")
+            leader = entry is None
+            if leader:
+                entry = _Entry(fingerprint)
+                self._entries[key] = entry
+                self._stats["executed"] += 1
+            else:
+                self._stats["replayed" if entry.event.is_set() else "coalesced"] += 1
+
+        if not leader:
+            entry.event.wait()
+            if entry.error is not None:
+                raise entry.error
+            return entry.result
+
+        try:
+            entry.result = func()
+        except Exception as e:
+            entry.error = e
+            with self._lock:
+                self._entries.pop(key, None)
+            entry.event.set()
+            raise
+
+        with self._lock:
+            if self.cacheable(entry.result):
+                entry.expires_at = time.monotonic() + self.ttl
+                self._entries.move_to_end(key)
+            else:
+                # Let the next retry run the handler again
+                self._entries.pop(key, None)
+        entry.event.set()
+        return entry.result
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._entries), **self._stats}
@@ -0,0 +1,218 @@
+import hashlib
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timezone
+
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.events import EVENT_JOB_MAX_INSTANCES
+
+from tech_utils.logger import init_logger
+logger = init_logger(name="JobRunner", component="tech_utils")
+
+from tech_utils.db import get_conn
+from tech_utils.metrics import register_metrics
+
+# The lease connection must die quickly with its process or host, so the lock is released
+# and another replica takes over: TCP keepalives on both ends (~60s to detect a dead peer)
+_LEASE_CONN_OPTIONS = {
+    "keepalives": 1,
+    "keepalives_idle": 30,
+    "keepalives_interval": 10,
+    "keepalives_count": 3,
+    "options": "-c tcp_keepalives_idle=30 -c tcp_keepalives_interval=10 -c tcp_keepalives_count=3",
+}
+
+
+def install_job_runs(cur):
+    """
+    Create the grfp_job_runs table (run history of exclusive jobs).
+
+    Args:
+        cur: Cursor of the caller's transaction
+    """
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS grfp_job_runs (
+            id BIGSERIAL PRIMARY KEY,
+            job_name VARCHAR(128) NOT NULL,                 -- <component>:<job>
+            owner VARCHAR(255) NOT NULL,                    -- host:pid of the process that ran (or skipped) it
+            outcome VARCHAR(16) NOT NULL,                   -- ok, error, skipped (previous run still in progress)
+            started_at TIMESTAMPTZ NOT NULL,
+            duration_ms INTEGER,                            -- NULL for skipped runs
+            error TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_job_runs_name ON grfp_job_runs(job_name, started_at);
+    """)
+
+
+def lock_key(name):
+    """Stable 64-bit advisory lock key of a job name."""
+    return int.from_bytes(hashlib.sha256(f"grfp_job:{name}".encode()).digest()[:8], "big", signed=True)
+
+
+class JobRunner:
+    """
+    APScheduler wrapper that runs exclusive jobs on one replica only.
+
+    - Leadership is a session-level Postgres advisory lock per job, taken with
+      pg_try_advisory_lock on one lease connection per process and held between runs.
+      Replicas that don't hold it skip the run.
+    - When the leader dies its connection closes, Postgres releases the locks and the next
+      tick of another replica takes them over.
+    - Runs of exclusive jobs (duration, outcome, error) and runs skipped because the
+      previous one was still in progress are recorded in grfp_job_runs. High-frequency jobs
+      added with record=False only record failed and skipped runs.
+    - Jobs working on per-process state (in-memory queues, caches) are added with
+      exclusive=False and run on every replica without a lock or history.
+    """
+
+    def __init__(self, component, retention=7 * 86400):
+        self.component = component
+        self.retention = retention
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.scheduler = BackgroundScheduler()
+        self.scheduler.add_listener(self._on_max_instances, EVENT_JOB_MAX_INSTANCES)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._held = set()
+        self._jobs = {}   # job id -> per-job counters
+        self.add_job(self.purge_runs, "interval", name="purge_job_runs", hours=24)
+
+    def add_job(self, func, trigger, name=None, exclusive=True, record=True, **trigger_args):
+        """
+        Schedule func (APScheduler trigger and trigger arguments). Overlapping runs are skipped.
+
+        Args:
+            name (str): Job name, unique per component (defaults to the function name)
+            exclusive (bool): Run on the leader replica only
+            record (bool): Record successful runs in grfp_job_runs (failed and skipped runs always are)
+        """
+        job_id = f"{self.component}:{name or func.__name__}"
+        self._jobs[job_id] = {"exclusive": exclusive, "record": record, "runs": 0, "errors": 0, "overlap_skips": 0,
+                              "not_leader": 0, "last_outcome": None, "last_duration": None}
+        self.scheduler.add_job(self._run, trigger, args=(job_id, func, exclusive), id=job_id, name=job_id,
+                               max_instances=1, coalesce=True, **trigger_args)
+
+    def start(self):
+        self.scheduler.start()
+
+    def shutdown(self):
+        """Stop scheduling and give up leadership right away."""
+        self.scheduler.shutdown(wait=False)
+        with self._lock:
+            self._close()
+
+    # === Leadership ===
+    def _close(self):
+        # Caller holds the lock
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+        self._conn = None
+        if self._held:
+            logger.warning(f"{self.owner} released leadership of {sorted(self._held)}")
+        self._held.clear()
+
+    def _lease_conn(self):
+        # Caller holds the lock. A broken connection means its locks are gone.
+        if self._conn is not None:
+            try:
+                with self._conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+                return self._conn
+            except Exception as e:
+                logger.warning(f"Job lease connection lost: {e}")
+                self._close()
+        self._conn = get_conn(**_LEASE_CONN_OPTIONS)
+        self._conn.autocommit = True
+        return self._conn
+
+    def is_leader(self, job_id):
+        """Hold (or take over) the lock of an exclusive job."""
+        with self._lock:
+            try:
+                conn = self._lease_conn()
+                if job_id in self._held:
+                    return True
+                with conn.cursor() as cur:
+                    cur.execute("SELECT pg_try_advisory_lock(%s)", (lock_key(job_id),))
+                    acquired = cur.fetchone()[0]
+            except Exception as e:
+                logger.error(f"Leadership check for {job_id} failed: {e}")
+                self._close()
+                return False
+            if acquired:
+                self._held.add(job_id)
+                logger.info(f"{self.owner} is the leader for {job_id}")
+            return acquired
+
+    # === Runs ===
+    def _record(self, job_id, started_at, duration_ms, outcome, error=None):
+        try:
+            with get_conn() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("""
+                        INSERT INTO grfp_job_runs (job_name, owner, outcome, started_at, duration_ms, error)
+                        VALUES (%s, %s, %s, %s, %s, %s)
+                    """, (job_id, self.owner, outcome, started_at, duration_ms, error))
+                conn.commit()
+        except Exception as e:
+            logger.error(f"Could not record run of {job_id}: {e}")
+
+    def _run(self, job_id, func, exclusive):
+        stats = self._jobs[job_id]
+        if exclusive and not self.is_leader(job_id):
+            stats["not_leader"] += 1
+            return
+
+        started_at = datetime.now(timezone.utc)
+        start = time.monotonic()
+        outcome, error = "ok", None
+        try:
+            func()
+        except Exception as e:
+            outcome, error = "error", str(e)
+            stats["errors"] += 1
+            logger.error(f"Job {job_id} failed: {e}", exc_info=True)
+        duration_ms = int((time.monotonic() - start) * 1000)
+
+        stats["runs"] += 1
+        stats["last_outcome"] = outcome
+        stats["last_duration"] = duration_ms
+        if exclusive and (stats["record"] or outcome != "ok"):
+            self._record(job_id, started_at, duration_ms, outcome, error)
+
+    def _on_max_instances(self, event):
+        stats = self._jobs.get(event.job_id)
+        if stats is None:
+            return
+        stats["overlap_skips"] += 1
+        logger.warning(f"Job {event.job_id} skipped: previous run still in progress")
+        with self._lock:
+            leader = event.job_id in self._held
+        if stats["exclusive"] and leader:
+            self._record(event.job_id, datetime.now(timezone.utc), None, "skipped", "previous run still in progress")
+
+    def purge_runs(self):
+        with get_conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    DELETE FROM grfp_job_runs
+                    WHERE job_name LIKE %s AND started_at < now() - make_interval(secs => %s)
+                """, (f"{self.component}:%", self.retention))
+            conn.commit()
+
+    def stats(self):
+        with self._lock:
+            held = sorted(self._held)
+        return {"owner": self.owner, "leader_of": held, "jobs": {k: dict(v) for k, v in self._jobs.items()}}
+
+
+def create_job_runner(component, retention=7 * 86400):
+    """JobRunner of a service, with its stats registered in metrics as 'jobs'."""
+    runner = JobRunner(component, retention)
+    register_metrics("jobs", runner.stats)
+    return runner
@@ -0,0 +1,46 @@
+import gzip
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask import Response, request
+
+try:
+    import orjson
+except ImportError:     # optional: the standard library encoder is used instead
+    orjson = None
+
+GZIP_MIN_BYTES = 1400   # smaller bodies fit in one packet anyway
+GZIP_LEVEL = 5          # most of the size reduction of level 9 at a fraction of the CPU
+
+
+def _default(value):
+    # Types neither encoder handles natively (the stdlib one also gets UUIDs and datetimes here)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+def dumps(obj) -> bytes:
+    """
+    Serialize to compact JSON bytes. orjson handles UUID, datetime and tuples natively;
+    without it the output is the same, only slower.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default)
+    return json.dumps(obj, default=_default, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def json_response(payload, status=200, min_gzip=GZIP_MIN_BYTES):
+    """
+    Flask JSON response for large payloads: fast encoder, gzip when the client accepts it
+    and the body is at least `min_gzip` bytes.
+    """
+    body = dumps(payload)
+    headers = {"Vary": "Accept-Encoding"}
+    if len(body) >= min_gzip and "gzip" in request.accept_encodings:
+        body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+        headers["Content-Encoding"] = "gzip"
+    return Response(body, status=status, mimetype="application/json", headers=headers)
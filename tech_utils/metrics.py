@@ -0,0 +1,35 @@
+import threading
+
+from tech_utils.logger import init_logger
+logger = init_logger(name="Metrics", component="tech_utils")
+
+# === Registry of metric sources: name -> callable returning a JSON-serializable value ===
+_sources = {}
+_lock = threading.Lock()
+
+
+def register_metrics(name: str, source) -> None:
+    """
+    Register a callable that returns the current value of a group of metrics.
+    Registering the same name again replaces the previous source.
+    """
+    with _lock:
+        _sources[name] = source
+
+
+def collect_metrics() -> dict:
+    """
+    Snapshot of all registered metric sources. A failing source is reported as None
+    instead of breaking the whole snapshot.
+    """
+    with _lock:
+        sources = dict(_sources)
+
+    snapshot = {}
+    for name, source in sources.items():
+        try:
+            snapshot[name] = source()
+        except Exception as e:
+            logger.warning(f"Metrics source {name} failed: {e}")
+            snapshot[name] = None
+    return snapshot
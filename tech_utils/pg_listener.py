@@ -0,0 +1,89 @@
+import select
+import threading
+
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+from tech_utils.logger import init_logger
+logger = init_logger(name="PgListener", component="tech_utils")
+
+from tech_utils.db import get_conn
+
+
+class PgListener:
+    """
+    One background thread holding a LISTEN connection and handing NOTIFY payloads to callbacks.
+
+    - on_notify(payload) is called on the listener thread for every notification, so it must be quick.
+    - on_connect() is called after every (re)connection; notifications sent while the
+      connection was down are lost, so this is where consumers catch up.
+    - A dropped connection is retried every `retry_interval` seconds.
+    """
+
+    def __init__(self, channel, on_notify, on_connect=None, poll_timeout=5, retry_interval=5):
+        self.channel = channel
+        self.on_notify = on_notify
+        self.on_connect = on_connect
+        self.poll_timeout = poll_timeout
+        self.retry_interval = retry_interval
+        self.connected = False
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._stats = {"notifications": 0, "reconnects": 0, "callback_errors": 0}
+
+    def start(self):
+        """Start the listener thread (no-op if it is already running)."""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name=f"PgListener-{self.channel}", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _listen(self, conn):
+        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cur:
+            cur.execute(f"LISTEN {self.channel};")
+        self.connected = True
+        logger.info(f"Listening on '{self.channel}'")
+        if self.on_connect:
+            self.on_connect()
+
+        while not self._stop.is_set():
+            # Wake up now and then to notice stop() and dead connections
+            if select.select([conn], [], [], self.poll_timeout) == ([], [], []):
+                continue
+            conn.poll()
+            while conn.notifies:
+                notify = conn.notifies.pop(0)
+                self._stats["notifications"] += 1
+                try:
+                    self.on_notify(notify.payload)
+                except Exception as e:
+                    self._stats["callback_errors"] += 1
+                    logger.error(f"Notification handler failed on '{self.channel}': {e}", exc_info=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = get_conn()
+                self._listen(conn)
+            except Exception as e:
+                logger.warning(f"Listener on '{self.channel}' lost its connection: {e}")
+            finally:
+                self.connected = False
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+            if self._stop.wait(self.retry_interval):
+                break
+            self._stats["reconnects"] += 1
+
+    def stats(self):
+        return {"connected": self.connected, **self._stats}
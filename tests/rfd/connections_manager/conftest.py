@@ -0,0 +1,10 @@
+import pytest
+
+from rfd.connections_manager import api_scheduler
+
+
+@pytest.fixture(autouse=True)
+def closed_tailscale_circuit():
+    # Mocked 5xx responses in one test must not open the shared circuit for the next ones
+    api_scheduler._breaker.record_success()
+    yield
@@ -0,0 +1,83 @@
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock
+
+from rfd.connections_manager import api_scheduler
+from rfd.connections_manager.api_scheduler import TailscaleApiScheduler, PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+from tech_utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+def _response(status_code, headers=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = headers or {}
+    return response
+
+
+# === Test: interactive calls are served before queued background calls ===
+def test_interactive_served_first():
+    scheduler = TailscaleApiScheduler(rate=20, burst=1, min_rate=1)
+    scheduler.acquire(PRIORITY_BACKGROUND)  # drain the bucket
+    order = []
+
+    def call(name, priority):
+        scheduler.acquire(priority)
+        order.append(name)
+
+    background = [threading.Thread(target=call, args=(f"bg{i}", PRIORITY_BACKGROUND)) for i in range(3)]
+    for t in background:
+        t.start()
+    time.sleep(0.01)
+    interactive = threading.Thread(target=call, args=("interactive", PRIORITY_INTERACTIVE))
+    interactive.start()
+    for t in background + [interactive]:
+        t.join()
+
+    assert order.index("interactive") <= 1
+    assert scheduler.stats()["wait"]["interactive"]["calls"] == 1
+
+
+# === Test: 429 pauses the bucket for Retry-After and halves the rate ===
+def test_throttled_backs_off():
+    scheduler = TailscaleApiScheduler(rate=10, burst=5, min_rate=1)
+
+    scheduler.throttled(0.2)
+
+    stats = scheduler.stats()
+    assert stats["rate"] == 5 and stats["throttled"] == 1
+    start = time.monotonic()
+    scheduler.acquire()
+    assert time.monotonic() - start >= 0.15
+
+
+# === Test: schedule_call retries a 429 and returns the final response ===
+def test_schedule_call_retries_429(monkeypatch):
+    monkeypatch.setattr(api_scheduler, "_scheduler", TailscaleApiScheduler(rate=100, burst=10, min_rate=50))
+    func = MagicMock(side_effect=[_response(429, {"Retry-After": "0"}), _response(200)])
+
+    response = api_scheduler.schedule_call(func, "https://example", priority=PRIORITY_INTERACTIVE, timeout=5)
+
+    assert response.status_code == 200
+    assert func.call_count == 2
+    func.assert_called_with("https://example", timeout=5)
+
+
+# === Test: Retry-After header parsing ===
+def test_retry_after_seconds():
+    assert api_scheduler._retry_after_seconds(_response(429, {"Retry-After": "7"}), 0) == 7
+    assert api_scheduler._retry_after_seconds(_response(429), 2) == api_scheduler.TS_API_BACKOFF_BASE * 4
+
+
+# === Test: 5xx responses open the Tailscale circuit, further calls fail fast ===
+def test_schedule_call_circuit_opens(monkeypatch):
+    monkeypatch.setattr(api_scheduler, "_breaker", CircuitBreaker("tailscale-test", failure_threshold=2, reset_timeout=60))
+    func = MagicMock(return_value=_response(503))
+
+    api_scheduler.schedule_call(func, "https://example")
+    api_scheduler.schedule_call(func, "https://example")
+    with pytest.raises(CircuitOpenError):
+        api_scheduler.schedule_call(func, "https://example")
+
+    assert func.call_count == 2
+    assert api_scheduler.tailscale_unavailable()
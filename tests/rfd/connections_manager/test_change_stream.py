@@ -0,0 +1,158 @@
+import asyncio
+import json
+import threading
+from unittest.mock import patch
+
+from rfd.connections_manager.change_stream import ChangeBroker
+
+MISSION = "11111111-1111-1111-1111-111111111111"
+OTHER_MISSION = "22222222-2222-2222-2222-222222222222"
+SESSION = "33333333-3333-3333-3333-333333333333"
+
+
+def _event(event_id, mission_id=MISSION, session_id=SESSION, status="in progress"):
+    return {"id": event_id, "table_name": "grfp_sessions", "mission_id": mission_id,
+            "session_id": session_id, "status": status, "created_at": "2026-01-01T00:00:00+00:00"}
+
+
+def _broker(**kwargs):
+    broker = ChangeBroker(keepalive=0.05, **kwargs)
+    broker.ensure_listener = lambda: None
+    return broker
+
+
+async def _take(stream, count):
+    # The next `count` items of an async generator
+    return [await anext(stream) for _ in range(count)]
+
+
+# === Test: events reach only the subscribers whose filter matches ===
+def test_fan_out_by_filter():
+    broker = _broker()
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        mine, others = broker.subscribe(mission_id=MISSION), broker.subscribe(mission_id=OTHER_MISSION)
+        # Register both subscribers: they block waiting (keepalives) until an event comes
+        assert await _take(mine, 1) == [None] and await _take(others, 1) == [None]
+
+        def produce():
+            # Published from another thread, like the LISTEN thread does
+            broker._on_notify(json.dumps(_event(1)))
+            broker.publish(_event(2, mission_id=OTHER_MISSION, session_id=None))
+            broker.publish(_event(3, status="finished"))
+            broker.publish(_event(3, status="finished"))  # duplicate (read back after a reconnect)
+            broker.publish(_event(4, mission_id=OTHER_MISSION, session_id=None))
+
+        await loop.run_in_executor(None, produce)
+        got = [[e for e in await _take(s, 3) if e is not None][:2] for s in (mine, others)]
+        assert broker.stats()["subscribers"] == 2
+        await mine.aclose()
+        await others.aclose()
+        return got
+
+    mine, others = asyncio.run(run())
+
+    assert [e["id"] for e in mine] == [1, 3]
+    assert [e["id"] for e in others] == [2, 4]
+    stats = broker.stats()
+    assert stats["duplicates"] == 1
+    assert stats["subscribers"] == 0 and stats["filters"] == 0
+
+
+# === Test: a waiting subscriber is woken by an event from another thread, not by the keepalive ===
+def test_wakeup_across_threads():
+    broker = ChangeBroker(keepalive=30)
+    broker.ensure_listener = lambda: None
+
+    async def run():
+        stream = broker.subscribe(session_id=SESSION)
+        waiting = asyncio.ensure_future(anext(stream))
+        while not broker.stats()["subscribers"]:
+            await asyncio.sleep(0)
+        threading.Thread(target=broker.publish, args=(_event(1),)).start()
+        event = await asyncio.wait_for(waiting, 2)
+        await stream.aclose()
+        return event
+
+    assert asyncio.run(run())["id"] == 1
+
+
+# === Test: idle subscribers get keepalives ===
+def test_keepalive_when_idle():
+    broker = _broker()
+
+    async def run():
+        stream = broker.subscribe(session_id=SESSION)
+        item = await anext(stream)
+        await stream.aclose()
+        return item
+
+    assert asyncio.run(run()) is None
+
+
+# === Test: resume from an event id still in the buffer replays from memory ===
+@patch("rfd.connections_manager.change_stream.fetch_events")
+def test_resume_from_buffer(mock_fetch):
+    broker = _broker()
+    for i in range(1, 5):
+        broker.publish(_event(i))
+
+    async def run():
+        stream = broker.subscribe(session_id=SESSION, last_event_id=2)
+        items = await _take(stream, 3)
+        await stream.aclose()
+        return items
+
+    first, second, idle = asyncio.run(run())
+    assert [first["id"], second["id"]] == [3, 4]
+    assert idle is None
+    mock_fetch.assert_not_called()
+
+
+# === Test: resume from an event id no longer buffered reads the gap from the DB ===
+@patch("rfd.connections_manager.change_stream.fetch_events")
+def test_resume_backfills_from_db(mock_fetch):
+    broker = _broker(buffer_size=2)
+    for i in range(1, 5):
+        broker.publish(_event(i))
+    mock_fetch.return_value = [_event(2), _event(3), _event(4)]
+
+    async def run():
+        stream = broker.subscribe(mission_id=MISSION, last_event_id=1)
+        events = await _take(stream, 3)
+        broker.publish(_event(5))
+        # Buffered events already sent from the DB are not repeated
+        events += await _take(stream, 1)
+        await stream.aclose()
+        return events
+
+    assert [e["id"] for e in asyncio.run(run())] == [2, 3, 4, 5]
+    mock_fetch.assert_called_once_with(1, MISSION, None)
+
+
+# === Test: reconnecting listener reads back missed events ===
+@patch("rfd.connections_manager.change_stream.fetch_events")
+def test_catch_up_after_reconnect(mock_fetch):
+    broker = _broker()
+    broker.publish(_event(10))
+    mock_fetch.return_value = [_event(10), _event(11)]
+
+    broker._on_connect()
+
+    mock_fetch.assert_called_once_with(9)
+    assert broker.stats()["buffered"] == 2
+
+
+# === Test: observers see each new event once and None after a reconnect ===
+@patch("rfd.connections_manager.change_stream.fetch_events", return_value=[])
+def test_observers_notified(mock_fetch):
+    broker = _broker()
+    seen = []
+    broker.observe(seen.append)
+
+    broker.publish(_event(1))
+    broker.publish(_event(1))
+    broker._on_connect()
+
+    assert seen == [_event(1), None]
@@ -3,13 +3,13 @@ from unittest.mock import patch, MagicMock
 
 # === Tests for clean_session ===
 
-@patch("rfd.connections_manager.cleaner.remove_from_tailnet")
+@patch("rfd.connections_manager.cleaner.enqueue_teardown")
 @patch("rfd.connections_manager.cleaner.update_versioned")
 @patch("rfd.connections_manager.cleaner.get_conn")
-def test_clean_session_success(mock_get_conn, mock_update_versioned, mock_remove_from_tailnet):
+def test_clean_session_success(mock_get_conn, mock_update_versioned, mock_enqueue_teardown):
     # Simulate a session in progress and with an active VPN hostname
     mock_cursor = MagicMock()
-    mock_cursor.fetchone.side_effect = [("in progress",), ("hostname123",)]
+    mock_cursor.fetchone.side_effect = [("in progress",), ("hostname123", "key123")]
     mock_conn = MagicMock()
     mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
     mock_get_conn.return_value.__enter__.return_value = mock_conn
@@ -17,9 +17,10 @@ def test_clean_session_success(mock_get_conn, mock_update_versioned, mock_remove
     from rfd.connections_manager.cleaner import clean_session
     clean_session("session123", "completed")
 
-    # Ensure update_versioned is called twice and hostname is removed from Tailnet
+    # Ensure update_versioned is called twice and hostname removal is queued in the same transaction
     assert mock_update_versioned.call_count == 2
-    mock_remove_from_tailnet.assert_called_once_with("hostname123")
+    assert mock_update_versioned.call_args_list[0].kwargs == {"commit": False}
+    mock_enqueue_teardown.assert_called_once_with(mock_conn, "hostname123", "key123")
 
 
 @patch("rfd.connections_manager.cleaner.get_conn")
@@ -48,44 +49,33 @@ def test_clean_session_wrong_status(mock_get_conn):
     clean_session("session_wrong_status", "aborted")  # Should skip update
 
 
-# === Tests for cleaner ===
+# === Tests for abort_duplicate_sessions ===
 
-@patch("rfd.connections_manager.cleaner.update_versioned")
-@patch("rfd.connections_manager.cleaner.clean_session")
+@patch("rfd.connections_manager.cleaner.clean_session", return_value=True)
 @patch("rfd.connections_manager.cleaner.get_conn")
-def test_cleaner_with_sessions(mock_get_conn, mock_clean_session, mock_update_versioned):
+def test_abort_duplicate_sessions(mock_get_conn, mock_clean_session):
     mock_cursor = MagicMock()
-    mock_cursor.fetchall.side_effect = [
-        [("session1",), ("session2",)],  # duplicate sessions
-        [("session2",), ("session3",)]   # expired VPNs
-    ]
+    mock_cursor.fetchall.return_value = [("session1",), ("session2",)]  # not the latest of their mission
     mock_conn = MagicMock()
     mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
     mock_get_conn.return_value.__enter__.return_value = mock_conn
 
-    from rfd.connections_manager.cleaner import cleaner
-    cleaner()
+    from rfd.connections_manager.cleaner import abort_duplicate_sessions
+    assert abort_duplicate_sessions() == 2
 
-    # Test call of clean_session
-    assert mock_clean_session.call_count == 2
     cleaned_ids = {call.args[0] for call in mock_clean_session.call_args_list}
     assert cleaned_ids == {"session1", "session2"}
 
-    # Test update_versioned for expired VPNs
-    vpn_calls = [
-        call.args for call in mock_update_versioned.call_args_list
-        if call.args[0] == mock_conn and call.args[1] == 'vpn_connections'
-    ]
-    updated_ids = {kwargs[2]['parent_id'] for kwargs in vpn_calls}
-    assert updated_ids == {"session2", "session3"}
 
+# === Tests for cleaner ===
 
+@patch("rfd.connections_manager.cleaner.drain_outbox")
 @patch("rfd.connections_manager.cleaner.clean_session")
 @patch("rfd.connections_manager.cleaner.get_conn")
-def test_cleaner_no_sessions(mock_get_conn, mock_clean_session):
+def test_cleaner_no_sessions(mock_get_conn, mock_clean_session, mock_drain_outbox):
     # Simulate no sessions to clean
     mock_cursor = MagicMock()
-    mock_cursor.fetchall.side_effect = [[], []]
+    mock_cursor.fetchall.side_effect = [[]]
     mock_conn = MagicMock()
     mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
     mock_get_conn.return_value.__enter__.return_value = mock_conn
@@ -93,5 +83,30 @@ def test_cleaner_no_sessions(mock_get_conn, mock_clean_session):
     from rfd.connections_manager.cleaner import cleaner
     cleaner()
 
-    # No sessions should be processed
+    # Sessions are no longer scanned for duplicates
     mock_clean_session.assert_not_called()
+    assert mock_cursor.execute.call_count == 1
+    # Queued removals are torn down at the end of the run
+    mock_drain_outbox.assert_called_once()
+
+
+@patch("rfd.connections_manager.cleaner.drain_outbox")
+@patch("rfd.connections_manager.cleaner.enqueue_teardown")
+@patch("rfd.connections_manager.cleaner.update_versioned")
+@patch("rfd.connections_manager.cleaner.get_conn")
+def test_cleaner_resolves_pending_reservations(mock_get_conn, mock_update_versioned, mock_enqueue_teardown, mock_drain_outbox):
+    mock_cursor = MagicMock()
+    mock_cursor.fetchall.side_effect = [
+        [("conn1", "client-11111111", False), ("conn2", "gcs-22222222", True)]
+    ]
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_get_conn.return_value.__enter__.return_value = mock_conn
+
+    from rfd.connections_manager.cleaner import cleaner
+    cleaner()
+
+    # Both reservations are marked failed, only the unused hostname is torn down
+    failed = [call.args[2] for call in mock_update_versioned.call_args_list if call.args[3] == {'status': 'failed'}]
+    assert failed == [{'connection_id': 'conn1'}, {'connection_id': 'conn2'}]
+    mock_enqueue_teardown.assert_called_once_with(mock_conn, "client-11111111")
@@ -1,10 +1,15 @@
 import pytest
+from datetime import datetime, timezone
 from unittest.mock import patch, MagicMock, mock_open
 from flask import Flask
+from tech_utils.circuit_breaker import CircuitOpenError
+from rfd.config import CHANGE_STREAM_PORT
 from rfd.connections_manager.endpoints import (
     register_gcs,
     get_vpn_connection,
     delete_vpn_connection,
+    renew_vpn_connection,
+    wait_for_device,
     start_session,
     close_session
 )
@@ -15,6 +20,8 @@ def app():
     app.add_url_rule('/register-gcs', view_func=register_gcs, methods=['POST'])
     app.add_url_rule('/get-vpn-connection', view_func=get_vpn_connection, methods=['POST'])
     app.add_url_rule('/delete-vpn-connection', view_func=delete_vpn_connection, methods=['POST'])
+    app.add_url_rule('/renew-vpn-connection', view_func=renew_vpn_connection, methods=['POST'])
+    app.add_url_rule('/wait-for-device', view_func=wait_for_device, methods=['POST'])
     app.add_url_rule('/start-session', view_func=start_session, methods=['POST'])
     app.add_url_rule('/close-session', view_func=close_session, methods=['POST'])
     return app
@@ -38,19 +45,20 @@ def test_register_gcs(mock_open, client):
 
 # === Test get_vpn_connection_gcs ===
 
+@patch("rfd.connections_manager.endpoints.update_versioned")
 @patch("rfd.connections_manager.endpoints.get_conn")
-@patch("rfd.connections_manager.endpoints.create_token")
-@patch("rfd.connections_manager.endpoints.serialization.load_pem_public_key")
+@patch("rfd.connections_manager.endpoints.issue_token")
+@patch("rfd.connections_manager.endpoints.load_public_key")
 @patch("builtins.open")
-def test_get_vpn_connection_gcs_success(mock_open, mock_load_key, mock_create_token, mock_get_conn, client):
+def test_get_vpn_connection_gcs_success(mock_open, mock_load_key, mock_issue_token, mock_get_conn, mock_update, client):
     mock_open.return_value.__enter__.return_value.read.return_value = "validtoken"
-    mock_create_token.return_value = ("token", "hash", "2025-01-01T00:00:00Z", "hostname")
+    mock_issue_token.return_value = ("token", "hash", datetime(2025, 1, 1, tzinfo=timezone.utc), "hostname", "key1")
     mock_key = MagicMock()
     mock_key.encrypt.return_value = b"encrypted"
-    mock_load_key.return_value = mock_key
+    mock_load_key.return_value = (mock_key, MagicMock())
 
     mock_cursor = MagicMock()
-    mock_cursor.fetchone.return_value = True
+    mock_cursor.fetchone.side_effect = [True, None]  # mission found, no lease to renew
     mock_conn = MagicMock()
     mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
     mock_get_conn.return_value.__enter__.return_value = mock_conn
@@ -64,6 +72,202 @@ def test_get_vpn_connection_gcs_success(mock_open, mock_load_key, mock_create_to
     assert response.status_code == 200
     assert response.json["status"] == "ok"
 
+    # Reserved as pending first, then activated with the issued key
+    insert_sql = mock_cursor.execute.call_args_list[-1].args[0]
+    assert "'pending'" in insert_sql
+    mock_update.assert_called_once()
+    assert mock_update.call_args.args[3]["status"] == "active"
+    assert mock_update.call_args.args[3]["key_id"] == "key1"
+
+
+@patch("rfd.connections_manager.endpoints.update_versioned")
+@patch("rfd.connections_manager.endpoints.get_conn")
+@patch("rfd.connections_manager.endpoints.issue_token", side_effect=RuntimeError("Tailscale down"))
+@patch("rfd.connections_manager.endpoints.load_public_key")
+@patch("builtins.open")
+def test_get_vpn_connection_marks_reservation_failed(mock_open, mock_load_key, mock_issue_token, mock_get_conn, mock_update, client):
+    mock_open.return_value.__enter__.return_value.read.return_value = "validtoken"
+    mock_load_key.return_value = (MagicMock(), MagicMock())
+    mock_cursor = MagicMock()
+    mock_cursor.fetchone.side_effect = [True, None]  # mission found, no lease to renew
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_get_conn.return_value.__enter__.return_value = mock_conn
+
+    response = client.post("/get-vpn-connection", json={
+        "tag": "gcs",
+        "rsa_pub_key": "-----BEGIN PUBLIC KEY-----\n...\n-----END PUBLIC KEY-----",
+        "gcs_proof_token": "validtoken",
+        "mission_group": "group123"
+    })
+    assert response.status_code == 500
+    mock_update.assert_called_once()
+    assert mock_update.call_args.args[3] == {"status": "failed"}
+
+
+@patch("rfd.connections_manager.endpoints.update_versioned")
+@patch("rfd.connections_manager.endpoints.get_conn")
+@patch("rfd.connections_manager.endpoints.issue_token", side_effect=CircuitOpenError("Tailscale API unavailable"))
+@patch("rfd.connections_manager.endpoints.load_public_key")
+@patch("builtins.open")
+def test_get_vpn_connection_circuit_open(mock_open, mock_load_key, mock_issue_token, mock_get_conn, mock_update, client):
+    mock_open.return_value.__enter__.return_value.read.return_value = "validtoken"
+    mock_load_key.return_value = (MagicMock(), MagicMock())
+    mock_cursor = MagicMock()
+    mock_cursor.fetchone.side_effect = [True, None]  # mission found, no lease to renew
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_get_conn.return_value.__enter__.return_value = mock_conn
+
+    response = client.post("/get-vpn-connection", json={
+        "tag": "gcs",
+        "rsa_pub_key": "-----BEGIN PUBLIC KEY-----\n...\n-----END PUBLIC KEY-----",
+        "gcs_proof_token": "validtoken",
+        "mission_group": "group123"
+    })
+    # Fails fast with a retryable status, reservation is still resolved
+    assert response.status_code == 503
+    assert mock_update.call_args.args[3] == {"status": "failed"}
+
+@patch("rfd.connections_manager.endpoints.update_versioned")
+@patch("rfd.connections_manager.endpoints.get_conn")
+@patch("rfd.connections_manager.endpoints.issue_token")
+@patch("rfd.connections_manager.endpoints.load_public_key")
+@patch("builtins.open")
+def test_get_vpn_connection_idempotent_retry(mock_open, mock_load_key, mock_issue_token, mock_get_conn, mock_update, client):
+    mock_open.return_value.__enter__.return_value.read.return_value = "validtoken"
+    mock_issue_token.return_value = ("token", "hash", datetime(2025, 1, 1, tzinfo=timezone.utc), "gcs-host", "key1")
+    mock_key = MagicMock()
+    mock_key.encrypt.return_value = b"encrypted"
+    mock_load_key.return_value = (mock_key, MagicMock())
+    mock_cursor = MagicMock()
+    mock_cursor.fetchone.side_effect = [True, None]  # mission found, no lease to renew
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_get_conn.return_value.__enter__.return_value = mock_conn
+
+    payload = {
+        "tag": "gcs",
+        "rsa_pub_key": "-----BEGIN PUBLIC KEY-----\nidem\n-----END PUBLIC KEY-----",
+        "gcs_proof_token": "validtoken",
+        "mission_group": "group123"
+    }
+    headers = {"Idempotency-Key": "retry-1"}
+    first = client.post("/get-vpn-connection", json=payload, headers=headers)
+    second = client.post("/get-vpn-connection", json=payload, headers=headers)
+
+    # The retry gets the original response without a new reservation or key
+    assert first.status_code == second.status_code == 200
+    assert first.json == second.json
+    mock_issue_token.assert_called_once()
+    mock_update.assert_called_once()
+
+    # Same key with a different body is rejected
+    conflict = client.post("/get-vpn-connection", json={**payload, "mission_group": "other"}, headers=headers)
+    assert conflict.status_code == 422
+
+
+@patch("rfd.connections_manager.endpoints.update_versioned")
+@patch("rfd.connections_manager.endpoints.is_device_joined", return_value=True)
+@patch("rfd.connections_manager.endpoints.get_conn")
+@patch("rfd.connections_manager.endpoints.issue_token")
+@patch("rfd.connections_manager.endpoints.load_public_key")
+@patch("builtins.open")
+def test_get_vpn_connection_renews_lease(mock_open, mock_load_key, mock_issue_token, mock_get_conn, mock_joined, mock_update, client):
+    mock_open.return_value.__enter__.return_value.read.return_value = "validtoken"
+    mock_load_key.return_value = (MagicMock(), MagicMock())
+    mock_cursor = MagicMock()
+    mock_cursor.fetchone.side_effect = [True, ("conn-1",)]
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_get_conn.return_value.__enter__.return_value = mock_conn
+
+    response = client.post("/get-vpn-connection", json={
+        "tag": "gcs",
+        "rsa_pub_key": "-----BEGIN PUBLIC KEY-----\n...\n-----END PUBLIC KEY-----",
+        "gcs_proof_token": "validtoken",
+        "mission_group": "group123",
+        "token_hash": "hash-1"
+    })
+
+    # Device still joined: lease extended in place, no reservation and no new key
+    assert response.status_code == 200
+    assert response.json["renewed"] is True
+    # The credential is matched in the query and never echoed back
+    assert "token_hash" not in response.json
+    lease_query = [c.args for c in mock_cursor.execute.call_args_list if "token_hash = %s" in c.args[0]]
+    assert lease_query[0][1][-1] == "hash-1"
+    mock_issue_token.assert_not_called()
+    assert not any("INSERT" in c.args[0] for c in mock_cursor.execute.call_args_list)
+    assert mock_update.call_args.args[2] == {"connection_id": "conn-1"}
+    assert "token_expires_at" in mock_update.call_args.args[3]
+
+
+@patch("rfd.connections_manager.endpoints.update_versioned")
+@patch("rfd.connections_manager.endpoints.is_device_joined", return_value=True)
+@patch("rfd.connections_manager.endpoints.get_conn")
+@patch("rfd.connections_manager.endpoints.issue_token")
+@patch("rfd.connections_manager.endpoints.load_public_key")
+@patch("builtins.open")
+def test_get_vpn_connection_no_renewal_without_token_hash(mock_open, mock_load_key, mock_issue_token, mock_get_conn, mock_joined, mock_update, client):
+    mock_open.return_value.__enter__.return_value.read.return_value = "validtoken"
+    mock_issue_token.return_value = ("token", "hash-2", datetime(2025, 1, 1, tzinfo=timezone.utc), "gcs-validtok", "k2")
+    mock_key = MagicMock()
+    mock_key.encrypt.return_value = b"encrypted"
+    mock_load_key.return_value = (mock_key, MagicMock())
+    mock_cursor = MagicMock()
+    mock_cursor.fetchone.side_effect = [True]
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_get_conn.return_value.__enter__.return_value = mock_conn
+
+    response = client.post("/get-vpn-connection", json={
+        "tag": "gcs",
+        "rsa_pub_key": "-----BEGIN PUBLIC KEY-----\n...\n-----END PUBLIC KEY-----",
+        "gcs_proof_token": "validtoken",
+        "mission_group": "group123"
+    })
+
+    # Knowing the mission group is not enough to take over an existing lease
+    assert response.status_code == 200
+    assert "renewed" not in response.json
+    assert not any("token_hash = %s" in c.args[0] for c in mock_cursor.execute.call_args_list)
+    mock_joined.assert_not_called()
+    mock_issue_token.assert_called_once()
+
+
+@patch("rfd.connections_manager.endpoints.is_device_joined", return_value=False)
+@patch("rfd.connections_manager.endpoints.get_conn")
+def test_renew_vpn_connection_device_gone(mock_get_conn, mock_joined, client):
+    mock_cursor = MagicMock()
+    mock_cursor.fetchone.return_value = ("conn-1",)
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_get_conn.return_value.__enter__.return_value = mock_conn
+
+    response = client.post("/renew-vpn-connection", json={"hostname": "gcs-1", "token_hash": "hash-1"})
+    assert response.status_code == 409
+
+
+@patch("rfd.connections_manager.endpoints.watcher")
+@patch("rfd.connections_manager.endpoints.get_conn")
+def test_wait_for_device_online(mock_get_conn, mock_watcher, client):
+    mock_cursor = MagicMock()
+    mock_cursor.fetchone.return_value = (1,)
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_get_conn.return_value.__enter__.return_value = mock_conn
+    mock_watcher.wait_for.return_value = {"hostname": "gcs-1", "addresses": ["100.64.0.1"]}
+
+    response = client.post("/wait-for-device", json={"hostname": "gcs-1", "timeout": 1000})
+
+    assert response.status_code == 200
+    assert response.json["online"] is True
+    assert response.json["ips"] == ["100.64.0.1"]
+    # Timeout is capped server-side
+    assert mock_watcher.wait_for.call_args.args[1] <= 60
+
+
 def test_get_vpn_connection_missing_tag(client):
     response = client.post("/get-vpn-connection", json={})
     assert response.status_code == 400
@@ -94,9 +298,10 @@ def test_get_vpn_connection_invalid_public_key(mock_open_file, mock_get_conn, cl
     assert "Invalid public key format" in response.json["reason"]
 
 @patch("rfd.connections_manager.endpoints.get_conn")
-@patch("rfd.connections_manager.endpoints.serialization.load_pem_public_key")
+@patch("rfd.connections_manager.endpoints.load_public_key")
 @patch("rfd.connections_manager.endpoints.open", new_callable=mock_open, read_data="wrontgcsprooftoken")
 def test_get_vpn_connection_invalid_gcs_proof_token(mock_open_file, mock_load_key, mock_get_conn, client):
+    mock_load_key.return_value = (MagicMock(), MagicMock())
     payload = {
         "tag": "gcs",
         "rsa_pub_key": """-----BEGIN PUBLIC KEY-----\n....\n-----END PUBLIC KEY-----""",
@@ -108,14 +313,31 @@ def test_get_vpn_connection_invalid_gcs_proof_token(mock_open_file, mock_load_ke
     assert response.status_code == 400
     assert "Missing or invalid" in response.json["reason"]
 
+@patch("rfd.connections_manager.endpoints.get_conn")
+@patch("rfd.connections_manager.endpoints.load_public_key")
+@patch("rfd.connections_manager.endpoints.open", new_callable=mock_open, read_data="validtoken")
+def test_get_vpn_connection_invalid_mission_id(mock_open_file, mock_load_key, mock_get_conn, client):
+    mock_load_key.return_value = (MagicMock(), MagicMock())
+    payload = {
+        "tag": "client",
+        "rsa_pub_key": """-----BEGIN PUBLIC KEY-----\n....\n-----END PUBLIC KEY-----""",
+        "mission_id": "not-a-uuid"
+    }
+
+    response = client.post("/get-vpn-connection", json=payload)
+    assert response.status_code == 400
+    assert response.json["reason"] == "Invalid mission_id"
+    mock_get_conn.assert_not_called()
+
 # === Test delete_vpn_conection ===
 
 @patch("rfd.connections_manager.endpoints.get_conn")
 @patch("rfd.connections_manager.endpoints.update_versioned")
-@patch("rfd.connections_manager.endpoints.remove_from_tailnet")
-def test_delete_vpn_connection_success(mock_remove, mock_update, mock_get_conn, client):
+@patch("rfd.connections_manager.endpoints.drain_outbox_async")
+@patch("rfd.connections_manager.endpoints.enqueue_teardown")
+def test_delete_vpn_connection_success(mock_enqueue, mock_drain, mock_update, mock_get_conn, client):
     mock_cursor = MagicMock()
-    mock_cursor.fetchone.return_value = True
+    mock_cursor.fetchone.return_value = ("key1",)
     mock_conn = MagicMock()
     mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
     mock_get_conn.return_value.__enter__.return_value = mock_conn
@@ -126,6 +348,10 @@ def test_delete_vpn_connection_success(mock_remove, mock_update, mock_get_conn,
     })
     assert response.status_code == 200
     assert response.json["status"] == "ok"
+    # Teardown is queued with the deactivation, not executed inline
+    mock_enqueue.assert_called_once_with(mock_conn, "somehost", "key1")
+    mock_update.assert_called_once()
+    mock_drain.assert_called_once()
 
 def test_delete_vpn_connection_missing_params(client):
     response = client.post("/delete-vpn-connection", json={})
@@ -166,6 +392,60 @@ def test_start_session_success(mock_open, mock_get_conn, client):
     assert response.status_code == 200
     assert response.json["status"] == "ok"
 
+@patch("rfd.connections_manager.endpoints.drain_outbox_async")
+@patch("rfd.connections_manager.endpoints.heartbeats")
+@patch("rfd.connections_manager.endpoints.end_session")
+@patch("rfd.connections_manager.endpoints.get_conn")
+@patch("builtins.open")
+def test_start_session_supersedes_live_session(mock_open, mock_get_conn, mock_end_session, mock_heartbeats, mock_drain, client):
+    mock_open.return_value.__enter__.return_value.read.return_value = "validtoken"
+
+    mock_cursor = MagicMock()
+    mock_cursor.fetchone.return_value = (1,)
+    mock_cursor.fetchall.return_value = [("old-session",)]
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_get_conn.return_value.__enter__.return_value = mock_conn
+
+    response = client.post("/start-session", json={
+        "gcs_proof_token": "validtoken",
+        "session_id": "new-session",
+        "mission_id": "miss456"
+    })
+
+    assert response.status_code == 200
+    assert response.json["superseded"] == ["old-session"]
+    # The previous session is aborted in the transaction that inserts the new one
+    mock_end_session.assert_called_once_with(mock_conn, "old-session", "abort")
+    assert "FOR UPDATE" in mock_cursor.execute.call_args_list[0].args[0]
+    assert "INSERT INTO grfp_sessions" in mock_cursor.execute.call_args_list[-1].args[0]
+    mock_conn.commit.assert_called_once()
+    mock_drain.assert_called_once()
+
+
+@patch("rfd.connections_manager.endpoints.end_session")
+@patch("rfd.connections_manager.endpoints.get_conn")
+@patch("builtins.open")
+def test_start_session_retry_is_idempotent(mock_open, mock_get_conn, mock_end_session, client):
+    mock_open.return_value.__enter__.return_value.read.return_value = "validtoken"
+
+    mock_cursor = MagicMock()
+    mock_cursor.fetchone.return_value = (1,)
+    mock_cursor.fetchall.return_value = [("sess123",)]
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_get_conn.return_value.__enter__.return_value = mock_conn
+
+    response = client.post("/start-session", json={
+        "gcs_proof_token": "validtoken",
+        "session_id": "sess123",
+        "mission_id": "miss456"
+    })
+
+    assert response.status_code == 200
+    mock_end_session.assert_not_called()
+    assert not any("INSERT" in c.args[0] for c in mock_cursor.execute.call_args_list)
+
 def test_start_session_missing_fields(client):
     response = client.post("/start-session", json={})
     assert response.status_code == 400
@@ -210,4 +490,229 @@ def test_close_session_invalid_token(mock_open_file, client):
     payload = {"gcs_proof_token": "abc", "session_id": "s1", "result": "abort"}
     response = client.post("/close-session", json=payload)
     assert response.status_code == 400
-    assert "Gcs proof token not found" in response.json["reason"]
\ No newline at end of file
+    assert "Gcs proof token not found" in response.json["reason"]
+
+# === Test: change stream ===
+
+def test_change_stream_requires_filter(app):
+    from rfd.connections_manager.endpoints import stream_changes
+    app.add_url_rule('/change-stream', view_func=stream_changes, methods=['GET'])
+    client = app.test_client()
+
+    assert client.get("/change-stream").status_code == 400
+    assert client.get("/change-stream?mission_id=not-a-uuid").status_code == 400
+
+
+def test_change_stream_redirects_to_stream_server(app):
+    from rfd.connections_manager.endpoints import stream_changes
+    app.add_url_rule('/change-stream', view_func=stream_changes, methods=['GET'])
+    mission_id = "11111111-1111-1111-1111-111111111111"
+
+    response = app.test_client().get(f"/change-stream?mission_id={mission_id.upper()}",
+                                     headers={"Last-Event-ID": "5"}, base_url="http://rfd.example:8001")
+
+    assert response.status_code == 307
+    # Canonical IDs, and the resume point carried over in the query
+    assert response.headers["Location"] == (
+        f"http://rfd.example:{CHANGE_STREAM_PORT}/change-stream?mission_id={mission_id}&last_event_id=5")
+
+
+# === Test: session heartbeat ===
+
+@patch("rfd.connections_manager.endpoints.heartbeats")
+@patch("rfd.connections_manager.endpoints.get_conn")
+@patch("builtins.open", new_callable=mock_open, read_data="valid_token")
+def test_session_heartbeat(mock_file, mock_get_conn, mock_heartbeats, app):
+    from rfd.connections_manager.endpoints import session_heartbeat
+    app.add_url_rule('/session-heartbeat', view_func=session_heartbeat, methods=['POST'])
+    client = app.test_client()
+    session_id = "33333333-3333-3333-3333-333333333333"
+    mock_cursor = MagicMock()
+    mock_cursor.fetchone.return_value = (1,)
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_get_conn.return_value.__enter__.return_value = mock_conn
+
+    # First heartbeat checks the session in the DB
+    mock_heartbeats.is_tracked.return_value = False
+    response = client.post("/session-heartbeat", json={"session_id": session_id, "gcs_proof_token": "valid_token"})
+    assert response.status_code == 200
+    assert mock_get_conn.call_count == 1
+
+    # Tracked sessions don't touch the DB
+    mock_heartbeats.is_tracked.return_value = True
+    response = client.post("/session-heartbeat", json={"session_id": session_id, "gcs_proof_token": "valid_token"})
+    assert response.status_code == 200
+    assert mock_get_conn.call_count == 1
+    assert mock_heartbeats.beat.call_count == 2
+
+    # Unknown session
+    mock_heartbeats.is_tracked.return_value = False
+    mock_cursor.fetchone.return_value = None
+    response = client.post("/session-heartbeat", json={"session_id": session_id, "gcs_proof_token": "valid_token"})
+    assert response.status_code == 403
+
+
+# === Test batch session endpoints ===
+
+M1 = "11111111-1111-1111-1111-111111111111"
+M2 = "22222222-2222-2222-2222-222222222222"
+S1 = "aaaaaaaa-aaaa-aaaa-aaaa-aaaaaaaaaaaa"
+S2 = "bbbbbbbb-bbbb-bbbb-bbbb-bbbbbbbbbbbb"
+S_OLD = "cccccccc-cccc-cccc-cccc-cccccccccccc"
+S3 = "dddddddd-dddd-dddd-dddd-dddddddddddd"
+M3 = "33333333-3333-3333-3333-333333333333"
+
+
+@patch("rfd.connections_manager.endpoints.drain_outbox_async")
+@patch("rfd.connections_manager.endpoints.heartbeats")
+@patch("rfd.connections_manager.endpoints.end_session")
+@patch("rfd.connections_manager.endpoints.execute_values")
+@patch("rfd.connections_manager.endpoints.get_conn")
+@patch("builtins.open", new_callable=mock_open, read_data="valid_token")
+def test_start_sessions_batch(mock_file, mock_get_conn, mock_execute_values, mock_end_session, mock_heartbeats, mock_drain, app):
+    from rfd.connections_manager.endpoints import start_sessions
+    app.add_url_rule('/start-sessions', view_func=start_sessions, methods=['POST'])
+    mock_cursor = MagicMock()
+    mock_cursor.fetchall.side_effect = [
+        [(M1,)],                            # active missions (M2 is not)
+        [(M1, S_OLD, "in progress")],       # live sessions
+    ]
+    mock_execute_values.return_value = [(S1,)]
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_get_conn.return_value.__enter__.return_value = mock_conn
+
+    response = app.test_client().post("/start-sessions", json={"gcs_proof_token": "valid_token", "sessions": [
+        {"session_id": S1, "mission_id": M1},
+        {"session_id": S2, "mission_id": M2},
+        {"session_id": "not-a-uuid", "mission_id": M1},
+        {"session_id": S2, "mission_id": M1, "gcs_proof_token": "wrong"},
+    ]})
+
+    assert response.status_code == 200
+    results = response.json["results"]
+    assert results[0] == {"session_id": S1, "status": "ok", "superseded": [S_OLD]}
+    assert results[1]["reason"] == "Mission not found"
+    assert results[2]["reason"] == "Invalid ID"
+    assert results[3]["reason"] == "Gcs proof token not found"
+    # Token file read once, one connection, one insert statement, one commit
+    assert mock_file.call_count == 1
+    assert mock_get_conn.call_count == 1
+    assert mock_execute_values.call_args[0][2] == [(S1, M1)]
+    mock_end_session.assert_called_once_with(mock_conn, S_OLD, "abort")
+    mock_conn.commit.assert_called_once()
+
+
+@patch("rfd.connections_manager.endpoints.drain_outbox_async")
+@patch("rfd.connections_manager.endpoints.heartbeats")
+@patch("rfd.connections_manager.endpoints.end_session")
+@patch("rfd.connections_manager.endpoints.execute_values")
+@patch("rfd.connections_manager.endpoints.get_conn")
+@patch("builtins.open", new_callable=mock_open, read_data="valid_token")
+def test_start_sessions_existing_ids_reported_per_item(mock_file, mock_get_conn, mock_execute_values, mock_end_session, mock_heartbeats, mock_drain, app):
+    from rfd.connections_manager.endpoints import start_sessions
+    app.add_url_rule('/start-sessions', view_func=start_sessions, methods=['POST'])
+    mock_cursor = MagicMock()
+    mock_cursor.fetchall.side_effect = [
+        [(M1,), (M2,), (M3,)],
+        [(M1, S_OLD, "in progress"), (M2, S2, "finished")],   # S2 already exists (finished)
+    ]
+    # S3 was inserted by a concurrent request after the check: skipped by ON CONFLICT
+    mock_execute_values.return_value = [(S1,)]
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_get_conn.return_value.__enter__.return_value = mock_conn
+
+    response = app.test_client().post("/start-sessions", json={"gcs_proof_token": "valid_token", "sessions": [
+        {"session_id": S1, "mission_id": M1},
+        {"session_id": S2, "mission_id": M2},
+        {"session_id": S3, "mission_id": M3},
+    ]})
+
+    assert response.status_code == 200
+    results = response.json["results"]
+    assert results[0] == {"session_id": S1, "status": "ok", "superseded": [S_OLD]}
+    assert results[1] == {"session_id": S2, "status": "error", "reason": "Session already exists"}
+    assert results[2] == {"session_id": S3, "status": "error", "reason": "Session already exists"}
+    # The first attempt is rolled back to the savepoint and redone without S3
+    first, second = [c[0][1:3] for c in mock_execute_values.call_args_list]
+    assert "ON CONFLICT (session_id) WHERE valid_to IS NULL DO NOTHING" in first[0]
+    assert first[1] == [(S1, M1), (S3, M3)] and second[1] == [(S1, M1)]
+    statements = [c.args[0] for c in mock_cursor.execute.call_args_list]
+    assert statements.count("ROLLBACK TO SAVEPOINT start_sessions") == 1
+    assert mock_end_session.call_count == 2
+    mock_heartbeats.forget.assert_called_once_with(S_OLD)
+    mock_conn.commit.assert_called_once()
+
+
+@patch("rfd.connections_manager.endpoints.drain_outbox_async")
+@patch("rfd.connections_manager.endpoints.heartbeats")
+@patch("rfd.connections_manager.endpoints.end_session")
+@patch("rfd.connections_manager.endpoints.execute_values")
+@patch("rfd.connections_manager.endpoints.get_conn")
+@patch("builtins.open", new_callable=mock_open, read_data="valid_token")
+def test_start_sessions_supersedes_before_insert(mock_file, mock_get_conn, mock_execute_values, mock_end_session, mock_heartbeats, mock_drain, app):
+    from rfd.connections_manager.endpoints import start_sessions
+    app.add_url_rule('/start-sessions', view_func=start_sessions, methods=['POST'])
+    mock_cursor = MagicMock()
+    mock_cursor.fetchall.side_effect = [
+        [(M1,), (M2,)],
+        [(M1, S_OLD, "in progress"), (M2, S3, "in progress")],    # both missions have a live session
+    ]
+    mock_execute_values.return_value = [(S1,), (S2,)]
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_get_conn.return_value.__enter__.return_value = mock_conn
+    calls = MagicMock()
+    calls.attach_mock(mock_end_session, "end_session")
+    calls.attach_mock(mock_execute_values, "execute_values")
+
+    response = app.test_client().post("/start-sessions", json={"gcs_proof_token": "valid_token", "sessions": [
+        {"session_id": S1, "mission_id": M1},
+        {"session_id": S2, "mission_id": M2},
+    ]})
+
+    assert response.status_code == 200
+    assert [r["superseded"] for r in response.json["results"]] == [[S_OLD], [S3]]
+    # uq_live_session_per_mission: the live sessions are ended before the new ones are inserted
+    assert [c[0] for c in calls.mock_calls] == ["end_session", "end_session", "execute_values"]
+    assert [c.args[1] for c in mock_end_session.call_args_list] == [S_OLD, S3]
+    mock_conn.commit.assert_called_once()
+    mock_drain.assert_called_once()
+
+
+@patch("rfd.connections_manager.endpoints.heartbeats")
+@patch("rfd.connections_manager.endpoints.update_versioned_batch")
+@patch("rfd.connections_manager.endpoints.get_conn")
+@patch("builtins.open", new_callable=mock_open, read_data="valid_token")
+def test_close_sessions_batch(mock_file, mock_get_conn, mock_update_batch, mock_heartbeats, app):
+    from rfd.connections_manager.endpoints import close_sessions
+    app.add_url_rule('/close-sessions', view_func=close_sessions, methods=['POST'])
+    mock_cursor = MagicMock()
+    mock_cursor.fetchall.return_value = [(S1,)]   # only S1 is in progress
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_get_conn.return_value.__enter__.return_value = mock_conn
+    mock_update_batch.return_value = [S1]
+
+    response = app.test_client().post("/close-sessions", json={"gcs_proof_token": "valid_token", "sessions": [
+        {"session_id": S1, "result": "finished"},
+        {"session_id": S2, "result": "finished"},
+        {"session_id": S1, "result": "abort"},
+    ]})
+
+    assert response.status_code == 200
+    assert [r["status"] for r in response.json["results"]] == ["ok", "error", "error"]
+    assert response.json["results"][1]["reason"] == "Session not found"
+    assert response.json["results"][2]["reason"] == "Duplicate session in request"
+    mock_update_batch.assert_called_once_with(mock_conn, "grfp_sessions", "session_id", [{"session_id": S1, "status": "finished"}])
+    mock_heartbeats.forget.assert_called_once_with(S1)
+
+
+def test_session_batch_requires_list(app):
+    from rfd.connections_manager.endpoints import start_sessions
+    app.add_url_rule('/start-sessions', view_func=start_sessions, methods=['POST'])
+
+    response = app.test_client().post("/start-sessions", json={"gcs_proof_token": "t", "sessions": []})
+    assert response.status_code == 400
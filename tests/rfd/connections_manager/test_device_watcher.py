@@ -0,0 +1,41 @@
+import threading
+import time
+from unittest.mock import patch
+
+from rfd.connections_manager.device_watcher import DeviceWatcher
+
+
+# === Test: concurrent waiters share one poll loop ===
+@patch("rfd.connections_manager.device_watcher.get_devices")
+def test_waiters_share_polls(mock_get_devices):
+    # Devices join one after another, then the inventory stays the same
+    gcs = {"hostname": "gcs-1", "addresses": ["100.64.0.1"]}
+    client = {"hostname": "client-2", "addresses": ["100.64.0.2"]}
+    inventories = [[], [gcs]]
+    mock_get_devices.side_effect = lambda **kwargs: inventories.pop(0) if inventories else [gcs, client]
+    watcher = DeviceWatcher(interval=0.01)
+
+    results = {}
+    def wait(name, hostname):
+        results[name] = watcher.wait_for(hostname, timeout=2)
+
+    threads = [threading.Thread(target=wait, args=(i, "gcs-1" if i % 2 else "client-2")) for i in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert all(results[i]["addresses"] for i in range(10))
+    # Ten waiters, a handful of upstream polls
+    assert mock_get_devices.call_count < 10
+    time.sleep(0.05)
+    assert not watcher.stats()["running"]
+
+
+# === Test: waiting for a device that never comes online times out ===
+@patch("rfd.connections_manager.device_watcher.get_devices", return_value=[{"hostname": "gcs-1", "addresses": []}])
+def test_wait_times_out(mock_get_devices):
+    watcher = DeviceWatcher(interval=0.01)
+
+    assert watcher.wait_for("gcs-1", timeout=0.05) is None
+    assert watcher.stats()["timeouts"] == 1
@@ -0,0 +1,75 @@
+import threading
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch, MagicMock
+
+from rfd.connections_manager.expiry import ExpiryScheduler, expire_due, sweep_expired
+
+
+def _mock_db(mock_get_conn, rowcount=0):
+    mock_cursor = MagicMock()
+    mock_cursor.rowcount = rowcount
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_get_conn.return_value.__enter__.return_value = mock_conn
+    return mock_cursor
+
+
+def _in(seconds):
+    return datetime.now(timezone.utc) + timedelta(seconds=seconds)
+
+
+# === Test: due connections come out in deadline order, in batches ===
+def test_next_batch_pops_due_in_order():
+    scheduler = ExpiryScheduler(batch_size=2, max_sleep=0.05)
+    scheduler.schedule("c", _in(-1))
+    scheduler.schedule("a", _in(-3))
+    scheduler.schedule("b", _in(-2))
+    scheduler.schedule("later", _in(3600))
+
+    assert scheduler._next_batch() == ["a", "b"]
+    assert scheduler._next_batch() == ["c"]
+    assert scheduler.stats()["pending"] == 1
+
+
+# === Test: a renewed connection is not expired at its old deadline ===
+def test_renewal_supersedes_old_deadline():
+    scheduler = ExpiryScheduler(max_sleep=0.05)
+    scheduler.schedule("a", _in(-1))
+    scheduler.schedule("a", _in(3600))
+    scheduler.schedule("b", _in(-1))
+
+    assert scheduler._next_batch() == ["b"]
+    assert scheduler.stats()["pending"] == 1
+
+
+# === Test: an earlier deadline wakes the sleeping thread ===
+def test_earlier_deadline_wakes_waiter():
+    scheduler = ExpiryScheduler(max_sleep=5)
+    scheduler.schedule("later", _in(3600))
+    result = []
+    waiter = threading.Thread(target=lambda: result.append(scheduler._next_batch()))
+    waiter.start()
+
+    scheduler.schedule("now", _in(0.05))
+    waiter.join(timeout=2)
+
+    assert result == [["now"]]
+
+
+# === Test: batched expiry runs one statement for the given connections ===
+@patch("rfd.connections_manager.expiry.get_conn")
+def test_expire_due_batch(mock_get_conn):
+    mock_cursor = _mock_db(mock_get_conn, rowcount=2)
+
+    assert expire_due(["a", "b"], limit=2) == 2
+    sql, params = mock_cursor.execute.call_args[0]
+    assert "ANY(%(ids)s::uuid[])" in sql
+    assert params == {"ids": ["a", "b"], "limit": 2}
+
+
+# === Test: the safety sweep repeats full batches ===
+@patch("rfd.connections_manager.expiry.EXPIRY_BATCH_SIZE", 2)
+@patch("rfd.connections_manager.expiry.expire_due", side_effect=[2, 2, 1])
+def test_sweep_expired_batches(mock_expire_due):
+    assert sweep_expired() == 5
+    assert mock_expire_due.call_count == 3
@@ -0,0 +1,97 @@
+import time
+from unittest.mock import patch, MagicMock
+
+from rfd.connections_manager.heartbeat import TimingWheel, HeartbeatTracker
+
+SESSION = "33333333-3333-3333-3333-333333333333"
+OTHER = "44444444-4444-4444-4444-444444444444"
+
+
+def _mock_db(mock_get_conn, rows=()):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_cursor.fetchall.return_value = list(rows)
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_get_conn.return_value.__enter__.return_value = mock_conn
+    return mock_cursor
+
+
+# === Test: timing wheel expires keys after the timeout, never before ===
+def test_wheel_expiry():
+    wheel = TimingWheel(timeout=10, tick=1)
+    wheel.position = 100
+    wheel.schedule("a", 100.5)
+    wheel.schedule("b", 103.2)
+
+    assert wheel.advance(110.4) == []
+    assert wheel.advance(111.0) == ["a"]
+    # Re-arming moves the key instead of adding it twice
+    wheel.schedule("b", 112.0)
+    assert wheel.advance(120.0) == []
+    assert wheel.advance(122.0) == ["b"]
+    assert len(wheel) == 0
+
+
+# === Test: a long pause sweeps every slot once ===
+def test_wheel_long_pause():
+    wheel = TimingWheel(timeout=3, tick=1)
+    wheel.position = 0
+    wheel.schedule("a", 0.5)
+    assert wheel.advance(1000) == ["a"]
+    assert wheel.position == 1000
+
+
+# === Test: heartbeats are flushed in one batch ===
+@patch("rfd.connections_manager.heartbeat.execute_values")
+@patch("rfd.connections_manager.heartbeat.get_conn")
+def test_flush_batches_last_seen(mock_get_conn, mock_execute_values):
+    _mock_db(mock_get_conn)
+    tracker = HeartbeatTracker(timeout=60, tick=1)
+    for _ in range(100):
+        tracker.beat(SESSION)
+    tracker.beat(OTHER)
+
+    assert tracker.flush() == 2
+    assert mock_execute_values.call_count == 1
+    assert {row[0] for row in mock_execute_values.call_args[0][2]} == {SESSION, OTHER}
+    # Nothing new, nothing written
+    assert tracker.flush() == 0
+    assert mock_execute_values.call_count == 1
+
+
+# === Test: failed flush keeps the last-seen times ===
+@patch("rfd.connections_manager.heartbeat.execute_values", side_effect=Exception("db down"))
+@patch("rfd.connections_manager.heartbeat.get_conn")
+def test_flush_failure_keeps_times(mock_get_conn, mock_execute_values):
+    _mock_db(mock_get_conn)
+    tracker = HeartbeatTracker(timeout=60, tick=1)
+    tracker.beat(SESSION)
+
+    try:
+        tracker.flush()
+    except Exception:
+        pass
+    assert tracker.stats()["unflushed"] == 1
+
+
+# === Test: silent sessions are aborted, live ones are kept ===
+@patch("rfd.connections_manager.heartbeat.clean_session", return_value=True)
+@patch("rfd.connections_manager.heartbeat.execute_values")
+@patch("rfd.connections_manager.heartbeat.get_conn")
+def test_sweep_aborts_silent_sessions(mock_get_conn, mock_execute_values, mock_clean_session):
+    # The DB confirms only SESSION as silent (OTHER was kept alive through another process)
+    _mock_db(mock_get_conn, rows=[(SESSION,)])
+    tracker = HeartbeatTracker(timeout=0.05, tick=0.01)
+    tracker._loaded = True
+    tracker.beat(SESSION)
+    tracker.beat(OTHER)
+
+    assert tracker.sweep() == 0
+    time.sleep(0.1)
+    assert tracker.sweep() == 1
+
+    mock_clean_session.assert_called_once_with(SESSION, 'abort')
+    stats = tracker.stats()
+    assert stats["tracked"] == 0
+    assert stats["expired"] == 2
+    assert stats["aborted"] == 1
@@ -0,0 +1,125 @@
+import time
+
+import pytest
+from unittest.mock import patch, MagicMock
+from datetime import datetime, timedelta, timezone
+
+from rfd.connections_manager import key_pool
+
+
+@pytest.fixture(autouse=True)
+def empty_pool():
+    # Start every test with empty pools and no pending revocations
+    for pool in key_pool._pools.values():
+        pool.clear()
+    key_pool._to_revoke.clear()
+    yield
+    for pool in key_pool._pools.values():
+        pool.clear()
+    key_pool._to_revoke.clear()
+
+
+def _entry(key, hours_left, seen_ago=0):
+    return {"key": key, "key_id": f"id-{key}", "expires": datetime.now(timezone.utc) + timedelta(hours=hours_left),
+            "seen": time.monotonic() - seen_ago}
+
+
+def _mock_db(mock_get_conn):
+    mock_cursor = MagicMock()
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_get_conn.return_value.__enter__.return_value = mock_conn
+    return mock_cursor
+
+
+# === Test: refill mints keys up to the pool size ===
+@patch("rfd.connections_manager.key_pool.KEY_POOL_SIZE", 2)
+@patch("rfd.connections_manager.key_pool.get_conn")
+@patch("rfd.connections_manager.key_pool.create_tailscale_auth_key")
+def test_refill_pool_fills_every_tag(mock_create_key, mock_get_conn):
+    mock_create_key.side_effect = [(f"tskey-{i}", 10, f"k{i}") for i in range(4)]
+    mock_cursor = _mock_db(mock_get_conn)
+    mock_cursor.fetchall.return_value = [(f"k{i}",) for i in range(4)]
+
+    key_pool.refill_pool()
+
+    assert key_pool.pool_stats()["sizes"] == {"gcs": 2, "client": 2}
+    descriptions = {call.args[0] for call in mock_create_key.call_args_list}
+    assert descriptions == {"pool-gcs", "pool-client"}
+    # Every pooled key is registered, then all of them are refreshed in one statement
+    statements = [c.args for c in mock_cursor.execute.call_args_list]
+    registered = [params[0] for sql, params in statements if "INSERT INTO tailnet_pool_keys" in sql]
+    assert registered == ["k0", "k1", "k2", "k3"]
+    refresh = [params for sql, params in statements if sql.startswith("UPDATE tailnet_pool_keys")]
+    assert sorted(refresh[0][0]) == ["k0", "k1", "k2", "k3"]
+
+
+# === Test: a key that can't be registered is revoked instead of pooled ===
+@patch("rfd.connections_manager.key_pool.KEY_POOL_TAGS", ["gcs"])
+@patch("rfd.connections_manager.key_pool.KEY_POOL_SIZE", 1)
+@patch("rfd.connections_manager.key_pool.delete_auth_key")
+@patch("rfd.connections_manager.key_pool.get_conn", side_effect=Exception("DB down"))
+@patch("rfd.connections_manager.key_pool.create_tailscale_auth_key", return_value=("tskey-0", 10, "k0"))
+def test_unregistered_key_is_revoked(mock_create_key, mock_get_conn, mock_delete_key):
+    key_pool.refill_pool()
+
+    assert key_pool.pool_stats()["sizes"]["gcs"] == 0
+    mock_delete_key.assert_called_once_with("k0")
+
+
+# === Test: keys whose registration was not refreshed within the lease are not handed out ===
+@patch("rfd.connections_manager.key_pool._refill_async")
+def test_lapsed_keys_are_evicted(mock_refill):
+    key_pool._pools["gcs"].extend([_entry("lapsed", 10, seen_ago=key_pool.KEY_POOL_LEASE + 1), _entry("fresh", 10)])
+
+    entry = key_pool.take_key("gcs")
+
+    assert entry["key"] == "fresh"
+    assert [e["key"] for e in key_pool._to_revoke] == ["lapsed"]
+
+
+# === Test: pooled key is served without a live Tailscale call ===
+@patch("rfd.connections_manager.key_pool._refill_async")
+@patch("rfd.connections_manager.key_pool.create_token")
+def test_issue_token_uses_pool(mock_create_token, mock_refill):
+    key_pool._pools["gcs"].append(_entry("tskey-pooled", 10))
+
+    token, token_hash, expires, hostname, key_id = key_pool.issue_token("abcdef123456", "gcs")
+
+    assert token == "tskey-pooled"
+    assert key_id == "id-tskey-pooled"
+    assert hostname == "gcs-ef123456"
+    mock_create_token.assert_not_called()
+    # Pool dropped below the low-water mark, so a refill is requested
+    mock_refill.assert_called_once()
+
+
+# === Test: empty pool falls back to live creation ===
+@patch("rfd.connections_manager.key_pool._refill_async")
+@patch("rfd.connections_manager.key_pool.create_token")
+def test_issue_token_falls_back_when_empty(mock_create_token, mock_refill):
+    mock_create_token.return_value = ("tskey-live", "HASH", None, "client-12345678", "k-live")
+
+    result = key_pool.issue_token("12345678", "client")
+
+    assert result[0] == "tskey-live"
+    mock_create_token.assert_called_once_with("12345678", "client")
+
+
+# === Test: keys close to expiry are evicted and revoked ===
+@patch("rfd.connections_manager.key_pool.KEY_POOL_SIZE", 0)
+@patch("rfd.connections_manager.key_pool.get_conn")
+@patch("rfd.connections_manager.key_pool.delete_auth_key")
+@patch("rfd.connections_manager.key_pool._refill_async")
+def test_expiring_keys_are_evicted(mock_refill, mock_delete_key, mock_get_conn):
+    mock_cursor = _mock_db(mock_get_conn)
+    key_pool._pools["client"].extend([_entry("old", 0.5), _entry("fresh", 10)])
+
+    entry = key_pool.take_key("client")
+    assert entry["key"] == "fresh"
+
+    key_pool.refill_pool()
+    mock_delete_key.assert_called_once_with("id-old")
+    # Its registration is dropped
+    delete = [c.args for c in mock_cursor.execute.call_args_list if c.args[0].lstrip().startswith("DELETE")]
+    assert delete[0][1][0] == ["id-old"]
@@ -0,0 +1,149 @@
+from unittest.mock import MagicMock
+
+from rfd.connections_manager.live_cache import LiveStateCache
+
+
+def _cache(connected=True, ttl=30):
+    state = {"connected": connected}
+    cache = LiveStateCache(ttl=ttl, is_connected=lambda: state["connected"])
+    return cache, state
+
+
+def _cursor(*rows):
+    cur = MagicMock()
+    cur.fetchone.side_effect = list(rows)
+    return cur
+
+
+# === Test: an active mission is read once, then served from memory ===
+def test_active_mission_cached():
+    cache, _ = _cache()
+    cur = _cursor((1,))
+
+    assert cache.is_mission_active(cur, "mission_id", "m1") is True
+    assert cache.is_mission_active(cur, "mission_id", "m1") is True
+
+    assert cur.execute.call_count == 1
+    assert cache.stats()["hits"] == 1
+
+
+# === Test: missing missions and sessions are never cached ===
+def test_negative_answers_not_cached():
+    cache, _ = _cache()
+    cur = _cursor(None, (1,), None, ("s1",))
+
+    assert cache.is_mission_active(cur, "mission_group", "g1") is False
+    assert cache.is_mission_active(cur, "mission_group", "g1") is True
+    assert cache.current_session(cur, "m1") is None
+    assert cache.current_session(cur, "m1") == "s1"
+    assert cur.execute.call_count == 4
+
+
+# === Test: a session change event drops the mission's current session ===
+def test_session_event_invalidates():
+    cache, _ = _cache()
+    cur = _cursor(("s1",), ("s2",))
+    assert cache.current_session(cur, "m1") == "s1"
+
+    cache.on_change({"table_name": "grfp_sessions", "mission_id": "m1", "session_id": "s1", "status": "finish"})
+
+    assert cache.current_session(cur, "m1") == "s2"
+    assert cur.execute.call_count == 2
+
+
+# === Test: a local close without the mission drops the entry by session id ===
+def test_invalidate_session_by_id():
+    cache, _ = _cache()
+    cur = _cursor(("s1",), None)
+    cache.current_session(cur, "m1")
+
+    cache.invalidate_session("s1")
+
+    assert cache.current_session(cur, "m1") is None
+
+
+# === Test: a mission event drops the mission, every group entry and its session ===
+def test_mission_event_invalidates():
+    cache, _ = _cache()
+    cur = _cursor((1,), (1,), ("s1",))
+    cache.is_mission_active(cur, "mission_id", "m1")
+    cache.is_mission_active(cur, "mission_group", "g1")
+    cache.current_session(cur, "m1")
+
+    cache.on_change({"table_name": "grfp_missions", "mission_id": "m1", "session_id": None, "status": "finished"})
+
+    stats = cache.stats()
+    assert stats["missions"] == 0 and stats["sessions"] == 0
+
+
+# === Test: any spelling of a mission UUID is invalidated by the event's canonical one ===
+def test_mission_id_spellings_invalidated():
+    cache, _ = _cache()
+    mission_id = "0f8fad5b-d9cb-469f-a165-70867728950e"
+    cur = _cursor((1,), ("s1",))
+    assert cache.is_mission_active(cur, "mission_id", mission_id.upper()) is True
+    assert cache.current_session(cur, "{" + mission_id.replace("-", "").upper() + "}") == "s1"
+    assert cache.is_mission_active(cur, "mission_id", mission_id) is True
+    assert cur.execute.call_count == 2
+
+    cache.on_change({"table_name": "grfp_missions", "mission_id": mission_id, "session_id": None, "status": "finished"})
+
+    stats = cache.stats()
+    assert stats["missions"] == 0 and stats["sessions"] == 0
+
+
+# === Test: local invalidations with request spellings of the IDs drop the canonical entries ===
+def test_local_invalidation_canonicalizes_ids():
+    cache, _ = _cache()
+    mission_id = "0f8fad5b-d9cb-469f-a165-70867728950e"
+    session_id = "6ba7b810-9dad-11d1-80b4-00c04fd430c8"
+    cur = _cursor((session_id,), (session_id,), None)
+
+    cache.current_session(cur, mission_id)
+    cache.invalidate_session(session_id.upper())              # close-session
+    assert cache.stats()["sessions"] == 0
+
+    cache.current_session(cur, mission_id)
+    cache.invalidate_session("s-new", mission_id.replace("-", "").upper())   # start-session
+    assert cache.current_session(cur, mission_id) is None
+
+
+# === Test: a read that raced with an invalidation is not stored ===
+def test_fill_race_not_stored():
+    cache, _ = _cache()
+    cur = MagicMock()
+
+    def closed_meanwhile(*args):
+        cache.invalidate_session("s1", "m1")
+        return ("s1",)
+    cur.fetchone.side_effect = closed_meanwhile
+
+    assert cache.current_session(cur, "m1") == "s1"
+    assert cache.stats()["sessions"] == 0
+
+
+# === Test: while the listener is down every lookup goes to the DB; reconnect clears ===
+def test_bypassed_while_listener_down():
+    cache, state = _cache(connected=False)
+    cur = _cursor((1,), (1,))
+
+    cache.is_mission_active(cur, "mission_id", "m1")
+    cache.is_mission_active(cur, "mission_id", "m1")
+    assert cur.execute.call_count == 2
+    assert cache.stats()["bypassed"] == 2 and cache.stats()["missions"] == 0
+
+    state["connected"] = True
+    cache.is_mission_active(_cursor((1,)), "mission_id", "m1")
+    cache.on_change(None)
+    assert cache.stats()["missions"] == 0
+
+
+# === Test: entries expire after the TTL ===
+def test_ttl_expiry():
+    cache, _ = _cache(ttl=0)
+    cur = _cursor((1,), (1,))
+
+    cache.is_mission_active(cur, "mission_id", "m1")
+    cache.is_mission_active(cur, "mission_id", "m1")
+
+    assert cur.execute.call_count == 2
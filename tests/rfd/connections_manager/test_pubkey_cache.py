@@ -0,0 +1,63 @@
+import pytest
+from unittest.mock import patch
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa, ec
+
+from rfd.connections_manager import pubkey_cache
+from rfd.connections_manager.pubkey_cache import load_public_key, PublicKeyError
+
+
+def _pem(public_key):
+    return public_key.public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode()
+
+
+@pytest.fixture(scope="module")
+def rsa_pem():
+    return _pem(rsa.generate_private_key(public_exponent=65537, key_size=2048).public_key())
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    pubkey_cache._cache.clear()
+    yield
+    pubkey_cache._cache.clear()
+
+
+# === Test: repeat requests are served from the cache without parsing ===
+def test_cache_hit_skips_parsing(rsa_pem):
+    key, oaep = load_public_key(rsa_pem)
+
+    with patch("rfd.connections_manager.pubkey_cache.serialization.load_pem_public_key") as mock_load:
+        cached_key, cached_oaep = load_public_key(rsa_pem + "\n")
+        mock_load.assert_not_called()
+
+    assert cached_key is key and cached_oaep is oaep
+    assert key.encrypt(b"token", oaep)
+    assert pubkey_cache.cache_stats()["hits"] >= 1
+
+
+# === Test: small, non-RSA and malformed keys are rejected and not cached ===
+def test_rejects_unusable_keys():
+    small = _pem(rsa.generate_private_key(public_exponent=65537, key_size=1024).public_key())
+    ecdsa = _pem(ec.generate_private_key(ec.SECP256R1()).public_key())
+
+    with pytest.raises(PublicKeyError, match="at least"):
+        load_public_key(small)
+    with pytest.raises(PublicKeyError, match="RSA key required"):
+        load_public_key(ecdsa)
+    with pytest.raises(PublicKeyError, match="Invalid public key format"):
+        load_public_key("-----BEGIN PUBLIC KEY-----\ngarbage\n-----END PUBLIC KEY-----")
+
+    assert pubkey_cache.cache_stats()["size"] == 0
+
+
+# === Test: cache is bounded, least recently used key is evicted ===
+@patch("rfd.connections_manager.pubkey_cache.PUBKEY_CACHE_SIZE", 2)
+@patch("rfd.connections_manager.pubkey_cache._parse", side_effect=lambda pem: (pem, None))
+def test_lru_eviction(mock_parse):
+    for pem in ["a", "b", "a", "c"]:
+        load_public_key(pem)
+
+    assert set(pubkey_cache._cache) == {pubkey_cache._fingerprint("a"), pubkey_cache._fingerprint("c")}
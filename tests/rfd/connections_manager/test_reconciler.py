@@ -0,0 +1,83 @@
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import patch, MagicMock
+
+from rfd.connections_manager import reconciler
+
+
+DEVICES = [
+    {"id": "dev1", "hostname": "gcs-11111111"},     # live
+    {"id": "dev2", "hostname": "client-22222222"},  # orphan
+    {"id": "dev3", "hostname": "office-laptop"},    # not managed by RFD
+]
+KEYS = [
+    {"id": "k1", "description": "client-22222222"},  # orphan
+    {"id": "k2", "description": "pool-gcs"},         # pool key of unknown age, kept
+    {"id": "k3", "description": "gcs-33333333"},     # pending reservation
+]
+
+
+def _mock_db(mock_get_conn, rows, pool_rows=()):
+    mock_cursor = MagicMock()
+    mock_cursor.fetchall.side_effect = [rows, list(pool_rows)]
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_get_conn.return_value.__enter__.return_value = mock_conn
+
+
+# === Test: only managed devices and keys missing from the DB are orphans ===
+def test_find_orphans():
+    devices, keys = reconciler.find_orphans(DEVICES, KEYS, {"gcs-11111111", "gcs-33333333"}, set())
+
+    assert devices == [("dev2", "client-22222222")]
+    assert keys == [("k1", "client-22222222")]
+
+
+# === Test: pool keys nobody refreshes (pool lost with a restart) are orphans ===
+def test_find_orphans_pool_keys():
+    now = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+    keys = [
+        {"id": "p1", "description": "pool-gcs", "created": "2026-01-01T10:00:00Z"},     # left by a restart
+        {"id": "p2", "description": "pool-gcs", "created": "2026-01-01T10:00:00Z"},     # in a live pool
+        {"id": "p3", "description": "pool-client", "created": "2026-01-01T10:00:00Z"},  # issued to a connection
+        {"id": "p4", "description": "pool-client", "created": "2026-01-01T11:59:00Z"},  # just minted
+        {"id": "x1", "description": "poolside-db", "created": "2026-01-01T10:00:00Z"},  # not managed by RFD
+    ]
+
+    _, orphans = reconciler.find_orphans([], keys, set(), {"p3"}, {"p2"}, now=now)
+
+    assert orphans == [("p1", "pool-gcs")]
+
+
+# === Test: orphans are deleted in bulk ===
+@patch("rfd.connections_manager.reconciler.delete_in_parallel", return_value=(set(), set()))
+@patch("rfd.connections_manager.reconciler.fetch_inventory", return_value=(DEVICES, KEYS))
+@patch("rfd.connections_manager.reconciler.get_conn")
+def test_reconcile_deletes_orphans(mock_get_conn, mock_inventory, mock_delete):
+    _mock_db(mock_get_conn, [("gcs-11111111", "k9"), ("gcs-33333333", None)])
+
+    stats = reconciler.reconcile_tailnet()
+
+    mock_delete.assert_called_once_with(["dev2"], ["k1"])
+    assert stats["deleted_devices"] == 1 and stats["deleted_keys"] == 1
+
+
+# === Test: dry run reports orphans without deleting ===
+@patch("rfd.connections_manager.reconciler.delete_in_parallel")
+@patch("rfd.connections_manager.reconciler.fetch_inventory", return_value=(DEVICES, KEYS))
+@patch("rfd.connections_manager.reconciler.get_conn")
+def test_reconcile_dry_run(mock_get_conn, mock_inventory, mock_delete):
+    _mock_db(mock_get_conn, [("gcs-11111111", None)])
+
+    stats = reconciler.reconcile_tailnet(dry_run=True)
+
+    mock_delete.assert_not_called()
+    assert stats["orphan_devices"] == 1 and stats["orphan_keys"] == 2
+
+
+# === Test: nothing is deleted when the inventory cannot be fetched ===
+@patch("rfd.connections_manager.reconciler.delete_in_parallel")
+@patch("rfd.connections_manager.reconciler.fetch_inventory", side_effect=RuntimeError("API down"))
+def test_reconcile_inventory_error(mock_inventory, mock_delete):
+    assert reconciler.reconcile_tailnet() is None
+    mock_delete.assert_not_called()
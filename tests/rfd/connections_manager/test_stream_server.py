@@ -0,0 +1,111 @@
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+from rfd.connections_manager.change_stream import ChangeBroker
+from rfd.connections_manager.stream_server import StreamServer
+
+MISSION = "11111111-1111-1111-1111-111111111111"
+SESSION = "33333333-3333-3333-3333-333333333333"
+
+
+def _event(event_id, mission_id=MISSION, session_id=SESSION, status="in progress"):
+    return {"id": event_id, "table_name": "grfp_sessions", "mission_id": mission_id,
+            "session_id": session_id, "status": status, "created_at": "2026-01-01T00:00:00+00:00"}
+
+
+@pytest.fixture
+def server():
+    broker = ChangeBroker(keepalive=30)
+    broker.ensure_listener = lambda: None
+    server = StreamServer(broker, port=0)
+    server.start()
+    yield server
+    server.stop()
+
+
+def _request(server, target, method="GET", headers=""):
+    sock = socket.create_connection((server.host, server.port), timeout=5)
+    sock.sendall(f"{method} {target} HTTP/1.1\r\nHost: rfd\r\n{headers}\r\n".encode())
+    return sock
+
+
+def _read_until(sock, marker):
+    data = b""
+    while marker not in data:
+        chunk = sock.recv(4096)
+        assert chunk, f"connection closed before {marker!r}: {data!r}"
+        data += chunk
+    return data.decode()
+
+
+def _wait_for_subscribers(server, count):
+    deadline = time.monotonic() + 5
+    while server.broker.stats()["subscribers"] < count:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+# === Test: events are written as SSE to the matching stream ===
+def test_stream_sends_events(server):
+    sock = _request(server, f"/change-stream?session_id={SESSION.upper()}")
+    head = _read_until(sock, b"retry: ")
+    assert head.startswith("HTTP/1.1 200 OK") and "Content-Type: text/event-stream" in head
+    _wait_for_subscribers(server, 1)
+
+    server.broker.publish(_event(7, status="finished"))
+
+    body = _read_until(sock, b"}\n\n")
+    data = body.split("data: ", 1)[1].split("\n", 1)[0]
+    assert "event: session\n" in body and json.loads(data)["status"] == "finished"
+    assert server.stats()["open"] == 1
+
+    sock.close()
+
+
+# === Test: Last-Event-ID resumes from the buffer ===
+def test_stream_resumes_from_last_event_id(server):
+    for i in range(1, 4):
+        server.broker.publish(_event(i))
+
+    sock = _request(server, f"/change-stream?mission_id={MISSION}", headers="Last-Event-ID: 1\r\n")
+
+    body = _read_until(sock, b"id: 3\n")
+    assert "id: 2\n" in body and "id: 1\n" not in body
+    sock.close()
+
+
+# === Test: bad requests get a JSON error and the connection is closed ===
+@pytest.mark.parametrize("target, method, status, reason", [
+    ("/change-stream", "GET", 400, "Missing parameters"),
+    ("/change-stream?mission_id=not-a-uuid", "GET", 400, "Invalid parameters"),
+    (f"/change-stream?session_id={SESSION}", "POST", 405, "Method not allowed"),
+    ("/metrics", "GET", 404, "Not found"),
+])
+def test_stream_rejects_bad_requests(server, target, method, status, reason):
+    sock = _request(server, target, method=method)
+
+    response = b""
+    while chunk := sock.recv(4096):
+        response += chunk
+    head, body = response.decode().split("\r\n\r\n", 1)
+    assert head.startswith(f"HTTP/1.1 {status} ")
+    assert json.loads(body) == {"status": "error", "reason": reason}
+    assert server.broker.stats()["subscribers"] == 0
+
+
+# === Test: many idle streams are served without a thread each ===
+def test_idle_streams_hold_no_threads(server):
+    count = 300
+    threads_before = threading.active_count()
+    socks = [_request(server, f"/change-stream?mission_id={MISSION}") for _ in range(count)]
+    _wait_for_subscribers(server, count)
+
+    assert threading.active_count() == threads_before
+    server.broker.publish(_event(1, session_id=None))
+    for sock in socks:
+        assert "id: 1\n" in _read_until(sock, b"id: 1\n")
+        sock.close()
@@ -83,3 +83,65 @@ def test_delete_auth_key_error(mock_delete):
     mock_delete.return_value.status_code = 500
     mock_delete.return_value.text = "Server error"
     assert not tailscale_manager.delete_auth_key("key500")
+
+
+# === Test: only the tracked key (or the hostname's key) is deleted, not every key ===
+@patch("rfd.connections_manager.tailscale_manager.delete_auth_key", return_value=True)
+@patch("rfd.connections_manager.tailscale_manager.delete_device", return_value=True)
+@patch("rfd.connections_manager.tailscale_manager.get_auth_keys")
+@patch("rfd.connections_manager.tailscale_manager.get_devices", return_value=[])
+def test_remove_from_tailnet_deletes_only_matching_key(mock_devices, mock_keys, mock_delete_device, mock_delete_key):
+    mock_keys.return_value = [
+        {"id": "k-pool", "description": "pool-client"},
+        {"id": "k-tracked", "description": "pool-client"},
+    ]
+
+    tailscale_manager.remove_from_tailnet("client-abcdef12", key_id="k-tracked")
+
+    mock_delete_key.assert_called_once_with("k-tracked")
+
+
+# === Test: remove_from_tailnet reports failed deletions ===
+@patch("rfd.connections_manager.tailscale_manager.delete_auth_key", return_value=True)
+@patch("rfd.connections_manager.tailscale_manager.delete_device", return_value=False)
+@patch("rfd.connections_manager.tailscale_manager.get_auth_keys")
+@patch("rfd.connections_manager.tailscale_manager.get_devices")
+def test_remove_from_tailnet_failure(mock_devices, mock_keys, mock_delete_device, mock_delete_key):
+    mock_devices.return_value = [{"hostname": "gcs-1", "id": "dev1"}, {"hostname": "gcs-2", "id": "dev2"}]
+    mock_keys.return_value = [{"description": "pool-gcs", "id": "k1"}, {"description": "other", "id": "k2"}]
+
+    assert not tailscale_manager.remove_from_tailnet("gcs-1", "k1")
+    mock_delete_device.assert_called_once_with("dev1")
+    mock_delete_key.assert_called_once_with("k1")
+
+# === Test: remove_from_tailnet treats listing errors as a failure ===
+@patch("rfd.connections_manager.tailscale_manager.get_devices", side_effect=RuntimeError("API down"))
+def test_remove_from_tailnet_listing_error(mock_devices):
+    assert not tailscale_manager.remove_from_tailnet("gcs-1")
+
+# === Test: match_inventory selects devices by hostname and keys by description or ID ===
+def test_match_inventory():
+    devices = [{"hostname": "gcs-1", "id": "dev1"}, {"hostname": "other", "id": "dev2"}]
+    keys = [{"description": "client-2", "id": "k1"}, {"description": "pool-gcs", "id": "k2"}, {"description": "x", "id": "k3"}]
+
+    device_matches, key_matches = tailscale_manager.match_inventory(devices, keys, {"gcs-1", "client-2"}, {"k2"})
+
+    assert device_matches == [("dev1", "gcs-1")]
+    assert key_matches == [("k1", "client-2"), ("k2", "pool-gcs")]
+
+# === Test: teardown_hostnames fetches the inventory once and maps failures to hostnames ===
+@patch("rfd.connections_manager.tailscale_manager.delete_auth_key", return_value=True)
+@patch("rfd.connections_manager.tailscale_manager.delete_device", side_effect=lambda device_id: device_id != "dev2")
+@patch("rfd.connections_manager.tailscale_manager.get_auth_keys")
+@patch("rfd.connections_manager.tailscale_manager.get_devices")
+def test_teardown_hostnames(mock_devices, mock_keys, mock_delete_device, mock_delete_key):
+    mock_devices.return_value = [{"hostname": "gcs-1", "id": "dev1"}, {"hostname": "client-2", "id": "dev2"}]
+    mock_keys.return_value = [{"description": "pool-gcs", "id": "k1"}, {"description": "client-2", "id": "k2"}]
+
+    stats = tailscale_manager.teardown_hostnames([("gcs-1", "k1"), ("client-2", None), ("gone-3", None)])
+
+    mock_devices.assert_called_once()
+    mock_keys.assert_called_once()
+    assert stats["failed"] == {"client-2"}
+    assert stats["devices"] == 1
+    assert stats["keys"] == 2
@@ -0,0 +1,121 @@
+import pytest
+from unittest.mock import patch, MagicMock
+
+from rfd.connections_manager import teardown_outbox
+
+
+def _mock_conn(mock_get_conn, claimed_batches):
+    mock_cursor = MagicMock()
+    mock_cursor.fetchall.side_effect = claimed_batches
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_get_conn.return_value.__enter__.return_value = mock_conn
+    return mock_conn, mock_cursor
+
+
+def _status_updates(mock_cursor):
+    # (sql, params) of every UPDATE recording a result
+    return [c.args for c in mock_cursor.execute.call_args_list if "RETURNING" not in c.args[0]]
+
+
+# === Test: enqueue does not commit (caller's transaction) ===
+def test_enqueue_teardown_does_not_commit():
+    mock_conn = MagicMock()
+    mock_cursor = mock_conn.cursor.return_value.__enter__.return_value
+
+    teardown_outbox.enqueue_teardown(mock_conn, "gcs-12345678", "k1")
+
+    sql, params = mock_cursor.execute.call_args.args
+    assert "ON CONFLICT" in sql
+    assert params == ("gcs-12345678", "k1")
+    mock_conn.commit.assert_not_called()
+
+
+# === Test: the whole batch is torn down with one call and marked done ===
+@patch("rfd.connections_manager.teardown_outbox.teardown_hostnames")
+@patch("rfd.connections_manager.teardown_outbox.get_conn")
+def test_drain_marks_done(mock_get_conn, mock_teardown):
+    mock_teardown.return_value = {"failed": set(), "devices": 2, "keys": 1, "duration": 0.1}
+    mock_conn, mock_cursor = _mock_conn(mock_get_conn, [[(1, "client-1", None, 1, False), (2, "gcs-2", "k2", 1, False)]])
+
+    counts = teardown_outbox.drain_outbox()
+
+    assert counts == {"done": 2, "retry": 0, "dead": 0, "superseded": 0, "devices": 2, "keys": 1}
+    mock_teardown.assert_called_once_with([("client-1", None), ("gcs-2", "k2")])
+    updates = _status_updates(mock_cursor)
+    assert all("status = 'done'" in sql for sql, _ in updates)
+    assert [params for _, params in updates] == [(1,), (2,)]
+
+
+# === Test: failed hostnames are retried, then dead-lettered ===
+@patch("rfd.connections_manager.teardown_outbox.OUTBOX_MAX_ATTEMPTS", 3)
+@patch("rfd.connections_manager.teardown_outbox.teardown_hostnames")
+@patch("rfd.connections_manager.teardown_outbox.get_conn")
+def test_drain_retries_and_dead_letters(mock_get_conn, mock_teardown):
+    mock_teardown.return_value = {"failed": {"client-1", "gcs-2"}, "devices": 0, "keys": 0, "duration": 0.1}
+    mock_conn, mock_cursor = _mock_conn(mock_get_conn, [[(1, "client-1", None, 1, False), (2, "gcs-2", "k2", 3, False)]])
+
+    counts = teardown_outbox.drain_outbox()
+
+    assert counts == {"done": 0, "retry": 1, "dead": 1, "superseded": 0, "devices": 0, "keys": 0}
+    updates = _status_updates(mock_cursor)
+    assert "next_attempt_at" in updates[0][0] and updates[0][1][0] == teardown_outbox.OUTBOX_RETRY_BASE
+    assert "status = 'dead'" in updates[1][0]
+
+
+# === Test: inventory failure puts the whole batch up for retry ===
+@patch("rfd.connections_manager.teardown_outbox.teardown_hostnames", side_effect=Exception("API down"))
+@patch("rfd.connections_manager.teardown_outbox.get_conn")
+def test_drain_retries_batch_on_inventory_error(mock_get_conn, mock_teardown):
+    mock_conn, mock_cursor = _mock_conn(mock_get_conn, [[(1, "client-1", None, 1, False), (2, "gcs-2", None, 1, False)]])
+
+    counts = teardown_outbox.drain_outbox()
+
+    assert counts["retry"] == 2 and counts["done"] == 0
+    assert all(params[1] == "API down" for _, params in _status_updates(mock_cursor))
+
+
+# === Test: an intent whose hostname was reused by a live connection is not torn down ===
+@patch("rfd.connections_manager.teardown_outbox.teardown_hostnames")
+@patch("rfd.connections_manager.teardown_outbox.get_conn")
+def test_drain_skips_reused_hostname(mock_get_conn, mock_teardown):
+    mock_teardown.return_value = {"failed": set(), "devices": 1, "keys": 0, "duration": 0.1}
+    # gcs-2 was released, queued for teardown, then handed out again to a new connection
+    mock_conn, mock_cursor = _mock_conn(mock_get_conn, [[(1, "client-1", None, 1, False), (2, "gcs-2", "k2", 0, True)]])
+
+    counts = teardown_outbox.drain_outbox()
+
+    claim_sql = mock_cursor.execute.call_args_list[0].args[0]
+    assert "vpn_connections" in claim_sql and "'superseded'" in claim_sql
+    mock_teardown.assert_called_once_with([("client-1", None)])
+    assert counts["done"] == 1 and counts["superseded"] == 1
+    assert [params for _, params in _status_updates(mock_cursor)] == [(1,)]
+
+
+# === Test: all intents of a batch superseded ===
+@patch("rfd.connections_manager.teardown_outbox.teardown_hostnames")
+@patch("rfd.connections_manager.teardown_outbox.get_conn")
+def test_drain_all_superseded(mock_get_conn, mock_teardown):
+    mock_conn, mock_cursor = _mock_conn(mock_get_conn, [[(2, "gcs-2", "k2", 0, True)]])
+
+    counts = teardown_outbox.drain_outbox()
+
+    mock_teardown.assert_not_called()
+    assert counts["superseded"] == 1 and counts["done"] == 0
+
+
+# === Test: a drain already in progress is not duplicated ===
+@patch("rfd.connections_manager.teardown_outbox.get_conn")
+def test_drain_skipped_when_running(mock_get_conn):
+    with teardown_outbox._drain_lock:
+        assert teardown_outbox.drain_outbox() is None
+    mock_get_conn.assert_not_called()
+
+
+# === Test: drain is postponed while the Tailscale circuit is open ===
+@patch("rfd.connections_manager.teardown_outbox.tailscale_unavailable", return_value=True)
+@patch("rfd.connections_manager.teardown_outbox.get_conn")
+def test_drain_skipped_when_tailscale_unavailable(mock_get_conn, mock_unavailable):
+    assert teardown_outbox.drain_outbox() is None
+    mock_get_conn.assert_not_called()
+    assert not teardown_outbox._drain_lock.locked()
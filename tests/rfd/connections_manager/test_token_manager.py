@@ -27,15 +27,16 @@ def test_create_tailscale_auth_key_success(mock_post):
     # Mock a successful response from Tailscale API
     mock_response = MagicMock()
     mock_response.status_code = 200
-    mock_response.json.return_value = {"key": "tskey-abc123xyz"}
+    mock_response.json.return_value = {"key": "tskey-abc123xyz", "id": "k123"}
     mock_post.return_value = mock_response
 
     # When
-    key, exp = token_manager.create_tailscale_auth_key("device1", "gcs", expiry_hours=2)
+    key, exp, key_id = token_manager.create_tailscale_auth_key("device1", "gcs", expiry_hours=2)
 
     # Then
     assert key == "tskey-abc123xyz"
     assert exp == 2
+    assert key_id == "k123"
     mock_post.assert_called_once()
 
 
@@ -58,7 +59,7 @@ def test_create_tailscale_auth_key_failure(mock_post):
 @patch("rfd.connections_manager.token_manager.hash_token")
 def test_create_token_success(mock_hash_token, mock_create_key):
     # Mock dependencies
-    mock_create_key.return_value = ("tskey-xyz", 1)
+    mock_create_key.return_value = ("tskey-xyz", 1, "k1")
     mock_hash_token.return_value = "HASHED123"
 
     # Given base inputs
@@ -66,10 +67,11 @@ def test_create_token_success(mock_hash_token, mock_create_key):
     tag = "gcs"
 
     # When
-    token, token_hash, expires, hostname = token_manager.create_token(base, tag)
+    token, token_hash, expires, hostname, key_id = token_manager.create_token(base, tag)
 
     # Then
     assert token == "tskey-xyz"
     assert token_hash == "HASHED123"
     assert isinstance(expires, datetime)
     assert hostname == "gcs-ef123456"
+    assert key_id == "k1"
@@ -0,0 +1,85 @@
+import pytest
+from unittest.mock import patch
+
+from rfd.fake_tailscale.app import create_app, serve_in_thread
+from rfd.fake_tailscale.state import FaultInjector
+
+AUTH = ("tskey-api-test", "")
+
+
+@pytest.fixture
+def app():
+    return create_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+# === Test: keys can be created, listed and deleted ===
+def test_key_lifecycle(client):
+    response = client.post("/api/v2/tailnet/t/keys", auth=AUTH, json={"description": "gcs-1", "capabilities": {}})
+    assert response.status_code == 200
+    key_id = response.get_json()["id"]
+
+    keys = client.get("/api/v2/tailnet/t/keys", auth=AUTH).get_json()["keys"]
+    assert [k["description"] for k in keys] == ["gcs-1"]
+    assert "key" not in keys[0]
+
+    assert client.delete(f"/api/v2/tailnet/t/keys/{key_id}", auth=AUTH).status_code == 200
+    assert client.delete(f"/api/v2/tailnet/t/keys/{key_id}", auth=AUTH).status_code == 404
+
+
+# === Test: joining with a one-off key consumes it and creates a tagged device ===
+def test_device_join_consumes_key(client):
+    caps = {"devices": {"create": {"reusable": False, "tags": ["tag:gcs"]}}}
+    key = client.post("/api/v2/tailnet/t/keys", auth=AUTH, json={"description": "gcs-1", "capabilities": caps}).get_json()
+
+    device = client.post("/_fake/devices", json={"hostname": "gcs-1", "authKey": key["key"]}).get_json()
+
+    assert device["tags"] == ["tag:gcs"]
+    assert client.get("/api/v2/tailnet/t/keys", auth=AUTH).get_json()["keys"] == []
+    assert client.post("/_fake/devices", json={"hostname": "gcs-2", "authKey": key["key"]}).status_code == 403
+    assert client.delete(f"/api/v2/device/{device['id']}", auth=AUTH).status_code == 200
+
+
+# === Test: requests without credentials are rejected ===
+def test_requires_credentials(client):
+    assert client.get("/api/v2/tailnet/t/devices").status_code == 401
+
+
+# === Test: rate limit answers 429 with Retry-After, errors are injected ===
+def test_fault_injection():
+    client = create_app(faults=FaultInjector(rate_limit=1, burst=1, retry_after=3)).test_client()
+
+    assert client.get("/api/v2/tailnet/t/devices", auth=AUTH).status_code == 200
+    response = client.get("/api/v2/tailnet/t/devices", auth=AUTH)
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "3"
+
+    client.post("/_fake/config", json={"rate_limit": None, "error_rate": 1.0})
+    assert client.get("/api/v2/tailnet/t/devices", auth=AUTH).status_code == 500
+    assert client.get("/_fake/stats").get_json()["throttled"] == 1
+
+
+# === Test: the real client code runs against the stand-in over HTTP ===
+def test_client_code_against_fake(app):
+    from rfd.connections_manager import tailscale_manager, token_manager
+
+    server, base_url = serve_in_thread(app)
+    try:
+        with patch.object(tailscale_manager, "TAILSCALE_API_BASE_URL", base_url), \
+             patch.object(token_manager, "TAILSCALE_API_BASE_URL", base_url), \
+             patch.object(tailscale_manager, "_cached_token", None):
+            key, _, key_id = token_manager.create_tailscale_auth_key("client-12345678", "client")
+            app.tailnet.add_device("client-12345678", auth_key=key)
+            app.tailnet.create_key("client-12345678", {}, 3600)
+
+            stats = tailscale_manager.teardown_hostnames([("client-12345678", key_id)])
+
+        assert stats["failed"] == set()
+        assert stats["devices"] == 1 and stats["keys"] == 1
+        assert app.tailnet.list_devices() == [] and app.tailnet.list_keys() == []
+    finally:
+        server.shutdown()
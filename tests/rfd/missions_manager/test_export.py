@@ -0,0 +1,61 @@
+import json
+import uuid
+from datetime import datetime, timezone
+from unittest.mock import patch, MagicMock
+
+from rfd.missions_manager.export import stream_rows, to_ndjson, to_csv
+
+COLUMNS = ("mission_id", "parameters", "valid_from", "valid_to")
+ROW = (uuid.UUID(int=1), {"alt": 50}, datetime(2026, 1, 1, tzinfo=timezone.utc), None)
+
+
+# === Test: rows are read in chunks through a named cursor and the connection is closed ===
+@patch("rfd.missions_manager.export.get_conn")
+def test_stream_rows_named_cursor_chunks(mock_get_conn):
+    mock_cursor = MagicMock()
+    mock_cursor.fetchmany.side_effect = [[ROW, ROW], [ROW], []]
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_get_conn.return_value = mock_conn
+
+    chunks = list(stream_rows("grfp_missions", COLUMNS, "valid_to IS NULL", [], chunk_rows=2))
+
+    assert [len(c) for c in chunks] == [2, 1]
+    assert mock_conn.cursor.call_args.kwargs["name"].startswith("grfp_export_")
+    assert mock_cursor.itersize == 2
+    mock_cursor.fetchmany.assert_called_with(2)
+    mock_conn.close.assert_called_once()
+
+
+# === Test: a consumer that stops early still releases the connection ===
+@patch("rfd.missions_manager.export.get_conn")
+def test_stream_rows_closed_early(mock_get_conn):
+    mock_cursor = MagicMock()
+    mock_cursor.fetchmany.return_value = [ROW]
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_get_conn.return_value = mock_conn
+
+    stream = stream_rows("grfp_missions", COLUMNS, "TRUE", [])
+    next(stream)
+    stream.close()
+
+    mock_conn.close.assert_called_once()
+
+
+# === Test: NDJSON has one object per row with UUIDs and timestamps as strings ===
+def test_ndjson_encoding():
+    body = "".join(to_ndjson(COLUMNS, [[ROW], [ROW]]))
+    lines = body.splitlines()
+
+    assert len(lines) == 2
+    assert json.loads(lines[0]) == {"mission_id": str(uuid.UUID(int=1)), "parameters": {"alt": 50},
+                                    "valid_from": "2026-01-01T00:00:00+00:00", "valid_to": None}
+
+
+# === Test: CSV starts with the header, JSONB as JSON text and NULL as empty ===
+def test_csv_encoding():
+    parts = list(to_csv(COLUMNS, [[ROW]]))
+
+    assert parts[0] == "mission_id,parameters,valid_from,valid_to\r\n"
+    assert parts[1] == f'{uuid.UUID(int=1)},"{{""alt"": 50}}",2026-01-01T00:00:00+00:00,\r\n'
@@ -0,0 +1,64 @@
+from unittest.mock import patch, MagicMock
+
+from rfd.missions_manager import field_validators as fv
+from rfd.missions_manager.reference_data import Snapshot
+
+SNAPSHOT = Snapshot(frozenset({"quad"}), frozenset({"default"}), frozenset({"field-1"}), frozenset({"survey"}))
+VALUES = {"mission_id": "m1", "location": "field-1", "email": "user@example.com",
+          "time_window": "Tomorrow", "drone_type": "quad"}
+
+
+# === Test: with a current snapshot only email is checked in SQL, together with the insert ===
+@patch.object(fv.reference_data, "cached", return_value=SNAPSHOT)
+def test_create_mission_cached_references(mock_cached):
+    cur = MagicMock()
+    cur.fetchone.return_value = (True,)
+
+    assert fv.create_mission(cur, VALUES) == []
+
+    assert cur.execute.call_count == 1
+    sql, params = cur.execute.call_args[0]
+    assert "INSERT INTO grfp_missions" in sql and "grfp_users" in sql
+    assert "grfp_drone_types" not in sql and "grfp_locations" not in sql
+    assert params["mission_id"] == "m1"
+
+
+# === Test: without a snapshot every reference is checked in the same statement ===
+@patch.object(fv.reference_data, "reload_async")
+@patch.object(fv.reference_data, "cached", return_value=None)
+def test_create_mission_uncached_reports_all_failures(mock_cached, mock_reload):
+    cur = MagicMock()
+    # Checks in statement order: drone_type, location, email
+    cur.fetchone.return_value = (False, False, True)
+
+    failed = fv.create_mission(cur, VALUES)
+
+    assert failed == ["drone_type", "location"]
+    assert cur.execute.call_count == 1
+    sql = cur.execute.call_args[0][0]
+    assert "grfp_drone_types" in sql and "grfp_locations" in sql and "grfp_users" in sql
+    assert "INSERT INTO grfp_missions" in sql
+    mock_reload.assert_called_once()
+
+
+# === Test: a value missing from the snapshot skips the insert but email is still checked ===
+@patch.object(fv.reference_data, "cached", return_value=SNAPSHOT)
+def test_create_mission_invalid_reference_no_insert(mock_cached):
+    cur = MagicMock()
+    cur.fetchone.return_value = (False,)
+
+    failed = fv.create_mission(cur, {**VALUES, "drone_type": "hexa", "parameters": {"a": 1}})
+
+    assert failed == ["drone_type", "email"]
+    sql, params = cur.execute.call_args[0]
+    assert "INSERT" not in sql
+    assert params == {"email": "user@example.com"}
+
+
+# === Test: non-string values fail without a query when nothing else needs checking ===
+@patch.object(fv.reference_data, "cached", return_value=SNAPSHOT)
+def test_create_mission_non_string_values(mock_cached):
+    cur = MagicMock()
+
+    assert fv.create_mission(cur, {**VALUES, "email": ["x"], "drone_type": {"a": 1}}) == ["drone_type", "email"]
+    cur.execute.assert_not_called()
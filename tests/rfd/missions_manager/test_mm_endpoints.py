@@ -1,4 +1,7 @@
+import gzip
+import json
 import pytest
+from datetime import datetime, timezone
 from unittest.mock import patch, MagicMock
 from flask import Flask
 
@@ -21,6 +24,7 @@ def app(bypass_auth):
     app.add_url_rule('/mission-group-request', view_func=endpoints.mission_group_request, methods=['POST'])
     app.add_url_rule('/change-mission-status', view_func=endpoints.change_mission_status, methods=['POST'])
     app.add_url_rule('/get-missions-list', view_func=endpoints.get_missions_list, methods=['POST'])
+    app.add_url_rule('/export', view_func=endpoints.export_history, methods=['GET'])
     return app
 
 @pytest.fixture
@@ -36,9 +40,9 @@ def test_mission_request_returns_400_when_missing_required_fields(client):
     assert response.json["status"] == "error"
 
 
-@patch("rfd.missions_manager.endpoints.fv.drone_type_val", return_value=True)
-@patch("rfd.missions_manager.endpoints.fv.email_val", return_value=False)
-def test_mission_request_invalid_email(mock_email_val, mock_drone_type_val, client):
+@patch("rfd.missions_manager.endpoints.fv.create_mission", return_value=["email"])
+@patch("rfd.missions_manager.endpoints.get_conn")
+def test_mission_request_invalid_email(mock_get_conn, mock_create_mission, client):
     payload = {
         "email": "bad@example.com",
         "time_window": "Tomorrow",
@@ -49,8 +53,7 @@ def test_mission_request_invalid_email(mock_email_val, mock_drone_type_val, clie
     assert "email" in response.json["reason"].lower()
 
 
-@patch("rfd.missions_manager.endpoints.fv.drone_type_val", return_value=True)
-def test_mission_request_missing_email(mock_drone_type_val, client):
+def test_mission_request_missing_email(client):
     payload = {
         "time_window": "Tomorrow",
         "drone_type": "Quad"
@@ -60,27 +63,29 @@ def test_mission_request_missing_email(mock_drone_type_val, client):
     assert "email required" in response.json["reason"].lower()
 
 
-@patch("rfd.missions_manager.endpoints.fv.drone_type_val", return_value=False)
-def test_mission_request_invalid_drone_type(mock_drone_type_val, client):
+# All invalid fields are reported together
+@patch("rfd.missions_manager.endpoints.fv.create_mission", return_value=["drone_type", "location"])
+@patch("rfd.missions_manager.endpoints.send_email_or_defer")
+@patch("rfd.missions_manager.endpoints.get_conn")
+def test_mission_request_invalid_fields(mock_get_conn, mock_send_email, mock_create_mission, client):
     payload = {
         "email": "user@example.com",
         "time_window": "Tomorrow",
-        "drone_type": "UNKNOWN"
+        "drone_type": "UNKNOWN",
+        "location": "Nowhere"
     }
     response = client.post("/mission-request", json=payload)
     assert response.status_code == 404
     assert "drone type" in response.json["reason"].lower()
+    assert response.json["invalid_fields"] == ["drone_type", "location"]
+    mock_send_email.assert_not_called()
 
 
 # Successful mission creation with mocked dependencies
-@patch("rfd.missions_manager.endpoints.fv.email_val", return_value=True)
-@patch("rfd.missions_manager.endpoints.fv.drone_type_val", return_value=True)
-@patch("rfd.missions_manager.endpoints.fv.location_val", return_value=True)
-@patch("rfd.missions_manager.endpoints.fv.mission_group_val", return_value=True)
-@patch("rfd.missions_manager.endpoints.send_email")
+@patch("rfd.missions_manager.endpoints.fv.create_mission", return_value=[])
+@patch("rfd.missions_manager.endpoints.send_email_or_defer")
 @patch("rfd.missions_manager.endpoints.get_conn")
-def test_mission_request_with_valid_fields(mock_get_conn, mock_send_email, mock_group_val,
-                                           mock_location_val, mock_drone_val, mock_email_val, client):
+def test_mission_request_with_valid_fields(mock_get_conn, mock_send_email, mock_create_mission, client):
     mock_cursor = MagicMock()
     mock_conn = MagicMock()
     mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
@@ -99,6 +104,13 @@ def test_mission_request_with_valid_fields(mock_get_conn, mock_send_email, mock_
     assert response.json["status"] == "ok"
     mock_send_email.assert_called_once()
 
+    cur, values = mock_create_mission.call_args[0]
+    assert cur is mock_cursor
+    assert values["mission_id"] == response.json["mission_id"]
+    assert values["location"] == "Area 51" and values["mission_group"] == "groupA"
+    assert "mission_type" not in values
+    mock_conn.commit.assert_called_once()
+
 
 # === /mission-group-request ===
 @patch("rfd.missions_manager.endpoints.get_conn")
@@ -123,7 +135,7 @@ def test_mission_group_request_returns_400_when_missing_group(client):
 # === /change-mission-status ===
 @patch("rfd.missions_manager.endpoints.get_conn")
 @patch("rfd.missions_manager.endpoints.update_versioned")
-@patch("rfd.missions_manager.endpoints.send_email")
+@patch("rfd.missions_manager.endpoints.send_email_or_defer")
 def test_change_mission_status_successful(mock_send_email, mock_update_versioned, mock_get_conn, client):
     mock_get_conn.return_value = MagicMock()
 
@@ -152,7 +164,8 @@ def test_change_mission_status_returns_400_on_missing_fields(client, payload):
 @patch("rfd.missions_manager.endpoints.get_conn")
 def test_get_missions_list_with_filters(mock_get_conn, client):
     mock_cursor = MagicMock()
-    mock_cursor.fetchall.return_value = [{"mission_id": "abc", "status": "new"}]
+    mock_cursor.fetchall.return_value = [("abc", "new", datetime(2026, 1, 1, tzinfo=timezone.utc), 1)]
+    mock_cursor.description = [("mission_id",), ("status",), ("valid_from",), ("id",)]
     mock_conn = MagicMock()
     mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
     mock_get_conn.return_value.__enter__.return_value = mock_conn
@@ -160,11 +173,124 @@ def test_get_missions_list_with_filters(mock_get_conn, client):
     response = client.post("/get-missions-list", json={"email": "test@example.com"})
     assert response.status_code == 200
     assert response.json["status"] == "ok"
-    assert isinstance(response.json["data"], list)
+    assert response.json["data"] == [{"mission_id": "abc", "status": "new", "valid_from": "2026-01-01T00:00:00+00:00", "id": 1}]
+
+
+# Keyset pagination: one extra row means a next page, the cursor resumes after the last row
+@patch("rfd.missions_manager.endpoints.get_conn")
+def test_get_missions_list_pages_with_cursor(mock_get_conn, client):
+    rows = [(f"m{i}", "new", datetime(2026, 1, 1, 0, 0, i, tzinfo=timezone.utc), 10 - i) for i in range(3)]
+    mock_cursor = MagicMock()
+    mock_cursor.fetchall.side_effect = [rows, rows[2:]]
+    mock_cursor.description = [("mission_id",), ("status",), ("valid_from",), ("id",)]
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_get_conn.return_value.__enter__.return_value = mock_conn
+
+    response = client.post("/get-missions-list", json={"mission_group": "g", "limit": 2, "fields": "mission_id,status"})
+    assert response.status_code == 200
+    assert response.json["data"] == [{"mission_id": "m0", "status": "new"}, {"mission_id": "m1", "status": "new"}]
+    sql, args = mock_cursor.execute.call_args[0]
+    assert "SELECT mission_id, status, valid_from, id" in sql
+    assert "ORDER BY valid_from DESC, id DESC" in sql
+    assert args == ["g", 3]
+
+    cursor = response.json["next_cursor"]
+    response = client.post("/get-missions-list", json={"mission_group": "g", "limit": 2, "cursor": cursor})
+    assert response.status_code == 200
+    assert response.json["next_cursor"] is None
+    sql, args = mock_cursor.execute.call_args[0]
+    assert "(valid_from, id) < (%s, %s)" in sql
+    assert args == ["g", rows[1][2], 9, 3]
+
+
+# Compact shape: column names once, one array per row; large bodies gzipped when accepted
+@patch("rfd.missions_manager.endpoints.get_conn")
+def test_get_missions_list_rows_shape_gzip(mock_get_conn, client):
+    rows = [(f"m{i}", "new", datetime(2026, 1, 1, tzinfo=timezone.utc), i) for i in range(200)]
+    mock_cursor = MagicMock()
+    mock_cursor.fetchall.return_value = rows
+    mock_cursor.description = [("mission_id",), ("status",), ("valid_from",), ("id",)]
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_get_conn.return_value.__enter__.return_value = mock_conn
+
+    response = client.post("/get-missions-list", json={"mission_group": "g", "shape": "rows", "fields": ["mission_id"], "limit": 500},
+                           headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    body = json.loads(gzip.decompress(response.get_data()))
+    assert body["columns"] == ["mission_id"]
+    assert body["rows"][:2] == [["m0"], ["m1"]]
+
+
+# Repeated fields are selected and returned once
+@patch("rfd.missions_manager.endpoints.get_conn")
+def test_get_missions_list_duplicate_fields(mock_get_conn, client):
+    rows = [("m0", "new", datetime(2026, 1, 1, tzinfo=timezone.utc), 1)]
+    mock_cursor = MagicMock()
+    mock_cursor.fetchall.return_value = rows
+    mock_cursor.description = [("mission_id",), ("status",), ("valid_from",), ("id",)]
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_get_conn.return_value.__enter__.return_value = mock_conn
+
+    response = client.post("/get-missions-list", json={"mission_group": "g", "shape": "rows",
+                                                       "fields": "mission_id,status,mission_id"})
+
+    assert response.status_code == 200
+    assert "SELECT mission_id, status, valid_from, id" in mock_cursor.execute.call_args[0][0]
+    assert response.json["columns"] == ["mission_id", "status"]
+    assert response.json["rows"] == [["m0", "new"]]
+
+
+@pytest.mark.parametrize("payload", [
+    {"mission_group": "g", "fields": ["mission_id", "password"]},
+    {"mission_group": "g", "cursor": "not-a-cursor"},
+    {"mission_group": "g", "limit": "many"},
+    {"mission_group": "g", "shape": "table"},
+])
+def test_get_missions_list_invalid_paging(payload, client):
+    response = client.post("/get-missions-list", json=payload)
+    assert response.status_code == 400
 
 
 @patch("rfd.missions_manager.endpoints.get_conn")
 def test_get_missions_list_missing_required_filters(mock_get_conn, client):
     response = client.post("/get-missions-list", json={})
     assert response.status_code == 400
-    assert response.json["status"] == "error"
\ No newline at end of file
+    assert response.json["status"] == "error"
+
+
+# === /export ===
+@patch("rfd.missions_manager.endpoints.stream_rows")
+def test_export_streams_ndjson_with_filters(mock_stream_rows, client):
+    mock_stream_rows.return_value = iter([[(1, "s1", "m1", "finished", None, None, None)]])
+
+    response = client.get("/export?table=sessions&since=2026-01-01T00:00:00%2B00:00&history=true")
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    assert response.get_data(as_text=True).splitlines()[0].startswith('{"id": 1, "session_id": "s1"')
+    table, columns, where_sql, params = mock_stream_rows.call_args[0]
+    assert table == "grfp_sessions"
+    assert where_sql == "valid_from >= %s"
+    assert params[0].year == 2026
+
+
+@patch("rfd.missions_manager.endpoints.stream_rows")
+def test_export_current_versions_csv(mock_stream_rows, client):
+    mock_stream_rows.return_value = iter([])
+
+    response = client.get("/export?format=csv")
+
+    assert response.status_code == 200
+    assert response.get_data(as_text=True).startswith("id,mission_id,")
+    assert mock_stream_rows.call_args[0][2] == "valid_to IS NULL"
+
+
+@pytest.mark.parametrize("query", ["table=users", "format=xml", "since=yesterday"])
+def test_export_invalid_parameters(query, client):
+    response = client.get(f"/export?{query}")
+    assert response.status_code == 400
@@ -0,0 +1,80 @@
+from unittest.mock import patch, MagicMock
+
+import pytest
+
+from rfd.missions_manager import field_validators as fv
+from rfd.missions_manager.reference_data import ReferenceData, Snapshot, _load
+
+
+def _snapshot(drone_types=("quad",), mission_groups=("default",), locations=("field-1",), mission_types=("survey",)):
+    return Snapshot(frozenset(drone_types), frozenset(mission_groups), frozenset(locations), frozenset(mission_types))
+
+
+# === Test: all reference tables are loaded in one query into frozensets ===
+@patch("rfd.missions_manager.reference_data.get_conn")
+def test_load_single_query(mock_get_conn):
+    mock_cursor = MagicMock()
+    mock_cursor.fetchall.return_value = [("drone_types", "quad"), ("locations", "field-1"), ("drone_types", "hexa")]
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_get_conn.return_value.__enter__.return_value = mock_conn
+
+    snapshot = _load()
+
+    assert mock_cursor.execute.call_count == 1
+    assert snapshot.drone_types == frozenset({"quad", "hexa"})
+    assert snapshot.locations == frozenset({"field-1"})
+    assert snapshot.mission_types == frozenset()
+
+
+# === Test: the snapshot is reused until invalidated ===
+def test_snapshot_reused_until_invalidated():
+    loader = MagicMock(side_effect=[_snapshot(), _snapshot(drone_types=("quad", "hexa"))])
+    data = ReferenceData(ttl=300, loader=loader)
+
+    assert "hexa" not in data.snapshot().drone_types
+    assert "hexa" not in data.snapshot().drone_types
+    assert loader.call_count == 1
+
+    data.invalidate("grfp_drone_types")
+    assert "hexa" in data.snapshot().drone_types
+    assert loader.call_count == 2
+
+
+# === Test: the snapshot is reloaded after the TTL ===
+def test_snapshot_reloaded_after_ttl():
+    loader = MagicMock(return_value=_snapshot())
+    data = ReferenceData(ttl=0, loader=loader)
+
+    data.snapshot()
+    data.snapshot()
+
+    assert loader.call_count == 2
+
+
+# === Test: a failed reload keeps serving the previous snapshot, a failed first load raises ===
+def test_failed_reload_serves_previous():
+    loader = MagicMock(side_effect=[_snapshot(), Exception("db down"), _snapshot(locations=("field-2",))])
+    data = ReferenceData(ttl=300, loader=loader)
+    data.snapshot()
+
+    data.invalidate()
+    assert data.snapshot().locations == frozenset({"field-1"})
+    assert data.snapshot().locations == frozenset({"field-2"})
+    assert data.stats()["load_errors"] == 1
+
+    with pytest.raises(Exception):
+        ReferenceData(loader=MagicMock(side_effect=Exception("db down"))).snapshot()
+
+
+# === Test: validators are set membership on the snapshot, without a DB connection ===
+@patch("rfd.missions_manager.field_validators.get_conn")
+def test_validators_use_snapshot(mock_get_conn):
+    with patch.object(fv.reference_data, "snapshot", return_value=_snapshot()):
+        assert fv.drone_type_val("quad") is True
+        assert fv.drone_type_val("hexa") is False
+        assert fv.mission_group_val("default") is True
+        assert fv.location_val("field-1") is True
+        assert fv.mission_type_val("survey") is True
+        assert fv.mission_type_val(["survey"]) is False
+    mock_get_conn.assert_not_called()
@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+from rfd.resets import reset_tailnet
+
+NOW = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+DEVICES = [
+    {"id": "dev1", "hostname": "gcs-1", "created": "2026-01-01T10:00:00Z"},
+    {"id": "dev2", "hostname": "client-2", "created": "2026-01-01T11:55:00Z"},
+    {"id": "dev3", "hostname": "laptop", "created": "2025-01-01T00:00:00Z"},
+]
+KEYS = [
+    {"id": "k1", "description": "client-2", "created": "2026-01-01T09:00:00Z"},
+    {"id": "k2", "description": "pool-gcs"},
+]
+
+
+def test_select_targets_prefix_and_age():
+    devices, keys = reset_tailnet.select_targets(DEVICES, KEYS, ["gcs", "client"], timedelta(minutes=30), now=NOW)
+
+    assert devices == [("dev1", "gcs-1")]
+    assert keys == [("k1", "client-2")]
+
+    devices, keys = reset_tailnet.select_targets(DEVICES, KEYS, ["pool"], now=NOW)
+    assert devices == [] and keys == [("k2", "pool-gcs")]
+
+
+def test_select_targets_multi_segment_prefix():
+    devices = [{"id": "a", "hostname": "gcs-ab12"}, {"id": "b", "hostname": "gcs-cd34"}]
+
+    targets, _ = reset_tailnet.select_targets(devices, [], ["gcs-ab"], now=NOW)
+
+    assert targets == [("a", "gcs-ab12")]
+
+
+def test_select_targets_defaults_spare_lookalikes():
+    devices = [{"id": "a", "hostname": "gcs-ab12"}, {"id": "b", "hostname": "gcsbackup-1"},
+               {"id": "c", "hostname": "client-9"}, {"id": "d", "hostname": "clientele-db"}]
+
+    targets, _ = reset_tailnet.select_targets(devices, [], now=NOW)
+    assert targets == [("a", "gcs-ab12"), ("c", "client-9")]
+
+    # A dash-less prefix is matched as the whole first token
+    targets, _ = reset_tailnet.select_targets(devices, [], ["gcs"], now=NOW)
+    assert targets == [("a", "gcs-ab12")]
+
+
+@patch("rfd.resets.reset_tailnet.delete_in_parallel")
+@patch("rfd.resets.reset_tailnet.fetch_inventory", return_value=(DEVICES, KEYS))
+def test_reset_tailnet_dry_run(mock_inventory, mock_delete):
+    result = reset_tailnet.reset_tailnet(dry_run=True)
+
+    mock_delete.assert_not_called()
+    assert result == {"devices": 2, "keys": 1, "failed": 0}
+
+
+@patch("rfd.resets.reset_tailnet.delete_in_parallel", return_value=(set(), {"k1"}))
+@patch("rfd.resets.reset_tailnet.fetch_inventory", return_value=(DEVICES, KEYS))
+def test_reset_tailnet_reports_failures(mock_inventory, mock_delete):
+    result = reset_tailnet.reset_tailnet()
+
+    assert mock_delete.call_args.args == (["dev1", "dev2"], ["k1"])
+    assert result == {"devices": 2, "keys": 0, "failed": 1}
@@ -0,0 +1,55 @@
+import pytest
+from unittest.mock import patch
+
+from tech_utils import circuit_breaker
+from tech_utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+def _fail():
+    raise ConnectionError("down")
+
+
+def test_opens_after_threshold():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(_fail)
+
+    assert breaker.state == circuit_breaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: "ok")
+    assert breaker.stats()["rejected"] == 1
+
+
+@patch("tech_utils.circuit_breaker.time")
+def test_half_open_probe(mock_time):
+    mock_time.monotonic.return_value = 100
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=30)
+    with pytest.raises(ConnectionError):
+        breaker.call(_fail)
+
+    # After the reset timeout exactly one probe is allowed
+    mock_time.monotonic.return_value = 131
+    assert breaker.state == circuit_breaker.HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+    # Successful probe closes the circuit
+    breaker.record_success()
+    assert breaker.state == circuit_breaker.CLOSED
+
+
+@patch("tech_utils.circuit_breaker.time")
+def test_failed_probe_reopens(mock_time):
+    mock_time.monotonic.return_value = 100
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=30)
+    with pytest.raises(ConnectionError):
+        breaker.call(_fail)
+
+    mock_time.monotonic.return_value = 131
+    with pytest.raises(ConnectionError):
+        breaker.call(_fail)
+
+    assert breaker.state == circuit_breaker.OPEN
+    assert breaker.stats()["opened"] == 2
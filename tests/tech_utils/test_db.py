@@ -1,7 +1,9 @@
 import pytest
 import psycopg2
 from datetime import datetime, timezone
-from tech_utils.db import get_conn, update_versioned
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+from tech_utils.db import get_conn, update_versioned, update_versioned_batch
 
 TEST_TABLE = "test_versioned_table"
 
@@ -56,3 +58,24 @@ def test_update_versioned_creates_new_row(setup_test_table):
     assert rows[0][3] is not None  # valid_to is not NULL for old row
     assert rows[1][2] == "updated"
     assert rows[1][4] is None  # valid_to is NULL for new row
+
+
+def test_update_versioned_batch_single_statement():
+    """Batch versioning closes and re-inserts all records with one statement."""
+    mock_cursor = MagicMock()
+    mock_cursor.description = [SimpleNamespace(name=c) for c in ("id", "session_id", "mission_id", "status", "valid_from", "valid_to")]
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+
+    with patch("tech_utils.db.execute_values", return_value=[("s1",), ("s2",)]) as mock_execute_values:
+        updated = update_versioned_batch(mock_conn, "grfp_sessions", "session_id", [
+            {"session_id": "s1", "status": "finished"},
+            {"session_id": "s2", "status": "abort"},
+        ])
+
+    assert updated == ["s1", "s2"]
+    assert mock_execute_values.call_count == 1
+    sql, values = mock_execute_values.call_args[0][1:3]
+    assert "INSERT INTO grfp_sessions (session_id, mission_id, status, valid_from)" in sql
+    assert values == [["s1", "finished"], ["s2", "abort"]]
+    mock_conn.commit.assert_called_once()
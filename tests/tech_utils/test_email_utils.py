@@ -22,3 +22,17 @@ def test_send_email_success(mock_smtp):
     mock_server.starttls.assert_called_once()
     mock_server.login.assert_called_once()
     mock_server.send_message.assert_called_once()
+
+
+@patch("tech_utils.email_utils.send_email")
+def test_send_email_deferred_and_flushed(mock_send):
+    from tech_utils import email_utils
+    email_utils._deferred.clear()
+    mock_send.side_effect = [ConnectionError("SMTP down"), None]
+
+    assert email_utils.send_email_or_defer("Subject", "Body", "to@example.com") is False
+    assert len(email_utils._deferred) == 1
+
+    assert email_utils.flush_deferred_emails() == 1
+    assert len(email_utils._deferred) == 0
+    mock_send.assert_called_with("Subject", "Body", "to@example.com")
@@ -0,0 +1,50 @@
+import threading
+import time
+import pytest
+
+from tech_utils.idempotency import IdempotencyStore, IdempotencyConflict
+
+
+def test_retry_replays_result():
+    store = IdempotencyStore(ttl=60)
+    calls = []
+
+    def handler():
+        calls.append(1)
+        return "result"
+
+    assert store.run("k", "fp", handler) == "result"
+    assert store.run("k", "fp", handler) == "result"
+    assert len(calls) == 1
+    assert store.stats()["replayed"] == 1
+
+
+def test_concurrent_requests_are_coalesced():
+    store = IdempotencyStore(ttl=60)
+    calls = []
+
+    def slow_handler():
+        calls.append(1)
+        time.sleep(0.05)
+        return "result"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(store.run("k", "fp", slow_handler))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == ["result"] * 5
+    assert len(calls) == 1
+
+
+def test_uncacheable_result_and_conflict():
+    store = IdempotencyStore(ttl=60, cacheable=lambda result: result != "error")
+    outcomes = iter(["error", "ok"])
+
+    assert store.run("k", "fp", lambda: next(outcomes)) == "error"
+    assert store.run("k", "fp", lambda: next(outcomes)) == "ok"
+
+    with pytest.raises(IdempotencyConflict):
+        store.run("k", "other-fp", lambda: "x")
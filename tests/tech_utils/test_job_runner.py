@@ -0,0 +1,114 @@
+from unittest.mock import patch, MagicMock
+
+from tech_utils.job_runner import JobRunner, lock_key
+
+
+def _mock_db(mock_get_conn, lock_results):
+    mock_cursor = MagicMock()
+    mock_cursor.fetchone.side_effect = [(r,) for r in lock_results]
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_get_conn.return_value = mock_conn
+    mock_get_conn.return_value.__enter__.return_value = mock_conn
+    return mock_cursor
+
+
+def _recorded(mock_cursor):
+    return [c.args[1] for c in mock_cursor.execute.call_args_list if "INSERT INTO grfp_job_runs" in c.args[0]]
+
+
+# === Test: lock keys are stable 64-bit integers ===
+def test_lock_key_stable():
+    assert lock_key("cm:cleaner") == lock_key("cm:cleaner")
+    assert lock_key("cm:cleaner") != lock_key("mm:cleaner")
+    assert -2**63 <= lock_key("cm:cleaner") < 2**63
+
+
+# === Test: the leader runs the job and records it, the lock is kept between runs ===
+@patch("tech_utils.job_runner.get_conn")
+def test_leader_runs_and_records(mock_get_conn):
+    mock_cursor = _mock_db(mock_get_conn, [True])
+    job = MagicMock()
+    runner = JobRunner("cm")
+    runner.add_job(job, "interval", name="cleaner", seconds=60)
+
+    runner._run("cm:cleaner", job, True)
+    runner._run("cm:cleaner", job, True)
+
+    assert job.call_count == 2
+    # One pg_try_advisory_lock, then the held lease is reused
+    lock_calls = [c for c in mock_cursor.execute.call_args_list if "pg_try_advisory_lock" in c.args[0]]
+    assert len(lock_calls) == 1
+    records = _recorded(mock_cursor)
+    assert [r[2] for r in records] == ["ok", "ok"]
+    assert runner.stats()["leader_of"] == ["cm:cleaner"]
+
+
+# === Test: other replicas skip exclusive jobs without recording ===
+@patch("tech_utils.job_runner.get_conn")
+def test_follower_skips(mock_get_conn):
+    mock_cursor = _mock_db(mock_get_conn, [False])
+    job = MagicMock()
+    runner = JobRunner("cm")
+    runner.add_job(MagicMock(), "interval", name="cleaner", seconds=60)
+
+    runner._run("cm:cleaner", job, True)
+
+    job.assert_not_called()
+    assert _recorded(mock_cursor) == []
+    assert runner.stats()["jobs"]["cm:cleaner"]["not_leader"] == 1
+
+
+# === Test: failing runs are recorded with the error ===
+@patch("tech_utils.job_runner.get_conn")
+def test_failed_run_recorded(mock_get_conn):
+    mock_cursor = _mock_db(mock_get_conn, [True])
+    runner = JobRunner("mm")
+    runner.add_job(MagicMock(), "interval", name="alert", seconds=60)
+
+    runner._run("mm:alert", MagicMock(side_effect=Exception("smtp down")), True)
+
+    (record,) = _recorded(mock_cursor)
+    assert record[2] == "error"
+    assert record[5] == "smtp down"
+
+
+# === Test: a lost lease connection drops leadership until the lock is taken again ===
+@patch("tech_utils.job_runner.get_conn")
+def test_lost_lease_reacquires(mock_get_conn):
+    mock_cursor = _mock_db(mock_get_conn, [True, False])
+    runner = JobRunner("cm")
+    assert runner.is_leader("cm:cleaner")
+
+    # The health check of the held connection fails once
+    mock_cursor.execute.side_effect = [Exception("connection closed"), None, None]
+    assert not runner.is_leader("cm:cleaner")
+    assert runner.stats()["leader_of"] == []
+
+
+# === Test: jobs added with record=False only record failed runs ===
+@patch("tech_utils.job_runner.get_conn")
+def test_unrecorded_job_records_failures_only(mock_get_conn):
+    mock_cursor = _mock_db(mock_get_conn, [True])
+    runner = JobRunner("cm")
+    runner.add_job(MagicMock(), "interval", name="drain_outbox", record=False, seconds=5)
+
+    runner._run("cm:drain_outbox", MagicMock(), True)
+    runner._run("cm:drain_outbox", MagicMock(side_effect=RuntimeError("db down")), True)
+
+    (record,) = _recorded(mock_cursor)
+    assert record[2] == "error"
+    assert runner.stats()["jobs"]["cm:drain_outbox"]["runs"] == 2
+
+
+# === Test: per-process jobs run without a lock ===
+@patch("tech_utils.job_runner.get_conn")
+def test_local_job_runs_everywhere(mock_get_conn):
+    job = MagicMock()
+    runner = JobRunner("cm")
+    runner.add_job(MagicMock(), "interval", name="flush", seconds=60)
+
+    runner._run("cm:flush", job, False)
+
+    job.assert_called_once()
+    mock_get_conn.assert_not_called()
@@ -0,0 +1,41 @@
+import gzip
+import json
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+from unittest.mock import patch
+
+from flask import Flask
+
+from tech_utils import json_response as jr
+
+PAYLOAD = {"id": uuid.UUID(int=7), "at": datetime(2026, 1, 1, tzinfo=timezone.utc),
+           "row": ("a", 1, None), "amount": Decimal("1.5"), "parameters": {"alt": 50}}
+EXPECTED = {"id": str(uuid.UUID(int=7)), "at": "2026-01-01T00:00:00+00:00",
+            "row": ["a", 1, None], "amount": 1.5, "parameters": {"alt": 50}}
+
+
+# === Test: UUIDs, datetimes, tuples and decimals encode the same with and without orjson ===
+def test_dumps_types():
+    assert json.loads(jr.dumps(PAYLOAD)) == EXPECTED
+    with patch.object(jr, "orjson", None):
+        assert json.loads(jr.dumps(PAYLOAD)) == EXPECTED
+
+
+# === Test: gzip only for large bodies and clients that accept it ===
+def test_json_response_gzip():
+    app = Flask(__name__)
+    big = {"rows": [[i, "x" * 20] for i in range(200)]}
+
+    with app.test_request_context(headers={"Accept-Encoding": "gzip, deflate"}):
+        response = jr.json_response(big)
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert json.loads(gzip.decompress(response.get_data())) == big
+
+        small = jr.json_response({"status": "ok"})
+        assert "Content-Encoding" not in small.headers
+
+    with app.test_request_context():
+        response = jr.json_response(big, status=201)
+        assert "Content-Encoding" not in response.headers
+        assert response.status_code == 201 and response.mimetype == "application/json"
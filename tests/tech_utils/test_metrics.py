@@ -0,0 +1,11 @@
+from tech_utils import metrics
+
+
+def test_collect_metrics_snapshot():
+    metrics.register_metrics("test_ok", lambda: {"value": 1})
+    metrics.register_metrics("test_broken", lambda: 1 / 0)
+
+    snapshot = metrics.collect_metrics()
+
+    assert snapshot["test_ok"] == {"value": 1}
+    assert snapshot["test_broken"] is None